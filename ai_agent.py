@@ -5,103 +5,796 @@ Uses Asterisk ARI, Deepgram for STT, OpenAI for AI responses
 This is a professional AI call center agent designed to qualify investment leads.
 """
 
+import time
+
+# Start of the module's imports, for the startup time breakdown
+IMPORT_STARTED = time.perf_counter()
+
 import asyncio
+import atexit
+import dataclasses
+import importlib
 import os
 import json
 import logging
+import random
+import re
 import signal
-import sys
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from enum import Enum
+from typing import Optional, Dict, Any, Set, List, AsyncIterator, TYPE_CHECKING
+from urllib.parse import urlencode
 
 import aiohttp
-from dotenv import load_dotenv
+from aiohttp import web
 import websockets
-from deepgram import DeepgramClient
-
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ai_agent.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+
+from audio_cache import AudioCache
+from call_state import CallRecord, create_call_state_store
+from conversation_context import ConversationContext, estimate_tokens
+from http_clients import RateLimiter, UpstreamClient
+from call_capture import CallCapture
+from lead_extraction import LeadExtractor, QUALIFICATION_FIELDS, is_qualified
+from lead_store import create_lead_sink, migrate_json_leads
+from log_config import channel_id_var, dropped_records, setup_logging
+from metrics import MetricsRegistry, monitor_loop_lag, start_metrics_server, timed
+from settings import Settings, SettingsError
+from streaming_stt import (
+    BRIDGE_PREFIX, MEDIA_CHANNEL_PREFIX, MEDIA_FORMATS, ExternalMediaStream, LiveTranscriber, media_owner
 )
+from worker_pool import WorkerSupervisor, DRAIN, PING, PONG, RESYNC, STOP, read_message, send_message, shard_for
+
+# NumPy (audio conversion, VAD, response cache) and the Deepgram SDK are slow
+# to import and not needed until first use, so they are imported lazily
+if TYPE_CHECKING:
+    from response_cache import CachedResponse, ResponseCache
+    from vad import VoiceActivityDetector
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
 logger = logging.getLogger(__name__)
+# Every ARI event is logged here; sample it with LOG_SAMPLING under load
+event_logger = logging.getLogger('ai_agent.events')
+
+# Fixed prompts, synthesized once and served from the audio cache
+GREETING = (
+    "Hello! Thank you for calling our investment advisory service. "
+    "My name is Alex, and I'm here to help you explore investment opportunities. "
+    "I have a few quick questions to understand your investment goals better. "
+    "First, what type of investments are you interested in? "
+    "For example, stocks, bonds, real estate, or cryptocurrency?"
+)
+
+CLOSING_QUALIFIED = (
+    "Thank you so much for sharing that information! "
+    "You sound like a great fit for our services. "
+    "I'll have one of our senior advisors give you a call within 24 hours "
+    "to discuss your investment options in detail. "
+    "Have a wonderful day!"
+)
+
+CLOSING_UNQUALIFIED = (
+    "Thank you for your time today. "
+    "If you'd like to learn more about our investment services, "
+    "feel free to call us back anytime. Have a great day!"
+)
+
+
+class TurnState(Enum):
+    """Where a call is in its current turn"""
+    LISTENING = 'listening'
+    TRANSCRIBING = 'transcribing'
+    THINKING = 'thinking'
+    SPEAKING = 'speaking'
+
+
+class CompletionRegistry:
+    """Awaitable completions for ARI operations, resolved from ARI events"""
+    
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.pending: Dict[str, asyncio.Future] = {}
+    
+    def expect(self, key: str) -> asyncio.Future:
+        """Register interest in a completion before the operation is started"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        return future
+    
+    def resolve(self, key: str, result: Any = None) -> bool:
+        """Complete a pending operation; returns False if nobody is waiting"""
+        future = self.pending.get(key)
+        if future is None or future.done():
+            return False
+        future.set_result(result)
+        return True
+    
+    def fail(self, key: str, error: Exception) -> bool:
+        """Fail a pending operation; returns False if nobody is waiting"""
+        future = self.pending.get(key)
+        if future is None or future.done():
+            return False
+        future.set_exception(error)
+        return True
+    
+    def discard(self, key: str):
+        """Forget a pending operation (no-op once it has been waited for)"""
+        future = self.pending.pop(key, None)
+        if future is not None and not future.done():
+            future.cancel()
+    
+    async def wait(self, key: str, timeout: float) -> Any:
+        """Wait for a registered completion, raising asyncio.TimeoutError on timeout"""
+        future = self.pending.get(key)
+        if future is None:
+            raise KeyError(f"No pending {self.kind}: {key}")
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self.pending.pop(key, None)
+
+
+class SentenceChunker:
+    """Splits a streamed LLM response into sentences as tokens arrive"""
+    
+    # Sentence end followed by whitespace, so "$2.5" or "e.g.x" do not split
+    BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+')
+    
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.buffer = ''
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return any sentences completed by it"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self.buffer):
+            # Merge very short sentences ("Great!") into the next TTS request
+            if match.end() - start < self.min_chars:
+                continue
+            sentences.append(self.buffer[start:match.end()].strip())
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+    
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream has ended"""
+        tail = self.buffer.strip()
+        self.buffer = ''
+        return tail or None
+
+
+def ari_events_url(ari_url: str, app: str, username: str, password: str) -> str:
+    """ARI events WebSocket URL for an ARI HTTP base URL"""
+    base = ari_url.rstrip('/')
+    if base.startswith('https://'):
+        base = 'wss://' + base[len('https://'):]
+    elif base.startswith('http://'):
+        base = 'ws://' + base[len('http://'):]
+    query = urlencode({'app': app, 'api_key': f"{username}:{password}"}, safe=':')
+    return f"{base}/ari/events?{query}"
 
 
 class AICallCenterAgent:
     """Main AI Call Center Agent using Asterisk ARI"""
     
-    def __init__(self):
+    def __init__(self, settings: Optional[Settings] = None):
+        init_started = time.perf_counter()
+        # Validated configuration (SettingsError lists everything that is wrong)
+        self.settings = settings = settings or Settings.from_env()
+        
         # Asterisk ARI Configuration
-        self.ari_url = os.getenv('ARI_URL', 'http://localhost:8088')
-        self.ari_username = os.getenv('ARI_USERNAME', 'ai_agent')
-        self.ari_password = os.getenv('ARI_PASSWORD', 'ai_agent_secure_password_123')
-        self.ari_app = os.getenv('ARI_APP', 'ai-call-center')
+        self.ari_url = settings.ari_url
+        self.ari_username = settings.ari_username
+        self.ari_password = settings.ari_password
+        self.ari_app = settings.ari_app
+        
+        # ARI event WebSocket: keepalive pings and reconnect backoff (seconds)
+        self.ws_ping_interval = settings.ws_ping_interval
+        self.ws_ping_timeout = settings.ws_ping_timeout
+        self.ws_backoff_base = settings.ws_backoff_base
+        self.ws_backoff_max = settings.ws_backoff_max
+        self.ws_connected = False
+        self.ws_reconnects = 0
+        self.ws_reconnect_seconds = 0.0
+        self.resync_seconds = 0.0
+        
+        # Multi-process mode: this agent's shard, and the socket its events
+        # arrive on from the supervisor (None when it owns the WebSocket itself)
+        self.worker_index = 0
+        self.worker_count = 1
+        self.supervisor_socket: Optional[socket.socket] = None
         
         # API Keys
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.deepgram_api_key = os.getenv('DEEPGRAM_API_KEY')
-        
-        # Validate configuration
-        if not self.openai_api_key:
-            logger.error("OPENAI_API_KEY not set in environment")
-            raise ValueError("OPENAI_API_KEY required")
-        
-        if not self.deepgram_api_key:
-            logger.error("DEEPGRAM_API_KEY not set in environment")
-            raise ValueError("DEEPGRAM_API_KEY required")
-        
-        # Initialize services
-        self.deepgram = DeepgramClient(api_key=self.deepgram_api_key)
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.active_calls: Dict[str, Dict[str, Any]] = {}
+        self.openai_api_key = settings.openai_api_key
+        self.deepgram_api_key = settings.deepgram_api_key
+        
+        # Upstream base URLs (overridable to point at local stand-ins, see loadtest/)
+        self.openai_base_url = settings.openai_base_url.rstrip('/')
+        # When set, file transcription calls this Deepgram REST endpoint directly
+        # instead of going through the SDK client
+        self.deepgram_url = settings.deepgram_url.rstrip('/')
+        self.recording_dir = settings.recording_dir
+        
+        # Initialize services (the Deepgram SDK client is built on first use)
+        self.deepgram = None
+        self.active_calls: Dict[str, CallRecord] = {}
         self.running = True
         
+        # Per-channel dispatch: each channel gets an ordered event queue drained
+        # by its own worker, and each conversation runs in its own task
+        self.max_concurrent_calls = settings.max_concurrent_calls
+        self.call_slots = asyncio.Semaphore(self.max_concurrent_calls)
+        self.channel_queues: Dict[str, asyncio.Queue] = {}
+        self.channel_workers: Dict[str, asyncio.Task] = {}
+        self.call_tasks: Dict[str, asyncio.Task] = {}
+        self.background_tasks: Set[asyncio.Task] = set()
+        
+        # Admission control: up to MAX_QUEUED_CALLS callers beyond the call slots
+        # wait CALL_QUEUE_TIMEOUT seconds for one; the rest overflow, either back
+        # to the dialplan at OVERFLOW_CONTEXT / OVERFLOW_EXTENSION or with busy
+        self.max_queued_calls = settings.max_queued_calls
+        self.call_queue_timeout = settings.call_queue_timeout
+        self.overflow_action = settings.overflow_action
+        self.overflow_context = settings.overflow_context
+        self.overflow_extension = settings.overflow_extension
+        
+        # Graceful drain (SIGTERM or POST /drain): new callers overflow, calls in
+        # progress get DRAIN_TIMEOUT seconds to finish before they are hung up
+        self.drain_timeout = settings.drain_timeout
+        self.draining = False
+        self.drain_task: Optional[asyncio.Task] = None
+        self.cleaned_up = False
+        
+        # Per-call turn state machine: the step in flight (cancelled by DTMF while
+        # thinking or speaking), a timeout per state, and how many silent turns
+        # in a row end the call
+        self.turn_steps: Dict[str, Any] = {}
+        self.interrupted_steps: Set[str] = set()
+        # Seconds per state in each call's current turn (only while capturing)
+        self.turn_timings: Dict[str, Dict[str, float]] = {}
+        self.state_timeouts = {
+            TurnState.LISTENING: settings.listening_timeout,
+            TurnState.TRANSCRIBING: settings.transcribing_timeout,
+            TurnState.THINKING: settings.thinking_timeout,
+            TurnState.SPEAKING: settings.speaking_timeout,
+        }
+        self.max_no_input_turns = settings.max_no_input_turns
+        
+        # Recording and playback completions, resolved from ARI events, and the
+        # limits Asterisk applies to each recorded caller turn
+        self.recording_timeout = settings.recording_timeout
+        self.playback_timeout = settings.playback_timeout
+        self.max_recording_seconds = settings.max_recording_seconds
+        self.max_silence_seconds = settings.max_silence_seconds
+        self.recordings = CompletionRegistry('recording')
+        self.playbacks = CompletionRegistry('playback')
+        
+        # Speech-to-text mode: 'file' records then transcribes, 'streaming'
+        # sends live audio over an externalMedia channel
+        self.stt_mode = settings.stt_mode
+        self.stt_model = settings.stt_model
+        self.stt_language = settings.stt_language
+        self.deepgram_live_url = settings.deepgram_live_url
+        self.external_media_host = settings.external_media_host
+        self.external_media_format = settings.external_media_format
+        self.media_streams: Dict[str, ExternalMediaStream] = {}
+        
+        # Streaming mode runs a local VAD on the caller audio: speech during
+        # playback cancels it (barge-in), and VAD_END_MS of silence ends the
+        # caller's turn, waiting at most VAD_FINAL_GRACE for the last transcript
+        self.barge_in = settings.barge_in
+        self.vad_threshold_db = settings.vad_threshold_db
+        self.vad_start_ms = settings.vad_start_ms
+        self.vad_end_ms = settings.vad_end_ms
+        self.vad_final_grace = settings.vad_final_grace
+        
+        # File transcription runs the blocking Deepgram client on a bounded
+        # thread pool; stt_queue_depth counts requests waiting or in flight
+        self.stt_concurrency = settings.stt_concurrency
+        self.stt_timeout = settings.stt_timeout
+        self.stt_executor = ThreadPoolExecutor(
+            max_workers=self.stt_concurrency,
+            thread_name_prefix='stt'
+        )
+        self.stt_queue_depth = 0
+        
+        # Stream chat completions into sentence-level TTS instead of waiting
+        # for the full response and the full audio
+        self.stream_responses = settings.stream_responses
+        
+        # Text-to-speech settings and the cache of synthesized audio
+        self.tts_model = settings.tts_model
+        self.tts_voice = settings.tts_voice
+        # Audio is requested as raw PCM and converted to 8 kHz slin, Asterisk's
+        # native format, so playback needs no transcoding; files live on tmpfs
+        self.tts_format = 'sln'
+        self.audio_cache = AudioCache(
+            directory=settings.tts_cache_dir,
+            max_disk_bytes=settings.tts_cache_disk_mb * 1024 * 1024,
+            max_memory_bytes=settings.tts_cache_memory_mb * 1024 * 1024,
+            extension=self.tts_format
+        )
+        
+        # Chat completion model and sampling for the conversation
+        self.chat_model = settings.chat_model
+        self.chat_max_tokens = settings.chat_max_tokens
+        self.chat_temperature = settings.chat_temperature
+        
+        # Prompt size per turn: token budget for history, older turns summarized
+        self.context_token_budget = settings.context_token_budget
+        self.context_keep_recent = settings.context_keep_recent
+        self.summary_model = settings.summary_model
+        
+        # Opt-in cache of answers to recurring caller questions, matched by
+        # similarity within the same qualification stage; hits skip the chat
+        # completion and usually find their audio in the TTS cache
+        self.response_cache: Optional['ResponseCache'] = None
+        if settings.response_cache:
+            from response_cache import ResponseCache
+            self.response_cache = ResponseCache(
+                threshold=settings.response_cache_threshold,
+                ttl=settings.response_cache_ttl,
+                max_entries=settings.response_cache_size,
+                min_chars=settings.response_cache_min_chars
+            )
+        
+        # Keyword table for lead extraction (JSON file: field -> value -> terms)
+        self.lead_extractor = LeadExtractor.from_file(settings.lead_keywords_file)
+        
+        # Leads are queued on hangup and written in batches by a background task
+        self.leads_file = 'leads_data.json'
+        self.lead_sink = create_lead_sink(
+            settings.lead_store,
+            settings.lead_store_path,
+            fsync=settings.lead_store_fsync,
+            max_bytes=settings.lead_store_max_mb * 1024 * 1024
+        )
+        self.media_channel_ids: Set[str] = set()
+        
+        # Call state mirrored to a store so a restarted worker resumes calls
+        # mid-conversation (memory: this process only; sqlite: shared on the host)
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.call_store = create_call_state_store(
+            settings.call_state_store,
+            settings.call_state_path,
+            flush_interval=settings.call_state_flush_interval,
+            token_budget=self.context_token_budget,
+            keep_recent=self.context_keep_recent
+        )
+        
+        # Opt-in capture of every turn (transcript, timings, lead fields) for
+        # offline replay with call_replay.py
+        self.call_capture: Optional[CallCapture] = None
+        if settings.call_capture_path:
+            self.call_capture = CallCapture(
+                settings.call_capture_path,
+                max_bytes=settings.call_capture_max_mb * 1024 * 1024
+            )
+        
+        # Separate HTTP pools per upstream with timeouts, retries and rate limits
+        # (OpenAI limits are per model, so chat and TTS get their own buckets)
+        self.http_retries = settings.http_retries
+        self.ari_pool_size = settings.ari_pool_size
+        self.ari_timeout = settings.ari_timeout
+        self.openai_pool_size = settings.openai_pool_size
+        self.openai_timeout = settings.openai_timeout
+        self.deepgram_pool_size = settings.deepgram_pool_size
+        self.deepgram_timeout = settings.deepgram_timeout
+        self.chat_limiter = RateLimiter(
+            requests_per_minute=settings.openai_chat_rpm,
+            tokens_per_minute=settings.openai_chat_tpm
+        )
+        self.tts_limiter = RateLimiter(requests_per_minute=settings.openai_tts_rpm)
+        
+        # Prometheus-style metrics served from /metrics (METRICS_PORT=0 disables)
+        self.metrics_host = settings.metrics_host
+        self.metrics_port = settings.metrics_port
+        self.metrics_runner = None
+        self.setup_metrics()
+        self.setup_http_clients()
+        
+        # Startup time breakdown, logged once the agent is up and exported as a gauge
+        self.startup_seconds: Dict[str, float] = {}
+        self.record_startup('import', IMPORT_SECONDS)
+        self.record_startup('init', time.perf_counter() - init_started)
+        
         logger.info("AI Call Center Agent initialized")
     
+    def setup_metrics(self):
+        """Create the metrics registry: stage timers, API counters and gauges"""
+        self.metrics = MetricsRegistry()
+        self.stage_seconds = self.metrics.histogram(
+            'ai_agent_stage_seconds', 'Time spent in each call-handling stage', ['stage']
+        )
+        self.api_responses = self.metrics.counter(
+            'ai_agent_api_responses_total', 'Upstream API responses by status code', ['api', 'status']
+        )
+        self.api_errors = self.metrics.counter(
+            'ai_agent_api_errors_total', 'Upstream API calls that failed without a response', ['api']
+        )
+        self.calls_rejected = self.metrics.counter(
+            'ai_agent_calls_rejected_total', 'Callers sent to overflow instead of the agent', ['reason']
+        )
+        self.state_timeouts_total = self.metrics.counter(
+            'ai_agent_state_timeouts_total', 'Turn states abandoned after their timeout', ['state']
+        )
+        self.barge_ins = self.metrics.counter(
+            'ai_agent_barge_ins_total', 'Agent playbacks cut short because the caller started talking'
+        )
+        self.api_retries = self.metrics.counter(
+            'ai_agent_api_retries_total', 'Upstream requests retried after throttling or a transient error', ['api']
+        )
+        self.rate_limit_wait = self.metrics.histogram(
+            'ai_agent_rate_limit_wait_seconds', 'Time requests waited for the rate limiter', ['api']
+        )
+        self.loop_lag = self.metrics.gauge(
+            'ai_agent_event_loop_lag_seconds', 'How late the event loop wakes from a timer'
+        )
+        self.startup_phase_seconds = self.metrics.gauge(
+            'ai_agent_startup_seconds', 'Time taken by each startup phase', ['phase']
+        )
+        
+        gauges = {
+            'ai_agent_active_calls': ('Calls currently in progress', lambda: len(self.active_calls)),
+            'ai_agent_draining': ('1 while the agent is draining for a restart', lambda: int(self.draining)),
+            'ai_agent_channel_queue_depth': ('ARI events queued across channel workers',
+                                             lambda: sum(q.qsize() for q in self.channel_queues.values())),
+            'ai_agent_stt_queue_depth': ('Transcriptions waiting or in flight', lambda: self.stt_queue_depth),
+            'ai_agent_lead_queue_depth': ('Leads waiting to be written', lambda: self.lead_sink.queue.qsize()),
+            'ai_agent_ari_connected': ('1 while the ARI event WebSocket is connected',
+                                       lambda: int(self.ws_connected)),
+            'ai_agent_ari_reconnects': ('ARI WebSocket reconnects since start', lambda: self.ws_reconnects),
+            'ai_agent_ari_reconnect_seconds': ('Duration of the last ARI outage',
+                                               lambda: self.ws_reconnect_seconds),
+            'ai_agent_ari_resync_seconds': ('Duration of the last channel resync', lambda: self.resync_seconds),
+            'ai_agent_tts_cache_hits': ('TTS cache hits', lambda: self.audio_cache.hits),
+            'ai_agent_tts_cache_misses': ('TTS cache misses', lambda: self.audio_cache.misses),
+            'ai_agent_tts_cache_memory_hits': ('TTS cache files rewritten from memory instead of synthesized',
+                                               lambda: self.audio_cache.memory_hits),
+            'ai_agent_log_records_dropped': ('Log records dropped because the log queue was full', dropped_records),
+        }
+        if self.response_cache is not None:
+            cache = self.response_cache
+            gauges.update({
+                'ai_agent_response_cache_hits': ('Caller questions answered from the response cache',
+                                                 lambda: cache.hits),
+                'ai_agent_response_cache_misses': ('Response cache lookups without a match', lambda: cache.misses),
+                'ai_agent_response_cache_hit_ratio': ('Response cache hits / lookups', lambda: cache.hit_ratio),
+                'ai_agent_response_cache_saved_seconds': ('Response generation time skipped by cache hits',
+                                                          lambda: cache.saved_seconds),
+                'ai_agent_response_cache_entries': ('Responses in the cache', lambda: len(cache.entries)),
+            })
+        if self.call_capture is not None:
+            capture = self.call_capture
+            gauges['ai_agent_capture_queue_depth'] = ('Capture records waiting to be written',
+                                                      lambda: capture.pending)
+        for name, (help_text, callback) in gauges.items():
+            self.metrics.gauge(name, help_text, callback=callback)
+    
+    def setup_http_clients(self):
+        """One connection pool per upstream API"""
+        # ARI actions (play, record) are not safe to repeat after a timeout, so
+        # only explicit throttling is retried there
+        self.ari_http = UpstreamClient(
+            'ari', limit=self.ari_pool_size, timeout=self.ari_timeout, retries=self.http_retries,
+            retry_statuses=(429, 503), auth=aiohttp.BasicAuth(self.ari_username, self.ari_password),
+            retry_counter=self.api_retries, wait_histogram=self.rate_limit_wait
+        )
+        self.openai_http = UpstreamClient(
+            'openai', limit=self.openai_pool_size, timeout=self.openai_timeout, retries=self.http_retries,
+            headers={'Authorization': f'Bearer {self.openai_api_key}'},
+            retry_counter=self.api_retries, wait_histogram=self.rate_limit_wait
+        )
+        self.deepgram_http = UpstreamClient(
+            'deepgram', limit=self.deepgram_pool_size, timeout=self.deepgram_timeout, retries=self.http_retries,
+            headers={'Authorization': f'Token {self.deepgram_api_key}'},
+            retry_counter=self.api_retries, wait_histogram=self.rate_limit_wait
+        )
+        self.http_clients = [self.ari_http, self.openai_http, self.deepgram_http]
+    
     async def start(self):
         """Start the AI agent"""
         logger.info("Starting AI Call Center Agent...")
+        started = time.perf_counter()
         
-        # Create HTTP session
-        self.session = aiohttp.ClientSession(
-            auth=aiohttp.BasicAuth(self.ari_username, self.ari_password)
+        # Open the HTTP pools (each upstream's credentials live on its own session)
+        # and start the lead, call state and capture writers, all at once
+        await asyncio.gather(
+            *(client.start() for client in self.http_clients),
+            self.lead_sink.start(),
+            self.call_store.start(),
+            *([self.call_capture.start()] if self.call_capture is not None else [])
         )
         
-        # Connect to ARI WebSocket
-        ws_url = f"ws://localhost:8088/ari/events?app={self.ari_app}&api_key={self.ari_username}:{self.ari_password}"
+        # Import any legacy leads_data.json once
+        if self.worker_index == 0:
+            await migrate_json_leads(self.leads_file, self.lead_sink)
+        
+        # Metrics (and drain) endpoint and event-loop lag sampling
+        if self.metrics_port:
+            app = web.Application()
+            app.router.add_post('/drain', self.handle_drain)
+            self.metrics_runner = await start_metrics_server(self.metrics, self.metrics_host, self.metrics_port, app)
+        self.spawn(monitor_loop_lag(self.loop_lag))
+        
+        self.record_startup('start', time.perf_counter() - started)
+        self.record_startup('total', time.perf_counter() - IMPORT_STARTED)
+        logger.info(f"Startup: {self.startup_report()}")
+        
+        # Pre-connect the pools, synthesize fixed prompts and load the lazily
+        # imported modules in the background so first callers do not wait
+        self.spawn(self.warm_up())
         
         try:
-            async with websockets.connect(ws_url) as websocket:
-                logger.info(f"Connected to ARI WebSocket: {self.ari_app}")
-                
-                # Listen for events
-                while self.running:
-                    try:
-                        message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
-                        event = json.loads(message)
-                        await self.handle_event(event)
-                    except asyncio.TimeoutError:
-                        continue
-                    except websockets.exceptions.ConnectionClosed:
-                        logger.warning("WebSocket connection closed")
-                        break
-                    
+            if self.supervisor_socket is not None:
+                await self.run_supervised_events()
+            else:
+                await self.run_event_connection()
         except Exception as e:
             logger.error(f"Error in ARI connection: {e}")
         finally:
             await self.cleanup()
     
+    async def warm_up(self):
+        """Run the warmup steps concurrently, timing each one"""
+        steps = {
+            'ari_pool': self.ari_http.warm(f'{self.ari_url}/ari/asterisk/ping'),
+            'openai_pool': self.openai_http.warm(f'{self.openai_base_url}/models'),
+            'audio_cache': self.warm_audio_cache(),
+            'imports': asyncio.to_thread(self.preload_modules),
+        }
+        if self.deepgram_url:
+            steps['deepgram_pool'] = self.deepgram_http.warm(f'{self.deepgram_url}/v1/projects')
+        
+        async def timed_step(name: str, step):
+            step_started = time.perf_counter()
+            try:
+                await step
+            except Exception as e:
+                logger.warning(f"Warmup step {name} failed: {e}")
+            self.record_startup(f'warmup_{name}', time.perf_counter() - step_started)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(timed_step(name, step) for name, step in steps.items()))
+        self.record_startup('warmup', time.perf_counter() - started)
+        logger.info(f"Warmup complete: {self.startup_report()}")
+    
+    def preload_modules(self):
+        """Import the modules the first calls will need (runs on a thread)"""
+        importlib.import_module('audio_convert')
+        if self.stt_mode == 'streaming':
+            importlib.import_module('vad')
+        elif not self.deepgram_url:
+            self.deepgram_client()
+    
+    def record_startup(self, phase: str, seconds: float):
+        self.startup_seconds[phase] = seconds
+        self.startup_phase_seconds.set(seconds, phase=phase)
+    
+    def startup_report(self) -> str:
+        """'import 310 ms, init 12 ms, ...' in the order the phases were recorded"""
+        return ', '.join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.startup_seconds.items())
+    
+    def ari_ws_url(self) -> str:
+        """ARI events WebSocket URL derived from ARI_URL"""
+        return ari_events_url(self.ari_url, self.ari_app, self.ari_username, self.ari_password)
+    
+    def owns_channel(self, channel_id: str) -> bool:
+        """True if calls on this channel belong to this worker's shard"""
+        return self.worker_count <= 1 or shard_for(channel_id, self.worker_count) == self.worker_index
+    
+    async def run_event_connection(self):
+        """Keep the ARI event WebSocket connected, reconnecting with jittered backoff"""
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        disconnected_at: Optional[float] = None
+        
+        while self.running:
+            try:
+                async with websockets.connect(
+                    self.ari_ws_url(),
+                    ping_interval=self.ws_ping_interval,
+                    ping_timeout=self.ws_ping_timeout
+                ) as websocket:
+                    self.ws_connected = True
+                    logger.info(f"Connected to ARI WebSocket: {self.ari_app}")
+                    
+                    if disconnected_at is not None:
+                        self.ws_reconnects += 1
+                        self.ws_reconnect_seconds = loop.time() - disconnected_at
+                        logger.info(f"Reconnected after {self.ws_reconnect_seconds:.2f}s")
+                    # On the first connect this adopts the calls a previous process
+                    # left in Stasis (resumed from the call state store); after a
+                    # reconnect it catches up on what happened meanwhile
+                    await self.resync_channels()
+                    attempt = 0
+                    disconnected_at = None
+                    
+                    await self.read_events(websocket)
+            except websockets.exceptions.ConnectionClosed:
+                logger.warning("WebSocket connection closed")
+            except (websockets.exceptions.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"ARI WebSocket unavailable: {e}")
+            finally:
+                self.ws_connected = False
+            
+            if not self.running:
+                break
+            
+            if disconnected_at is None:
+                disconnected_at = loop.time()
+            
+            # Full jitter keeps many agents from reconnecting in lockstep
+            delay = random.uniform(0, min(self.ws_backoff_max, self.ws_backoff_base * 2 ** attempt))
+            attempt += 1
+            logger.info(f"Reconnecting to ARI in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+    
+    async def run_supervised_events(self):
+        """Worker mode: take events for our shard from the supervisor"""
+        reader, writer = await asyncio.open_unix_connection(sock=self.supervisor_socket)
+        logger.info(f"Worker {self.worker_index} of {self.worker_count} ready")
+        
+        # Pick up our shard's calls (a restarted worker inherits the old one's)
+        self.spawn(self.resync_channels())
+        
+        try:
+            while self.running:
+                try:
+                    event = await asyncio.wait_for(read_message(reader), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                if event is None:
+                    logger.warning("Supervisor connection closed")
+                    break
+                
+                event_type = event.get('type')
+                if event_type == PING:
+                    await send_message(writer, {'type': PONG, 'active_calls': list(self.active_calls)})
+                elif event_type == RESYNC:
+                    self.spawn(self.resync_channels())
+                elif event_type == DRAIN:
+                    self.request_drain()
+                elif event_type == STOP:
+                    self.stop()
+                else:
+                    self.dispatch_event(event)
+        finally:
+            writer.close()
+    
+    async def read_events(self, websocket):
+        """Read ARI events until the agent stops or the connection drops"""
+        while self.running:
+            try:
+                message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            self.dispatch_event(json.loads(message))
+    
+    async def resync_channels(self):
+        """Reconcile active_calls with the channels Asterisk has (after a start or reconnect)"""
+        started = asyncio.get_running_loop().time()
+        channels = await self.ari_request('GET', '/channels')
+        if channels is None:
+            logger.error("Could not list channels for resync")
+            return
+        
+        live = {channel.get('id'): channel for channel in channels}
+        
+        # Calls that hung up while we were disconnected
+        ended = [channel_id for channel_id in self.active_calls if channel_id not in live]
+        continuing = len(self.active_calls) - len(ended)
+        for channel_id in ended:
+            self.dispatch_event({'type': 'StasisEnd', 'channel': {'id': channel_id}})
+        
+        # Calls that entered our Stasis app while we were disconnected (a channel
+        # with a queue already has its StasisStart on the way).
+        # externalMedia channels are never calls; ones without a stream here
+        # were left behind by a previous process
+        adopted = 0
+        orphaned = []
+        for channel_id, channel in live.items():
+            if (channel_id in self.active_calls or channel_id in self.channel_queues
+                    or channel_id in self.media_channel_ids):
+                continue
+            if channel_id.startswith(MEDIA_CHANNEL_PREFIX):
+                if self.owns_channel(media_owner(channel_id)):
+                    orphaned.append(channel_id)
+                continue
+            dialplan = channel.get('dialplan', {})
+            app_data = dialplan.get('app_data', '')
+            if (dialplan.get('app_name') == 'Stasis' and app_data.split(',')[0] == self.ari_app
+                    and self.owns_channel(channel_id)):
+                self.dispatch_event({'type': 'StasisStart', 'channel': channel})
+                adopted += 1
+        
+        removed = await self.remove_orphaned_media(orphaned)
+        
+        self.resync_seconds = asyncio.get_running_loop().time() - started
+        logger.info(f"Resynced channels in {self.resync_seconds:.3f}s: "
+                    f"{continuing} continuing, {len(ended)} ended, {adopted} adopted, "
+                    f"{removed} orphaned media channels and bridges removed")
+    
+    async def remove_orphaned_media(self, media_channel_ids: List[str]) -> int:
+        """Hang up externalMedia channels and delete bridges no stream of ours owns"""
+        bridges = await self.ari_request('GET', '/bridges') or []
+        own_bridges = {stream.bridge_id for stream in self.media_streams.values()}
+        bridge_ids = [
+            bridge.get('id', '') for bridge in bridges
+            if bridge.get('id', '').startswith(BRIDGE_PREFIX) and bridge['id'] not in own_bridges
+            and self.owns_channel(media_owner(bridge['id']))
+        ]
+        await asyncio.gather(
+            *(self.ari_request('DELETE', f'/channels/{channel_id}') for channel_id in media_channel_ids),
+            *(self.ari_request('DELETE', f'/bridges/{bridge_id}') for bridge_id in bridge_ids),
+            return_exceptions=True
+        )
+        return len(media_channel_ids) + len(bridge_ids)
+    
+    def dispatch_event(self, event: Dict[str, Any]):
+        """Route an ARI event to its channel queue without blocking the reader"""
+        event_type = event.get('type')
+        channel_id = event.get('channel', {}).get('id')
+        
+        if not channel_id:
+            self.spawn(self.handle_event(event))
+            return
+        
+        # Our own externalMedia channels also enter Stasis; they are not calls
+        if channel_id in self.media_channel_ids:
+            return
+        
+        if event_type == 'StasisEnd':
+            # Stop the conversation right away; the worker still records the hangup
+            call_task = self.call_tasks.get(channel_id)
+            if call_task:
+                call_task.cancel()
+        
+        queue = self.channel_queues.get(channel_id)
+        if queue is None:
+            if event_type != 'StasisStart':
+                logger.debug(f"Dropping {event_type} for unknown channel {channel_id}")
+                return
+            queue = asyncio.Queue()
+            self.channel_queues[channel_id] = queue
+            self.channel_workers[channel_id] = asyncio.create_task(
+                self.run_channel_worker(channel_id, queue)
+            )
+        
+        queue.put_nowait(event)
+    
+    async def run_channel_worker(self, channel_id: str, queue: asyncio.Queue):
+        """Process events for one channel in arrival order"""
+        # Log records from this worker and the tasks it starts carry the channel id
+        channel_id_var.set(channel_id)
+        try:
+            while True:
+                event = await queue.get()
+                try:
+                    await self.handle_event(event)
+                except Exception as e:
+                    logger.error(f"Error handling {event.get('type')} on {channel_id}: {e}")
+                if event.get('type') == 'StasisEnd':
+                    break
+        finally:
+            self.channel_queues.pop(channel_id, None)
+            self.channel_workers.pop(channel_id, None)
+    
+    def spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine in the background and keep a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+    
     async def handle_event(self, event: Dict[str, Any]):
         """Handle ARI events"""
         event_type = event.get('type')
-        logger.info(f"Received event: {event_type}")
+        event_logger.info(f"Received event: {event_type}")
         
         if event_type == 'StasisStart':
             await self.handle_stasis_start(event)
@@ -109,6 +802,16 @@ class AICallCenterAgent:
             await self.handle_stasis_end(event)
         elif event_type == 'ChannelDtmfReceived':
             await self.handle_dtmf(event)
+        elif event_type == 'RecordingFinished':
+            self.recordings.resolve(event.get('recording', {}).get('name'), event.get('recording'))
+        elif event_type == 'RecordingFailed':
+            recording = event.get('recording', {})
+            self.recordings.fail(
+                recording.get('name'),
+                RuntimeError(f"Recording failed: {recording.get('cause', recording.get('state'))}")
+            )
+        elif event_type == 'PlaybackFinished':
+            self.playbacks.resolve(event.get('playback', {}).get('id'), event.get('playback'))
         else:
             logger.debug(f"Unhandled event type: {event_type}")
     
@@ -118,29 +821,171 @@ class AICallCenterAgent:
         channel_id = channel.get('id')
         caller_number = channel.get('caller', {}).get('number', 'Unknown')
         
+        # A second StasisStart for a running call (resync raced the real event)
+        if channel_id in self.active_calls or channel_id in self.call_tasks:
+            logger.debug(f"Ignoring duplicate StasisStart for channel {channel_id}")
+            return
+        
         logger.info(f"Incoming call from {caller_number} on channel {channel_id}")
         
-        # Store call information
-        self.active_calls[channel_id] = {
-            'caller_number': caller_number,
-            'start_time': datetime.now(),
-            'conversation_history': [],
-            'lead_data': {
-                'caller_number': caller_number,
-                'call_time': datetime.now().isoformat(),
-                'investment_interest': None,
-                'investment_amount': None,
-                'risk_tolerance': None,
-                'timeline': None,
-                'qualified': False
-            }
-        }
+        # A call another process was handling (crashed or restarted worker) carries on
+        record = await self.call_store.load(channel_id)
+        if record is not None:
+            logger.info(f"Resuming call on {channel_id} from {record.owner or 'unknown owner'} "
+                        f"({len(record.conversation_history)} messages so far)")
+        elif self.draining:
+            await self.reject_call(channel_id, 'draining')
+            return
+        elif len(self.active_calls) >= self.max_concurrent_calls + self.max_queued_calls:
+            await self.reject_call(channel_id, 'overflow')
+            return
+        else:
+            # Store call information
+            record = CallRecord(
+                channel_id=channel_id,
+                caller_number=caller_number,
+                start_time=time.time(),
+                lead_data={
+                    'caller_number': caller_number,
+                    'call_time': datetime.now().isoformat(),
+                    'investment_interest': None,
+                    'investment_amount': None,
+                    'risk_tolerance': None,
+                    'timeline': None,
+                    'qualified': False
+                },
+                context=ConversationContext(self.context_token_budget, self.context_keep_recent)
+            )
         
-        # Answer the call
-        await self.ari_request('POST', f'/channels/{channel_id}/answer')
+        record.owner = self.node_id
+        self.active_calls[channel_id] = record
+        self.call_store.put(record)
         
-        # Start the conversation
-        await self.start_conversation(channel_id)
+        # Run the conversation in its own task so this channel's worker keeps
+        # draining DTMF and hangup events
+        task = asyncio.create_task(self.run_call(channel_id))
+        self.call_tasks[channel_id] = task
+        task.add_done_callback(lambda done: self.forget_call_task(channel_id, done))
+    
+    def forget_call_task(self, channel_id: str, task: asyncio.Task):
+        """Drop a finished call task, but never a newer one for the same channel"""
+        if self.call_tasks.get(channel_id) is task:
+            del self.call_tasks[channel_id]
+    
+    async def run_call(self, channel_id: str):
+        """Answer and converse once a call slot is free"""
+        try:
+            try:
+                await asyncio.wait_for(self.call_slots.acquire(), timeout=self.call_queue_timeout)
+            except asyncio.TimeoutError:
+                await self.reject_call(channel_id, 'queue_timeout')
+                return
+            
+            try:
+                record = self.active_calls.get(channel_id)
+                if record is None:
+                    return
+                resumed = record.admitted
+                if self.draining and not resumed:
+                    await self.reject_call(channel_id, 'draining')
+                    return
+                record.admitted = True
+                self.call_store.put(record)
+                
+                # Answer the call
+                if not resumed:
+                    await self.ari_request('POST', f'/channels/{channel_id}/answer')
+                
+                if self.stt_mode == 'streaming' and not await self.open_media_stream(channel_id):
+                    await self.ari_request('DELETE', f'/channels/{channel_id}')
+                    return
+                
+                # Start the conversation, or pick it up where it was left
+                await self.run_conversation(channel_id, greet=not resumed)
+            finally:
+                self.call_slots.release()
+        except asyncio.CancelledError:
+            logger.info(f"Conversation cancelled on channel {channel_id}")
+            raise
+        except Exception:
+            # Do not leave the caller on a line nobody is handling
+            logger.exception(f"Error in call on channel {channel_id}, hanging up")
+            await self.ari_request('DELETE', f'/channels/{channel_id}')
+        finally:
+            await self.close_media_stream(channel_id)
+    
+    async def reject_call(self, channel_id: str, reason: str):
+        """Hand a caller we will not serve to the overflow route"""
+        self.calls_rejected.inc(reason=reason)
+        # Not a lead: nothing is saved when its StasisEnd arrives
+        self.active_calls.pop(channel_id, None)
+        self.call_store.delete(channel_id)
+        logger.info(f"Sending call on {channel_id} to overflow ({reason}): {self.overflow_action}")
+        
+        if self.overflow_action == 'busy':
+            await self.ari_request('DELETE', f'/channels/{channel_id}', params={'reason': 'busy'})
+        else:
+            await self.ari_request(
+                'POST',
+                f'/channels/{channel_id}/continue',
+                params={'context': self.overflow_context, 'extension': self.overflow_extension, 'priority': 1}
+            )
+    
+    async def open_media_stream(self, channel_id: str) -> bool:
+        """Bridge the caller to an externalMedia channel feeding live STT"""
+        from vad import VoiceActivityDetector
+        
+        encoding, sample_rate, _ = MEDIA_FORMATS[self.external_media_format]
+        transcriber = LiveTranscriber(
+            api_key=self.deepgram_api_key,
+            url=self.deepgram_live_url,
+            encoding=encoding,
+            sample_rate=sample_rate,
+            model=self.stt_model,
+            language=self.stt_language
+        )
+        vad = VoiceActivityDetector(
+            sample_rate,
+            encoding,
+            threshold_db=self.vad_threshold_db,
+            start_ms=self.vad_start_ms,
+            end_ms=self.vad_end_ms
+        )
+        stream = ExternalMediaStream(
+            ari_request=self.ari_request,
+            app=self.ari_app,
+            channel_id=channel_id,
+            transcriber=transcriber,
+            media_host=self.external_media_host,
+            media_format=self.external_media_format,
+            vad=vad
+        )
+        # Register before creating it so its StasisStart is not taken for a call
+        self.media_channel_ids.add(stream.media_channel_id)
+        self.media_streams[channel_id] = stream
+        
+        try:
+            return await stream.open()
+        except Exception as e:
+            logger.error(f"Error opening media stream for {channel_id}: {e}")
+            return False
+    
+    def caller_vad(self, channel_id: str) -> Optional['VoiceActivityDetector']:
+        """VAD on the caller's live audio (streaming mode only)"""
+        stream = self.media_streams.get(channel_id)
+        return stream.vad if stream is not None else None
+    
+    async def close_media_stream(self, channel_id: str):
+        """Tear down the caller's externalMedia stream, if any"""
+        stream = self.media_streams.pop(channel_id, None)
+        if stream is None:
+            return
+        try:
+            await stream.close()
+        except Exception as e:
+            logger.error(f"Error closing media stream for {channel_id}: {e}")
+        finally:
+            self.media_channel_ids.discard(stream.media_channel_id)
     
     async def handle_stasis_end(self, event: Dict[str, Any]):
         """Handle call end"""
@@ -150,17 +995,21 @@ class AICallCenterAgent:
         logger.info(f"Call ended on channel {channel_id}")
         
         if channel_id in self.active_calls:
-            call_data = self.active_calls[channel_id]
+            record = self.active_calls[channel_id]
             
             # Save lead data
-            await self.save_lead_data(call_data['lead_data'])
+            await self.save_lead_data(record.lead_data)
             
             # Log conversation
-            duration = (datetime.now() - call_data['start_time']).total_seconds()
+            duration = time.time() - record.start_time
             logger.info(f"Call duration: {duration:.2f} seconds")
+            if self.call_capture is not None:
+                turns = sum(1 for message in record.conversation_history if message['role'] == 'user')
+                self.call_capture.call(channel_id, turns, duration, record.lead_data, time.time())
             
             # Cleanup
             del self.active_calls[channel_id]
+            self.call_store.delete(channel_id)
     
     async def handle_dtmf(self, event: Dict[str, Any]):
         """Handle DTMF input"""
@@ -169,249 +1018,554 @@ class AICallCenterAgent:
         
         logger.info(f"DTMF received on {channel_id}: {digit}")
         
-        # Handle menu options if needed
-        if channel_id in self.active_calls:
-            # You can implement DTMF-based menu navigation here
-            pass
+        # A key press while the agent thinks or talks cuts it short: the caller
+        # wants to speak ('#' already ends a recording in Asterisk). Cancelling
+        # the step also stops the playback in progress (see play_audio)
+        step = self.turn_steps.get(channel_id)
+        if step is not None and not step[1].done() and step[0] in (TurnState.THINKING, TurnState.SPEAKING):
+            logger.info(f"Interrupting {step[0].value} on {channel_id}")
+            self.interrupted_steps.add(channel_id)
+            step[1].cancel()
     
-    async def start_conversation(self, channel_id: str):
-        """Start the AI conversation"""
+    async def run_conversation(self, channel_id: str, greet: bool = True):
+        """Turn state machine: LISTENING -> TRANSCRIBING -> THINKING -> SPEAKING, once per turn"""
         logger.info(f"Starting conversation on channel {channel_id}")
+        no_input = 0
+        try:
+            if greet:
+                await self.run_step(channel_id, TurnState.SPEAKING, self.speak(channel_id, GREETING))
+            
+            while channel_id in self.active_calls:
+                turn_started = time.perf_counter()
+                if self.call_capture is not None:
+                    self.turn_timings[channel_id] = {}
+                transcript = await self.listen_for_turn(channel_id)
+                if not transcript:
+                    no_input += 1
+                    if no_input > self.max_no_input_turns:
+                        logger.info(f"No input from caller on {channel_id} for {no_input} turns")
+                        break
+                    continue
+                no_input = 0
+                
+                responded = await self.respond_to_turn(channel_id, transcript)
+                if self.call_capture is not None:
+                    self.capture_turn(channel_id, transcript, responded, time.perf_counter() - turn_started)
+                if not responded:
+                    continue
+                self.stage_seconds.observe(time.perf_counter() - turn_started, stage='turn')
+                
+                if not self.should_continue_conversation(channel_id):
+                    break
+            
+            await self.end_call(channel_id)
+        finally:
+            self.turn_steps.pop(channel_id, None)
+            self.interrupted_steps.discard(channel_id)
+            self.turn_timings.pop(channel_id, None)
+    
+    def capture_turn(self, channel_id: str, transcript: str, responded: bool, seconds: float):
+        """Queue the finished turn for the capture file"""
+        record = self.active_calls.get(channel_id)
+        if record is None:
+            return
+        try:
+            history = record.conversation_history
+            turn = sum(1 for message in history if message['role'] == 'user')
+            response = history[-1]['content'] if responded and history[-1]['role'] == 'assistant' else None
+            timings = self.turn_timings.get(channel_id, {})
+            timings['turn'] = seconds
+            self.call_capture.turn(channel_id, turn, transcript, response, timings, record.lead_data, time.time())
+        except Exception as e:
+            logger.error(f"Error capturing turn on {channel_id}: {e}")
+    
+    async def run_step(self, channel_id: str, state: TurnState, coro) -> Any:
+        """Run one state's work under its timeout; None if it timed out or the caller interrupted it"""
+        record = self.active_calls.get(channel_id)
+        if record is not None:
+            record.state = state.value
+        step = asyncio.ensure_future(coro)
+        self.turn_steps[channel_id] = (state, step)
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(step, timeout=self.state_timeouts[state])
+        except asyncio.TimeoutError:
+            self.state_timeouts_total.inc(state=state.value)
+            logger.warning(f"{state.value} on {channel_id} timed out after {self.state_timeouts[state]}s")
+            return None
+        except asyncio.CancelledError:
+            # Only a DTMF interruption is absorbed; hangups and shutdown propagate
+            if channel_id not in self.interrupted_steps:
+                step.cancel()
+                raise
+            self.interrupted_steps.discard(channel_id)
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_seconds.observe(elapsed, stage=state.value)
+            timings = self.turn_timings.get(channel_id)
+            if timings is not None:
+                timings[state.value] = timings.get(state.value, 0.0) + elapsed
+    
+    async def listen_for_turn(self, channel_id: str) -> Optional[str]:
+        """LISTENING (and TRANSCRIBING in file mode): the caller's next utterance"""
+        logger.info(f"Listening on channel {channel_id}")
+        if self.stt_mode == 'streaming':
+            # Live STT: the transcript is complete when the caller stops speaking
+            return await self.run_step(channel_id, TurnState.LISTENING, self.listen_streaming(channel_id))
         
-        # Welcome message
-        greeting = (
-            "Hello! Thank you for calling our investment advisory service. "
-            "My name is Alex, and I'm here to help you explore investment opportunities. "
-            "I have a few quick questions to understand your investment goals better. "
-            "First, what type of investments are you interested in? "
-            "For example, stocks, bonds, real estate, or cryptocurrency?"
-        )
-        
-        # Play greeting using text-to-speech
-        await self.speak(channel_id, greeting)
-        
-        # Start listening for response
-        await self.listen_and_respond(channel_id)
+        recording_name = await self.run_step(channel_id, TurnState.LISTENING, self.record_turn(channel_id))
+        if recording_name is None:
+            return None
+        return await self.run_step(channel_id, TurnState.TRANSCRIBING, self.transcribe_audio(recording_name))
     
     async def speak(self, channel_id: str, text: str):
         """Convert text to speech and play to caller"""
         logger.info(f"Speaking to {channel_id}: {text[:50]}...")
         
         try:
-            # Generate speech using OpenAI TTS
-            response = await self.generate_speech_openai(text)
+            # Generate speech using OpenAI TTS (or reuse cached audio)
+            audio_file = await self.get_speech_file(text)
             
-            if response:
-                # Save audio temporarily
-                audio_file = f"/tmp/ai_agent_{channel_id}_{datetime.now().timestamp()}.wav"
-                with open(audio_file, 'wb') as f:
-                    f.write(response)
-                
+            if audio_file:
                 # Play audio through Asterisk
                 await self.play_audio(channel_id, audio_file)
-                
-                # Clean up
-                try:
-                    os.remove(audio_file)
-                except:
-                    pass
         except Exception as e:
             logger.error(f"Error in speak: {e}")
     
+    async def get_speech_file(self, text: str) -> Optional[str]:
+        """Playable file for text, synthesized on a cache miss"""
+        key = AudioCache.make_key(text, self.tts_voice, self.tts_model, self.tts_format)
+        return await self.audio_cache.get_file(key, lambda: self.generate_speech_openai(text))
+    
+    async def warm_audio_cache(self):
+        """Synthesize the fixed prompts ahead of the first call"""
+        prompts = [GREETING, CLOSING_QUALIFIED, CLOSING_UNQUALIFIED]
+        for text in prompts:
+            self.audio_cache.pin(AudioCache.make_key(text, self.tts_voice, self.tts_model, self.tts_format))
+        
+        results = await asyncio.gather(*(self.get_speech_file(text) for text in prompts))
+        ready = sum(1 for path in results if path)
+        logger.info(f"Audio cache warm: {ready}/{len(prompts)} prompts ready ({self.audio_cache.stats()})")
+    
+    @timed('tts')
     async def generate_speech_openai(self, text: str) -> Optional[bytes]:
         """Generate speech using OpenAI TTS API"""
         try:
-            headers = {
-                'Authorization': f'Bearer {self.openai_api_key}',
-                'Content-Type': 'application/json'
-            }
-            
             payload = {
-                'model': 'tts-1',
+                'model': self.tts_model,
                 'input': text,
-                'voice': 'alloy',
-                'response_format': 'wav'
+                'voice': self.tts_voice,
+                'response_format': 'pcm'
             }
             
-            async with self.session.post(
-                'https://api.openai.com/v1/audio/speech',
-                headers=headers,
+            async with self.openai_http.request(
+                'POST',
+                f'{self.openai_base_url}/audio/speech',
+                limiter=self.tts_limiter,
                 json=payload
             ) as response:
+                self.api_responses.inc(api='openai_tts', status=response.status)
                 if response.status == 200:
-                    return await response.read()
+                    pcm = await response.read()
                 else:
                     logger.error(f"OpenAI TTS error: {response.status}")
                     return None
+            
+            # 24 kHz PCM -> 8 kHz slin off the event loop
+            from audio_convert import to_slin
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, to_slin, pcm)
         except Exception as e:
+            self.api_errors.inc(api='openai_tts')
             logger.error(f"Error generating speech: {e}")
             return None
     
-    async def play_audio(self, channel_id: str, audio_file: str):
-        """Play audio file to channel"""
+    @timed('playback')
+    async def play_audio(self, channel_id: str, audio_file: str) -> bool:
+        """Play audio file to channel and wait for PlaybackFinished (False if cut short)"""
+        playback_id = f"playback_{channel_id}_{datetime.now().timestamp()}"
+        vad = self.caller_vad(channel_id) if self.barge_in else None
+        if vad is not None and vad.in_speech:
+            # Caller is already talking; do not start speaking over them
+            return False
+        
         try:
-            # Create playback
-            playback_id = f"playback_{datetime.now().timestamp()}"
-            await self.ari_request(
+            # Register before starting so a fast PlaybackFinished is not missed
+            self.playbacks.expect(playback_id)
+            playback = await self.ari_request(
                 'POST',
                 f'/channels/{channel_id}/play',
-                params={'media': f'sound:{audio_file}'}
+                # Asterisk picks the file by its extension, so it is left off the URI
+                params={'media': f'sound:{os.path.splitext(audio_file)[0]}', 'playbackId': playback_id}
             )
+            if playback is None:
+                return False
+            
             logger.info(f"Playing audio on channel {channel_id}")
+            if vad is None:
+                await self.playbacks.wait(playback_id, self.playback_timeout)
+                return True
+            return await self.wait_for_playback_or_barge_in(channel_id, playback_id, vad)
+        except asyncio.CancelledError:
+            # Step interrupted (DTMF, state timeout): stop what the caller is hearing.
+            # After a hangup there is nothing left to stop
+            if channel_id in self.active_calls:
+                self.spawn(self.ari_request('DELETE', f'/playbacks/{playback_id}'))
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"Playback {playback_id} did not finish within {self.playback_timeout}s")
+            return False
         except Exception as e:
             logger.error(f"Error playing audio: {e}")
+            return False
+        finally:
+            # Also when cancelled before waiting (hangup during the POST)
+            self.playbacks.discard(playback_id)
     
-    async def listen_and_respond(self, channel_id: str):
-        """Listen to caller and generate AI response"""
-        logger.info(f"Listening on channel {channel_id}")
+    async def wait_for_playback_or_barge_in(self, channel_id: str, playback_id: str,
+                                            vad: 'VoiceActivityDetector') -> bool:
+        """Wait for the playback to finish, stopping it if the caller starts talking"""
+        finished = asyncio.ensure_future(self.playbacks.wait(playback_id, self.playback_timeout))
+        speech = asyncio.ensure_future(vad.speech_started.wait())
+        try:
+            await asyncio.wait({finished, speech}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            speech.cancel()
+        
+        if finished.done():
+            finished.result()
+            return True
+        
+        finished.cancel()
+        self.barge_ins.inc()
+        logger.info(f"Caller interrupted playback on {channel_id}")
+        await self.ari_request('DELETE', f'/playbacks/{playback_id}')
+        return False
+    
+    async def respond_to_turn(self, channel_id: str, transcript: str) -> bool:
+        """THINKING and SPEAKING: answer the caller; False if there was no response"""
+        record = self.active_calls.get(channel_id)
+        if record is None:
+            return False
+        logger.info(f"Caller said: {transcript}")
+        
+        # Add to conversation history
+        record.conversation_history.append({
+            'role': 'user',
+            'content': transcript
+        })
+        self.call_store.put(record)
         
+        # A question answered before at this stage is spoken straight from the
+        # cache; otherwise the AI response is generated, and in streaming mode
+        # spoken as it is generated
+        cached = self.lookup_response(channel_id, transcript)
+        if cached is not None:
+            ai_response = await self.run_step(channel_id, TurnState.SPEAKING,
+                                              self.speak_cached_response(channel_id, transcript, cached))
+        elif self.stream_responses:
+            ai_response = await self.respond_streaming_steps(channel_id, transcript)
+        else:
+            ai_response = await self.run_step(channel_id, TurnState.THINKING,
+                                              self.generate_ai_response(channel_id, transcript))
+        if not ai_response:
+            return False
+        
+        # Add to conversation history
+        record.conversation_history.append({
+            'role': 'assistant',
+            'content': ai_response
+        })
+        self.call_store.put(record)
+        
+        # Fold older turns into the summary while the response plays
+        context = record.context
+        context.sync(record.conversation_history)
+        if context.needs_summary():
+            self.spawn(self.summarize_context(channel_id))
+        
+        # Speak response
+        if cached is None and not self.stream_responses:
+            await self.run_step(channel_id, TurnState.SPEAKING, self.speak(channel_id, ai_response))
+        return True
+    
+    async def record_turn(self, channel_id: str) -> Optional[str]:
+        """Record the caller's turn with ARI; returns the recording name once it is finished"""
+        recording_name = f"recording_{channel_id}_{datetime.now().timestamp()}"
+        self.recordings.expect(recording_name)
         try:
-            # Start recording
-            recording_name = f"recording_{channel_id}_{datetime.now().timestamp()}"
-            await self.ari_request(
+            recording = await self.ari_request(
                 'POST',
                 f'/channels/{channel_id}/record',
                 params={
                     'name': recording_name,
                     'format': 'wav',
-                    'maxDurationSeconds': 30,
-                    'maxSilenceSeconds': 3,
+                    'maxDurationSeconds': self.max_recording_seconds,
+                    'maxSilenceSeconds': self.max_silence_seconds,
                     'ifExists': 'overwrite',
-                    'beep': False,
+                    'beep': 'false',
                     'terminateOn': '#'
                 }
             )
+            if recording is None:
+                return None
             
-            # Wait for recording to complete (simulate - in production use event-based)
-            await asyncio.sleep(5)
-            
-            # Transcribe using Deepgram
-            transcript = await self.transcribe_audio(recording_name)
-            
-            if transcript and channel_id in self.active_calls:
-                logger.info(f"Caller said: {transcript}")
+            # Wait for the caller to finish (silence, '#' or max duration)
+            if not await self.wait_for_recording(recording_name):
+                return None
+            return recording_name
+        finally:
+            # Also when cancelled before waiting (hangup during the POST)
+            self.recordings.discard(recording_name)
+    
+    @timed('listen_streaming')
+    async def listen_streaming(self, channel_id: str) -> Optional[str]:
+        """Collect final transcripts from the live stream until the caller stops speaking"""
+        stream = self.media_streams.get(channel_id)
+        if stream is None:
+            logger.warning(f"No media stream for channel {channel_id}")
+            return None
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.recording_timeout
+        transcript = aiter(stream)
+        parts = []
+        
+        # The local VAD usually hears the caller stop before STT endpointing does
+        end_of_speech = None
+        if stream.vad is not None and self.vad_end_ms > 0:
+            end_of_speech = asyncio.ensure_future(stream.vad.wait_for_end_of_speech())
+        finalizing = False
+        next_result = None
+        
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    if not finalizing:
+                        logger.warning(f"No end of speech on {channel_id} within {self.recording_timeout}s")
+                    break
                 
-                # Add to conversation history
-                self.active_calls[channel_id]['conversation_history'].append({
-                    'role': 'user',
-                    'content': transcript
-                })
+                next_result = asyncio.ensure_future(anext(transcript))
+                waiting = {next_result}
+                if end_of_speech is not None and not finalizing:
+                    waiting.add(end_of_speech)
+                await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
                 
-                # Generate AI response
-                ai_response = await self.generate_ai_response(channel_id, transcript)
+                if not next_result.done():
+                    next_result.cancel()
+                    if end_of_speech is not None and end_of_speech.done() and not finalizing:
+                        # Flush STT and give it a moment for the final words
+                        finalizing = True
+                        stream.transcriber.finalize()
+                        deadline = min(deadline, loop.time() + self.vad_final_grace)
+                    continue
                 
-                if ai_response:
-                    # Add to conversation history
-                    self.active_calls[channel_id]['conversation_history'].append({
-                        'role': 'assistant',
-                        'content': ai_response
-                    })
-                    
-                    # Speak response
-                    await self.speak(channel_id, ai_response)
-                    
-                    # Continue conversation or end call
-                    if self.should_continue_conversation(channel_id):
-                        await self.listen_and_respond(channel_id)
-                    else:
-                        await self.end_call(channel_id)
-        except Exception as e:
-            logger.error(f"Error in listen_and_respond: {e}")
+                try:
+                    result = next_result.result()
+                except StopAsyncIteration:
+                    break
+                
+                if not result.is_final:
+                    logger.debug(f"Interim transcript on {channel_id}: {result.text}")
+                    continue
+                if result.text:
+                    parts.append(result.text)
+                if (result.speech_final or finalizing) and parts:
+                    break
+        finally:
+            if end_of_speech is not None:
+                end_of_speech.cancel()
+            # Cancelled by a hangup mid-wait: do not leave the read pending on a closing stream
+            if next_result is not None and not next_result.done():
+                next_result.cancel()
+        
+        return ' '.join(parts) or None
     
+    @timed('recording_wait')
+    async def wait_for_recording(self, recording_name: str) -> bool:
+        """Wait for RecordingFinished; returns False if the recording failed"""
+        try:
+            await self.recordings.wait(recording_name, self.recording_timeout)
+            return True
+        except asyncio.TimeoutError:
+            # Stop it ourselves; whatever was captured is still worth transcribing
+            logger.warning(f"Recording {recording_name} did not finish within {self.recording_timeout}s")
+            await self.ari_request('POST', f'/recordings/live/{recording_name}/stop')
+            return True
+        except RuntimeError as e:
+            logger.error(f"{e} ({recording_name})")
+            return False
+    
+    @timed('transcribe')
     async def transcribe_audio(self, recording_name: str) -> Optional[str]:
-        """Transcribe audio using Deepgram"""
+        """Transcribe audio using Deepgram without blocking the event loop"""
         try:
             logger.info(f"Transcribing recording: {recording_name}")
             
             # Construct the full path to the recording file
-            audio_file = f'/var/spool/asterisk/recording/{recording_name}.wav'
-            
-            # Check if file exists
-            if not os.path.exists(audio_file):
-                logger.warning(f"Recording file not found: {audio_file}")
-                return "Sample transcribed text"  # Fallback for development
-            
-            # Read the audio file
-            with open(audio_file, 'rb') as audio:
-                audio_data = audio.read()
+            audio_file = os.path.join(self.recording_dir, f'{recording_name}.wav')
             
-            # Transcribe using Deepgram v3+ API
-            response = self.deepgram.listen.v1.media.transcribe_file(
-                request=audio_data,
-                model="nova-2",
-                smart_format=True,
-                punctuate=True,
-                language="en"
-            )
+            loop = asyncio.get_running_loop()
+            self.stt_queue_depth += 1
+            try:
+                if self.deepgram_url:
+                    transcript = await asyncio.wait_for(
+                        self.transcribe_file_http(audio_file),
+                        timeout=self.stt_timeout
+                    )
+                else:
+                    response = await asyncio.wait_for(
+                        loop.run_in_executor(self.stt_executor, self.transcribe_file_blocking, audio_file),
+                        timeout=self.stt_timeout
+                    )
+                    self.api_responses.inc(api='deepgram', status=200)
+                    transcript = self.sdk_transcript(response)
+            finally:
+                self.stt_queue_depth -= 1
             
-            # Extract transcript from response
-            if hasattr(response, 'results') and response.results:
-                channels = response.results.channels
-                if channels and len(channels) > 0:
-                    alternatives = channels[0].alternatives
-                    if alternatives and len(alternatives) > 0:
-                        transcript = alternatives[0].transcript
-                        logger.info(f"Transcription successful: {transcript[:50]}...")
-                        return transcript
+            if transcript is not None:
+                logger.info(f"Transcription successful: {transcript[:50]}...")
+                return transcript
             
             logger.warning("No transcript found in response")
             return None
             
         except FileNotFoundError as e:
-            logger.error(f"Audio file not found: {e}")
+            logger.warning(f"Recording file not found: {e.filename}")
+            return "Sample transcribed text"  # Fallback for development
+        except asyncio.TimeoutError:
+            self.api_errors.inc(api='deepgram')
+            logger.error(f"Transcription of {recording_name} timed out after {self.stt_timeout}s "
+                         f"(queue depth {self.stt_queue_depth})")
             return None
         except Exception as e:
+            self.api_errors.inc(api='deepgram')
             logger.error(f"Error transcribing audio: {e}")
             return None
     
+    def deepgram_client(self):
+        """Deepgram SDK client, imported and built on first use (the SDK is slow to import)"""
+        if self.deepgram is None:
+            from deepgram import DeepgramClient
+            self.deepgram = DeepgramClient(api_key=self.deepgram_api_key)
+        return self.deepgram
+    
+    def transcribe_file_blocking(self, audio_file: str):
+        """Read a recording and transcribe it (runs on the STT thread pool)"""
+        audio_data = self.read_recording(audio_file)
+        
+        # Transcribe using Deepgram v3+ API
+        return self.deepgram_client().listen.v1.media.transcribe_file(
+            request=audio_data,
+            model=self.stt_model,
+            smart_format=True,
+            punctuate=True,
+            language=self.stt_language,
+            request_options={'timeout_in_seconds': max(1, int(self.stt_timeout))}
+        )
+    
+    @staticmethod
+    def sdk_transcript(response) -> Optional[str]:
+        """Extract the transcript from a Deepgram SDK response"""
+        if hasattr(response, 'results') and response.results:
+            channels = response.results.channels
+            if channels and len(channels) > 0:
+                alternatives = channels[0].alternatives
+                if alternatives and len(alternatives) > 0:
+                    return alternatives[0].transcript
+        return None
+    
+    async def transcribe_file_http(self, audio_file: str) -> Optional[str]:
+        """Transcribe a recording with a POST to DEEPGRAM_URL/v1/listen"""
+        loop = asyncio.get_running_loop()
+        audio_data = await loop.run_in_executor(self.stt_executor, self.read_recording, audio_file)
+        
+        async with self.deepgram_http.request(
+            'POST',
+            f'{self.deepgram_url}/v1/listen',
+            params={'model': self.stt_model, 'smart_format': 'true', 'punctuate': 'true',
+                    'language': self.stt_language},
+            headers={'Content-Type': 'audio/wav'},
+            data=audio_data
+        ) as response:
+            self.api_responses.inc(api='deepgram', status=response.status)
+            if response.status != 200:
+                raise RuntimeError(f"Deepgram error: {response.status}")
+            data = await response.json()
+        
+        channels = data.get('results', {}).get('channels', [])
+        alternatives = channels[0].get('alternatives', []) if channels else []
+        return alternatives[0].get('transcript') if alternatives else None
+    
+    @staticmethod
+    def read_recording(audio_file: str) -> bytes:
+        """Read a finished recording from disk (runs on the STT thread pool)"""
+        with open(audio_file, 'rb') as audio:
+            return audio.read()
+    
+    def build_chat_payload(self, channel_id: str, stream: bool = False) -> Dict[str, Any]:
+        """Build the chat completion request for the call's conversation so far"""
+        record = self.active_calls[channel_id]
+        conversation_history = record.conversation_history
+        
+        # System prompt for investment advisor
+        system_prompt = """You are Alex, a professional investment advisor AI assistant. 
+        Your goal is to qualify leads by understanding their investment interests and financial goals.
+        
+        Ask targeted questions to determine:
+        1. Type of investments they're interested in
+        2. Investment amount they're considering
+        3. Risk tolerance (conservative, moderate, aggressive)
+        4. Investment timeline
+        5. Current financial situation
+        
+        Be friendly, professional, and conversational. Keep responses concise (2-3 sentences).
+        After gathering information, qualify the lead and offer to connect them with a human advisor.
+        """
+        
+        # Build messages for OpenAI: bounded history plus summary and lead facts
+        messages = record.context.build_messages(
+            system_prompt, conversation_history, record.lead_data
+        )
+        
+        payload = {
+            'model': self.chat_model,
+            'messages': messages,
+            'max_tokens': self.chat_max_tokens,
+            'temperature': self.chat_temperature
+        }
+        if stream:
+            payload['stream'] = True
+        return payload
+    
+    @staticmethod
+    def chat_tokens(payload: Dict[str, Any]) -> int:
+        """Tokens a chat request counts against the TPM limit: prompt estimate plus max_tokens"""
+        prompt = sum(estimate_tokens(message['content']) for message in payload['messages'])
+        return prompt + payload.get('max_tokens', 0)
+    
+    @timed('llm')
     async def generate_ai_response(self, channel_id: str, user_input: str) -> Optional[str]:
         """Generate AI response using OpenAI"""
+        started = time.perf_counter()
         try:
-            call_data = self.active_calls[channel_id]
-            conversation_history = call_data['conversation_history']
-            
-            # System prompt for investment advisor
-            system_prompt = """You are Alex, a professional investment advisor AI assistant. 
-            Your goal is to qualify leads by understanding their investment interests and financial goals.
-            
-            Ask targeted questions to determine:
-            1. Type of investments they're interested in
-            2. Investment amount they're considering
-            3. Risk tolerance (conservative, moderate, aggressive)
-            4. Investment timeline
-            5. Current financial situation
-            
-            Be friendly, professional, and conversational. Keep responses concise (2-3 sentences).
-            After gathering information, qualify the lead and offer to connect them with a human advisor.
-            """
-            
-            # Build messages for OpenAI
-            messages = [
-                {'role': 'system', 'content': system_prompt}
-            ]
-            messages.extend(conversation_history)
+            payload = self.build_chat_payload(channel_id)
             
             # Call OpenAI API
-            headers = {
-                'Authorization': f'Bearer {self.openai_api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                'model': 'gpt-4-turbo-preview',
-                'messages': messages,
-                'max_tokens': 150,
-                'temperature': 0.7
-            }
-            
-            async with self.session.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers=headers,
+            async with self.openai_http.request(
+                'POST',
+                f'{self.openai_base_url}/chat/completions',
+                tokens=self.chat_tokens(payload),
+                limiter=self.chat_limiter,
                 json=payload
             ) as response:
+                self.api_responses.inc(api='openai_chat', status=response.status)
                 if response.status == 200:
                     data = await response.json()
                     ai_response = data['choices'][0]['message']['content']
+                    self.cache_response(channel_id, user_input, ai_response, time.perf_counter() - started)
                     
                     # Extract lead qualification data
                     await self.extract_lead_data(channel_id, user_input, ai_response)
@@ -421,55 +1575,282 @@ class AICallCenterAgent:
                     logger.error(f"OpenAI API error: {response.status}")
                     return None
         except Exception as e:
+            self.api_errors.inc(api='openai_chat')
             logger.error(f"Error generating AI response: {e}")
             return None
     
+    async def stream_ai_response(self, channel_id: str,
+                                 completed: Optional[asyncio.Event] = None) -> AsyncIterator[str]:
+        """Yield content deltas from a streamed OpenAI chat completion (completed is set at [DONE])"""
+        started = time.perf_counter()
+        try:
+            payload = self.build_chat_payload(channel_id, stream=True)
+            
+            # No overall deadline on a stream, only on the gap between chunks
+            async with self.openai_http.request(
+                'POST',
+                f'{self.openai_base_url}/chat/completions',
+                tokens=self.chat_tokens(payload),
+                limiter=self.chat_limiter,
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=self.openai_timeout),
+                json=payload
+            ) as response:
+                self.api_responses.inc(api='openai_chat', status=response.status)
+                if response.status != 200:
+                    logger.error(f"OpenAI API error: {response.status}")
+                    return
+                
+                # Server-sent events: one "data: {...}" line per chunk
+                first_token = True
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8').strip()
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        if completed is not None:
+                            completed.set()
+                        return
+                    choices = json.loads(data).get('choices') or [{}]
+                    delta = choices[0].get('delta', {}).get('content')
+                    if delta:
+                        if first_token:
+                            self.stage_seconds.observe(time.perf_counter() - started, stage='llm_first_token')
+                            first_token = False
+                        yield delta
+        except Exception as e:
+            self.api_errors.inc(api='openai_chat')
+            logger.error(f"Error streaming AI response: {e}")
+    
+    @timed('llm_tts_stream')
+    async def respond_streaming_steps(self, channel_id: str, user_input: str) -> Optional[str]:
+        """Streamed response as two steps: THINKING until the first sentence is queued
+        for speech, then SPEAKING (each under its own timeout)"""
+        speaking = asyncio.Event()
+        response = asyncio.ensure_future(self.respond_streaming(channel_id, user_input, speaking))
+        
+        async def until_speaking():
+            waiter = asyncio.ensure_future(speaking.wait())
+            try:
+                await asyncio.wait({response, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+        
+        try:
+            await self.run_step(channel_id, TurnState.THINKING, until_speaking())
+            if not response.done() and speaking.is_set():
+                # Cancelling the SPEAKING step (timeout, DTMF) cancels the response
+                return await self.run_step(channel_id, TurnState.SPEAKING, response)
+            if response.done() and not response.cancelled():
+                return response.result()
+            return None
+        finally:
+            if not response.done():
+                response.cancel()
+                await asyncio.gather(response, return_exceptions=True)
+    
+    async def respond_streaming(self, channel_id: str, user_input: str,
+                                speaking: Optional[asyncio.Event] = None) -> Optional[str]:
+        """Speak the AI response sentence by sentence while it is still being generated"""
+        chunker = SentenceChunker()
+        speech_queue: asyncio.Queue = asyncio.Queue()
+        player = asyncio.create_task(self.play_speech_queue(channel_id, speech_queue))
+        parts = []
+        started = time.perf_counter()
+        generation_seconds = 0.0
+        completed = asyncio.Event()
+        
+        def synthesize(sentence: str):
+            # TTS for each sentence starts immediately; playback order is the queue order
+            speech_queue.put_nowait(asyncio.create_task(self.get_speech_file(sentence)))
+            if speaking is not None:
+                speaking.set()
+        
+        deltas = self.stream_ai_response(channel_id, completed)
+        try:
+            async for delta in deltas:
+                if player.done():
+                    # Caller barged in: stop generating and synthesizing
+                    break
+                parts.append(delta)
+                for sentence in chunker.feed(delta):
+                    synthesize(sentence)
+            else:
+                generation_seconds = time.perf_counter() - started
+                tail = chunker.flush()
+                if tail:
+                    synthesize(tail)
+                speech_queue.put_nowait(None)
+            await player
+        finally:
+            # Closes the completion stream early after a barge-in
+            await deltas.aclose()
+            if not player.done():
+                player.cancel()
+            while not speech_queue.empty():
+                pending = speech_queue.get_nowait()
+                if pending is not None:
+                    pending.cancel()
+        
+        ai_response = ''.join(parts).strip()
+        if not ai_response:
+            return None
+        
+        logger.info(f"Spoke streamed response to {channel_id}: {ai_response[:50]}...")
+        if completed.is_set():
+            # Only whole responses are reused, not ones cut short by a barge-in or an error
+            self.cache_response(channel_id, user_input, ai_response, generation_seconds)
+        
+        # Extract lead qualification data from the full response
+        await self.extract_lead_data(channel_id, user_input, ai_response)
+        return ai_response
+    
+    async def play_speech_queue(self, channel_id: str, speech_queue: asyncio.Queue):
+        """Play synthesized sentences in order as their TTS completes"""
+        while True:
+            synthesis = await speech_queue.get()
+            if synthesis is None:
+                return
+            try:
+                audio_file = await synthesis
+                if audio_file and not await self.play_audio(channel_id, audio_file):
+                    vad = self.caller_vad(channel_id)
+                    if vad is not None and vad.in_speech:
+                        # Barge-in: drop the rest of the response
+                        return
+            except asyncio.CancelledError:
+                synthesis.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Error playing streamed speech: {e}")
+    
+    def conversation_stage(self, record: CallRecord) -> str:
+        """The qualification question a call is on: its first lead field still unknown"""
+        for field in QUALIFICATION_FIELDS:
+            if not record.lead_data.get(field):
+                return field
+        return 'qualified'
+    
+    def lookup_response(self, channel_id: str, transcript: str) -> Optional['CachedResponse']:
+        """Cached answer to this question at the call's current stage, if caching is on"""
+        record = self.active_calls.get(channel_id)
+        if self.response_cache is None or record is None:
+            return None
+        return self.response_cache.get(transcript, self.conversation_stage(record))
+    
+    def cache_response(self, channel_id: str, user_input: str, ai_response: str, seconds: float):
+        """Remember a generated answer (call before lead extraction moves the stage on)"""
+        record = self.active_calls.get(channel_id)
+        if self.response_cache is None or record is None:
+            return
+        self.response_cache.put(user_input, self.conversation_stage(record), ai_response, seconds)
+    
+    async def speak_cached_response(self, channel_id: str, user_input: str, cached: 'CachedResponse') -> str:
+        """SPEAKING for a cache hit: play the stored answer, reusing its synthesized audio"""
+        logger.info(f"Response cache hit on {channel_id} ({cached.stage}, saved {cached.cost:.2f}s): "
+                    f"{cached.response[:50]}...")
+        if self.stream_responses:
+            # Same sentence split as when it was streamed, so every sentence is a TTS cache hit
+            chunker = SentenceChunker()
+            sentences = chunker.feed(cached.response)
+            tail = chunker.flush()
+            if tail:
+                sentences.append(tail)
+            speech_queue: asyncio.Queue = asyncio.Queue()
+            for sentence in sentences:
+                speech_queue.put_nowait(asyncio.create_task(self.get_speech_file(sentence)))
+            speech_queue.put_nowait(None)
+            try:
+                await self.play_speech_queue(channel_id, speech_queue)
+            finally:
+                while not speech_queue.empty():
+                    pending = speech_queue.get_nowait()
+                    if pending is not None:
+                        pending.cancel()
+        else:
+            await self.speak(channel_id, cached.response)
+        
+        await self.extract_lead_data(channel_id, user_input, cached.response)
+        return cached.response
+    
+    async def summarize_context(self, channel_id: str):
+        """Fold older turns of a call into its running summary (off the critical path)"""
+        if channel_id not in self.active_calls:
+            return
+        
+        record = self.active_calls[channel_id]
+        context = record.context
+        folded = context.pending_for_summary(record.conversation_history)
+        if not folded:
+            return
+        
+        context.summarizing = True
+        try:
+            transcript = '\n'.join(f"{m['role']}: {m['content']}" for m in folded)
+            prompt = (
+                "Update the running summary of a phone call between an investment advisor "
+                "assistant and a caller. Keep every fact the caller gave and any open questions. "
+                "Reply with the summary only, in at most 80 words.\n\n"
+                f"Current summary: {context.summary or '(none)'}\n\n"
+                f"New exchanges:\n{transcript}"
+            )
+            
+            payload = {
+                'model': self.summary_model,
+                'messages': [{'role': 'user', 'content': prompt}],
+                'max_tokens': 150,
+                'temperature': 0
+            }
+            
+            async with self.openai_http.request(
+                'POST',
+                f'{self.openai_base_url}/chat/completions',
+                tokens=self.chat_tokens(payload),
+                limiter=self.chat_limiter,
+                json=payload
+            ) as response:
+                self.api_responses.inc(api='openai_chat', status=response.status)
+                if response.status != 200:
+                    logger.error(f"OpenAI summary error: {response.status}")
+                    return
+                data = await response.json()
+                summary = data['choices'][0]['message']['content']
+            
+            context.apply_summary(summary, len(folded))
+            self.call_store.put(record)
+            logger.info(f"Summarized {len(folded)} messages on {channel_id} "
+                        f"({context.window_tokens()} tokens in context)")
+        except Exception as e:
+            self.api_errors.inc(api='openai_chat')
+            logger.error(f"Error summarizing conversation: {e}")
+        finally:
+            context.summarizing = False
+    
     async def extract_lead_data(self, channel_id: str, user_input: str, ai_response: str):
         """Extract and update lead qualification data"""
         if channel_id not in self.active_calls:
             return
         
-        lead_data = self.active_calls[channel_id]['lead_data']
-        user_lower = user_input.lower()
-        
-        # Simple keyword extraction (in production, use NLP)
-        if any(word in user_lower for word in ['stock', 'equity', 'shares']):
-            lead_data['investment_interest'] = 'stocks'
-        elif any(word in user_lower for word in ['bond', 'fixed income']):
-            lead_data['investment_interest'] = 'bonds'
-        elif any(word in user_lower for word in ['real estate', 'property', 'reits']):
-            lead_data['investment_interest'] = 'real_estate'
-        elif any(word in user_lower for word in ['crypto', 'bitcoin', 'ethereum']):
-            lead_data['investment_interest'] = 'cryptocurrency'
-        
-        # Extract investment amount mentions
-        import re
-        amounts = re.findall(r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:k|thousand|million)?', user_lower)
-        if amounts:
-            lead_data['investment_amount'] = amounts[0]
-        
-        # Risk tolerance
-        if any(word in user_lower for word in ['conservative', 'safe', 'low risk']):
-            lead_data['risk_tolerance'] = 'conservative'
-        elif any(word in user_lower for word in ['aggressive', 'high risk', 'growth']):
-            lead_data['risk_tolerance'] = 'aggressive'
-        elif any(word in user_lower for word in ['moderate', 'balanced']):
-            lead_data['risk_tolerance'] = 'moderate'
+        record = self.active_calls[channel_id]
+        lead_data = record.lead_data
+        
+        # Keywords and amounts in a single compiled pass over the utterance
+        result = self.lead_extractor.extract(user_input)
+        self.lead_extractor.apply(lead_data, result)
         
         # Qualify lead
-        if (lead_data['investment_interest'] and 
-            lead_data['investment_amount'] and 
-            lead_data['risk_tolerance']):
+        if is_qualified(lead_data):
             lead_data['qualified'] = True
+        self.call_store.put(record)
     
     def should_continue_conversation(self, channel_id: str) -> bool:
         """Determine if conversation should continue"""
         if channel_id not in self.active_calls:
             return False
         
-        call_data = self.active_calls[channel_id]
-        conversation_length = len(call_data['conversation_history'])
-        lead_qualified = call_data['lead_data']['qualified']
+        record = self.active_calls[channel_id]
+        conversation_length = len(record.conversation_history)
+        lead_qualified = record.lead_data['qualified']
         
         # Continue if not qualified and conversation is less than 10 exchanges
         return not lead_qualified and conversation_length < 20
@@ -479,96 +1860,227 @@ class AICallCenterAgent:
         logger.info(f"Ending call on channel {channel_id}")
         
         if channel_id in self.active_calls:
-            lead_data = self.active_calls[channel_id]['lead_data']
+            lead_data = self.active_calls[channel_id].lead_data
             
             # Closing message
-            if lead_data['qualified']:
-                closing = (
-                    "Thank you so much for sharing that information! "
-                    "You sound like a great fit for our services. "
-                    "I'll have one of our senior advisors give you a call within 24 hours "
-                    "to discuss your investment options in detail. "
-                    "Have a wonderful day!"
-                )
-            else:
-                closing = (
-                    "Thank you for your time today. "
-                    "If you'd like to learn more about our investment services, "
-                    "feel free to call us back anytime. Have a great day!"
-                )
+            closing = CLOSING_QUALIFIED if lead_data['qualified'] else CLOSING_UNQUALIFIED
             
-            await self.speak(channel_id, closing)
-            await asyncio.sleep(2)
+            await self.run_step(channel_id, TurnState.SPEAKING, self.speak(channel_id, closing))
         
         # Hang up
         await self.ari_request('DELETE', f'/channels/{channel_id}')
     
     async def save_lead_data(self, lead_data: Dict[str, Any]):
-        """Save lead data to file/database"""
+        """Queue lead data for the background lead writer"""
         try:
-            # Save to JSON file (in production, save to database)
-            leads_file = 'leads_data.json'
-            leads = []
-            
-            if os.path.exists(leads_file):
-                with open(leads_file, 'r') as f:
-                    leads = json.load(f)
-            
-            leads.append(lead_data)
-            
-            with open(leads_file, 'w') as f:
-                json.dump(leads, f, indent=2)
-            
+            self.lead_sink.submit(lead_data)
             logger.info(f"Lead data saved: {lead_data['caller_number']} - Qualified: {lead_data['qualified']}")
         except Exception as e:
             logger.error(f"Error saving lead data: {e}")
     
+    @timed('ari_request')
     async def ari_request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None):
         """Make ARI HTTP request"""
         url = f"{self.ari_url}/ari{endpoint}"
         
         try:
-            async with self.session.request(
+            async with self.ari_http.request(
                 method,
                 url,
                 params=params,
                 json=data
             ) as response:
-                if response.status in [200, 204]:
-                    return await response.json() if response.status == 200 else None
+                self.api_responses.inc(api='ari', status=response.status)
+                if response.status in [200, 201, 204]:
+                    return await response.json() if response.status != 204 else None
                 else:
                     logger.error(f"ARI request failed: {response.status}")
                     return None
         except Exception as e:
+            self.api_errors.inc(api='ari')
             logger.error(f"Error in ARI request: {e}")
             return None
     
     async def cleanup(self):
-        """Cleanup resources"""
+        """Cleanup resources (only the first call does anything)"""
+        if self.cleaned_up:
+            return
+        self.cleaned_up = True
         logger.info("Cleaning up...")
         
-        # Hangup active calls
-        for channel_id in list(self.active_calls.keys()):
-            try:
-                await self.ari_request('DELETE', f'/channels/{channel_id}')
-            except:
-                pass
+        # Stop conversations and channel workers
+        tasks = [*self.call_tasks.values(), *self.channel_workers.values(), *self.background_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Hangup active calls; they will not be resumed
+        await self.hangup_calls()
+        for channel_id in self.active_calls:
+            self.call_store.delete(channel_id)
+        self.active_calls.clear()
+        
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+            self.metrics_runner = None
+        
+        # Close HTTP pools
+        for client in self.http_clients:
+            await client.close()
         
-        # Close session
-        if self.session:
-            await self.session.close()
+        self.stt_executor.shutdown(wait=False, cancel_futures=True)
+        
+        # Flush queued leads, call state and capture records
+        await self.lead_sink.close()
+        await self.call_store.close()
+        if self.call_capture is not None:
+            await self.call_capture.close()
         
         logger.info("Cleanup complete")
     
+    async def hangup_calls(self):
+        """Hang up every active call at once"""
+        channel_ids = list(self.active_calls)
+        await asyncio.gather(
+            *(self.ari_request('DELETE', f'/channels/{channel_id}') for channel_id in channel_ids),
+            return_exceptions=True
+        )
+    
+    def request_drain(self):
+        """Start draining (SIGTERM, POST /drain or the supervisor); repeated requests are ignored"""
+        if self.drain_task is None:
+            self.drain_task = self.spawn(self.drain())
+    
+    async def drain(self):
+        """Stop taking calls, let calls in progress finish, then stop the agent"""
+        self.draining = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.drain_timeout
+        logger.info(f"Draining: {len(self.active_calls)} calls in progress, "
+                    f"waiting up to {self.drain_timeout:.0f}s")
+        
+        # Callers still waiting for a call slot go to overflow right away
+        waiting = [channel_id for channel_id, record in self.active_calls.items() if not record.admitted]
+        await asyncio.gather(*(self.reject_call(channel_id, 'draining') for channel_id in waiting))
+        
+        while self.active_calls and loop.time() < deadline:
+            await asyncio.sleep(0.5)
+        
+        if self.active_calls:
+            logger.warning(f"Drain deadline reached, hanging up {len(self.active_calls)} calls")
+            await self.hangup_calls()
+            # Give the StasisEnd events a moment so their leads are saved
+            grace = loop.time() + 5
+            while self.active_calls and loop.time() < grace:
+                await asyncio.sleep(0.1)
+        
+        logger.info("Drain complete")
+        self.stop()
+    
+    async def handle_drain(self, request: web.Request) -> web.Response:
+        """POST /drain: begin a graceful drain"""
+        self.request_drain()
+        return web.json_response(
+            {'draining': True, 'active_calls': len(self.active_calls), 'drain_timeout': self.drain_timeout},
+            status=202
+        )
+    
     def stop(self):
         """Stop the agent"""
         logger.info("Stopping AI Call Center Agent...")
         self.running = False
 
 
-async def main():
+def configure_logging(settings: Settings, log_file: Optional[str] = None):
+    """Queue-based logging from the LOG_* settings; flushed when the process exits"""
+    listener = setup_logging(
+        level=settings.log_level,
+        log_format=settings.log_format,
+        path=log_file or settings.log_file,
+        rotate=settings.log_rotate,
+        max_bytes=settings.log_max_mb * 1024 * 1024,
+        backup_count=settings.log_backups,
+        when=settings.log_rotate_when,
+        sampling=settings.log_sampling,
+        queue_size=settings.log_queue_size
+    )
+    atexit.register(listener.stop)
+
+
+def run_worker_process(index: int, count: int, supervisor_socket: socket.socket):
+    """Entry point of a worker process (WORKERS > 1)"""
+    # The environment (including .env) is inherited and was validated by the supervisor
+    settings = Settings.from_env()
+    
+    # One log file per worker: rotation is not safe with several writers
+    base, ext = os.path.splitext(settings.log_file)
+    configure_logging(settings, f"{base}.worker{index}{ext}")
+    
+    # Workers get their own JSONL files (leads, capture) and metrics port; SQLite is safe to share
+    if settings.lead_store == 'jsonl':
+        base, ext = os.path.splitext(settings.lead_store_path)
+        settings = dataclasses.replace(settings, lead_store_path=f"{base}.worker{index}{ext}")
+    # The TTS cache index is per process, so each worker caches in its own directory
+    settings = dataclasses.replace(settings, tts_cache_dir=os.path.join(settings.tts_cache_dir, f"worker{index}"))
+    if settings.call_capture_path:
+        base, ext = os.path.splitext(settings.call_capture_path)
+        settings = dataclasses.replace(settings, call_capture_path=f"{base}.worker{index}{ext}")
+    if settings.metrics_port:
+        settings = dataclasses.replace(settings, metrics_port=settings.metrics_port + 1 + index)
+    
+    # Ctrl+C reaches the whole process group; the supervisor decides when we stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(run_worker(settings, index, count, supervisor_socket))
+
+
+async def run_worker(settings: Settings, index: int, count: int, supervisor_socket: socket.socket):
+    agent = AICallCenterAgent(settings)
+    agent.worker_index = index
+    agent.worker_count = count
+    agent.supervisor_socket = supervisor_socket
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, agent.request_drain)
+    # start() cleans up (hangs up this worker's calls, flushes leads) on exit
+    await agent.start()
+
+
+async def run_supervisor(settings: Settings):
+    """Multi-process mode: shard calls across worker processes"""
+    supervisor = WorkerSupervisor(
+        run_worker_process,
+        settings.workers,
+        ari_events_url(
+            settings.ari_url,
+            settings.ari_app,
+            settings.ari_username,
+            settings.ari_password
+        ),
+        ping_interval=settings.ws_ping_interval,
+        ping_timeout=settings.ws_ping_timeout,
+        backoff_base=settings.ws_backoff_base,
+        backoff_max=settings.ws_backoff_max,
+        health_interval=settings.worker_health_interval,
+        health_timeout=settings.worker_health_timeout,
+        drain_timeout=settings.drain_timeout,
+        max_pending_bytes=settings.worker_max_pending_mb * 1024 * 1024,
+        metrics_host=settings.metrics_host,
+        metrics_port=settings.metrics_port
+    )
+    
+    # SIGTERM drains (a second one stops at once); SIGINT stops at once
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, supervisor.drain)
+    loop.add_signal_handler(signal.SIGINT, supervisor.stop)
+    
+    await supervisor.run()
+
+
+async def main(settings: Settings):
     """Main entry point"""
-    agent = AICallCenterAgent()
+    if settings.workers > 1:
+        await run_supervisor(settings)
+        return
+    
+    agent = AICallCenterAgent(settings)
     
     # Setup signal handlers
     loop = asyncio.get_event_loop()
@@ -577,8 +2089,16 @@ async def main():
         logger.info("Received shutdown signal")
         agent.stop()
     
-    for sig in (signal.SIGTERM, signal.SIGINT):
-        loop.add_signal_handler(sig, signal_handler)
+    def drain_handler():
+        # A second SIGTERM while draining stops right away
+        if agent.draining:
+            signal_handler()
+        else:
+            logger.info("Received SIGTERM, draining calls")
+            agent.request_drain()
+    
+    loop.add_signal_handler(signal.SIGTERM, drain_handler)
+    loop.add_signal_handler(signal.SIGINT, signal_handler)
     
     try:
         await agent.start()
@@ -587,13 +2107,24 @@ async def main():
     except Exception as e:
         logger.error(f"Fatal error: {e}")
     finally:
+        # start() cleans up after itself; this covers a failure before it got that far
         await agent.cleanup()
 
 
 if __name__ == '__main__':
+    from dotenv import load_dotenv
+    
+    # Load environment variables, then fail fast on invalid configuration
+    load_dotenv()
+    try:
+        settings = Settings.from_env()
+    except SettingsError as e:
+        raise SystemExit(str(e))
+    
+    configure_logging(settings)
     print("=" * 60)
     print("AI Call Center Agent - Investment Advisor")
     print("=" * 60)
     print()
     
-    asyncio.run(main())
+    asyncio.run(main(settings))
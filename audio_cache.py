@@ -0,0 +1,211 @@
+"""
+Synthesized Audio Cache
+
+Content-addressed cache for TTS output keyed by text, voice, model and format.
+Entries are files Asterisk can play directly, kept under a disk budget with
+least recently used files removed first, so fixed prompts and repeated
+phrases are synthesized once. A small in-memory LRU tier (bounded by bytes,
+pinned prompts such as the greeting evicted last) keeps the audio of hot
+prompts, so a file pruned from disk or cleared from tmpfs is rewritten
+without another TTS request. Playback always goes through a file, so the
+memory tier never serves audio directly. Each process needs its own
+directory: the index only knows the files this process wrote or found at
+startup.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Dict, Callable, Awaitable, Set
+
+logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """On-disk cache of synthesized audio, backed by a bounded memory tier"""
+
+    def __init__(self, directory: str, max_disk_bytes: int = 512 * 1024 * 1024,
+                 max_memory_bytes: int = 8 * 1024 * 1024, extension: str = 'wav'):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.extension = extension
+
+        self.memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.memory_bytes = 0
+        self.files: 'OrderedDict[str, int]' = OrderedDict()
+        self.disk_bytes = 0
+        self.pinned: Set[str] = set()
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        # Files rewritten from the memory tier instead of synthesized
+        self.memory_hits = 0
+        self.misses = 0
+        # Indexed files that had disappeared when they were needed
+        self.missing = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.load_index()
+
+    @staticmethod
+    def make_key(text: str, voice: str, model: str, audio_format: str) -> str:
+        """Content address for a synthesized utterance"""
+        material = '\0'.join((model, voice, audio_format, text))
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def load_index(self):
+        """Index files left by previous runs, oldest first"""
+        suffix = f".{self.extension}"
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(suffix)], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self.files[key] = size
+            self.disk_bytes += size
+
+        if entries:
+            logger.info(f"Audio cache: {len(entries)} files ({self.disk_bytes} bytes) in {self.directory}")
+
+    def path_for(self, key: str) -> str:
+        """Path of the on-disk entry for a key"""
+        return os.path.join(self.directory, f"{key}.{self.extension}")
+
+    def pin(self, key: str):
+        """Keep a key on disk regardless of the disk budget, and in memory longest (fixed prompts)"""
+        self.pinned.add(key)
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        """Audio bytes from the memory tier, refreshing its LRU position"""
+        audio = self.memory.get(key)
+        if audio is not None:
+            self.memory.move_to_end(key)
+        return audio
+
+    def remember(self, key: str, audio: bytes):
+        """Insert into the memory tier, evicting unpinned then pinned entries, least recently used first"""
+        if len(audio) > self.max_memory_bytes:
+            return
+        previous = self.memory.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self.memory[key] = audio
+        self.memory_bytes += len(audio)
+
+        if self.memory_bytes <= self.max_memory_bytes:
+            return
+        victims = ([other for other in self.memory if other not in self.pinned and other != key]
+                   + [other for other in self.memory if other in self.pinned and other != key])
+        for victim in victims:
+            if self.memory_bytes <= self.max_memory_bytes:
+                break
+            self.memory_bytes -= len(self.memory.pop(victim))
+
+    async def get_file(self, key: str, synthesize: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[str]:
+        """Path of a playable file for key, synthesizing and storing it on a miss"""
+        if key in self.files:
+            path = self.path_for(key)
+            if os.path.exists(path):
+                self.files.move_to_end(key)
+                self.hits += 1
+                return path
+            # Removed behind our back (tmpfs cleared, manual cleanup): never hand
+            # Asterisk a missing file, synthesize it again
+            self.missing += 1
+            self.forget_file(key)
+
+        # Concurrent misses for the same audio share a single synthesis
+        pending = self.inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            audio = self.get_memory(key)
+            if audio is not None:
+                self.memory_hits += 1
+            else:
+                self.misses += 1
+                audio = await synthesize()
+            path = await self.put(key, audio) if audio else None
+            future.set_result(path)
+            return path
+        finally:
+            # If the owner failed or was cancelled (caller hung up), waiters get no audio
+            if not future.done():
+                future.set_result(None)
+            self.inflight.pop(key, None)
+
+    async def put(self, key: str, audio: bytes) -> str:
+        """Store audio in both tiers and return the file path"""
+        self.remember(key, audio)
+
+        path = self.path_for(key)
+        await asyncio.to_thread(self.write_file, path, audio)
+
+        if key not in self.files:
+            self.disk_bytes += len(audio)
+        else:
+            self.disk_bytes += len(audio) - self.files[key]
+        self.files[key] = len(audio)
+        self.files.move_to_end(key)
+
+        await self.prune_disk(keep=key)
+        return path
+
+    async def prune_disk(self, keep: Optional[str] = None):
+        """Delete least recently used unpinned files until under the disk budget"""
+        victims = []
+        for key in self.files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            if key in self.pinned or key == keep:
+                continue
+            victims.append(key)
+            self.disk_bytes -= self.files[key]
+
+        for key in victims:
+            del self.files[key]
+        if victims:
+            await asyncio.to_thread(self.remove_files, [self.path_for(key) for key in victims])
+
+    def forget_file(self, key: str):
+        """Drop a disk index entry whose file has gone missing"""
+        size = self.files.pop(key, None)
+        if size is not None:
+            self.disk_bytes -= size
+
+    @staticmethod
+    def write_file(path: str, audio: bytes):
+        # Write then rename so Asterisk never plays a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def remove_files(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and size"""
+        return {
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'misses': self.misses,
+            'missing': self.missing,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory_bytes,
+            'disk_entries': len(self.files),
+            'disk_bytes': self.disk_bytes,
+        }
@@ -0,0 +1,92 @@
+"""
+Audio Conversion
+
+Converts synthesized speech to Asterisk's native 8 kHz signed linear format
+(raw little-endian 16-bit mono, ``.sln``) so Asterisk plays it without
+transcoding. OpenAI's ``pcm`` response format is raw 24 kHz 16-bit PCM; it
+is low-pass filtered and decimated with NumPy. WAV input is accepted too.
+"""
+
+import functools
+import io
+import wave
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+
+ASTERISK_SAMPLE_RATE = 8000
+OPENAI_PCM_SAMPLE_RATE = 24000
+FILTER_TAPS = 63
+
+
+@functools.lru_cache(maxsize=8)
+def lowpass_taps(cutoff: float, taps: int = FILTER_TAPS) -> np.ndarray:
+    """Windowed-sinc low-pass FIR; cutoff is a fraction of the input sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def read_pcm16(audio: bytes, default_rate: int = OPENAI_PCM_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """Samples and sample rate of raw 16-bit PCM or a 16-bit mono WAV file"""
+    if audio[:4] == b'RIFF':
+        with wave.open(io.BytesIO(audio), 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"Unsupported WAV sample width: {wav.getsampwidth()}")
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+            if wav.getnchannels() > 1:
+                samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1)
+            return samples, wav.getframerate()
+    return np.frombuffer(audio[:len(audio) & ~1], dtype='<i2'), default_rate
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Resample 16-bit samples, filtering first when the rate goes down"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+
+    signal = samples.astype(np.float32)
+    if dst_rate > src_rate:
+        positions = np.arange(0, len(signal) - 1, src_rate / dst_rate)
+        return np.interp(positions, np.arange(len(signal)), signal)
+
+    # Keep just under the new Nyquist frequency to avoid aliasing
+    taps = lowpass_taps(0.45 * dst_rate / src_rate)
+    padded = np.pad(signal, (len(taps) // 2, len(taps) // 2))
+
+    if dst_rate == gcd(src_rate, dst_rate):
+        # Integer decimation (24 kHz -> 8 kHz): filter only the samples that are kept
+        windows = np.lib.stride_tricks.sliding_window_view(padded, len(taps))[::src_rate // dst_rate]
+        return windows @ taps[::-1]
+
+    filtered = np.convolve(signal, taps, mode='same')
+    positions = np.arange(0, len(filtered) - 1, src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(filtered)), filtered)
+
+
+def to_slin(audio: bytes, src_rate: int = OPENAI_PCM_SAMPLE_RATE,
+            dst_rate: int = ASTERISK_SAMPLE_RATE) -> bytes:
+    """Convert TTS output (raw PCM or WAV) to raw 16-bit little-endian PCM at dst_rate"""
+    samples, rate = read_pcm16(audio, src_rate)
+    converted = resample(samples, rate, dst_rate)
+    return np.clip(np.round(converted), -32768, 32767).astype('<i2').tobytes()
+
+
+def benchmark(seconds: float = 10.0, runs: int = 20):
+    """Print conversion time for a clip of synthetic 24 kHz speech-band audio"""
+    import time
+
+    t = np.arange(int(seconds * OPENAI_PCM_SAMPLE_RATE)) / OPENAI_PCM_SAMPLE_RATE
+    clip = (8000 * np.sin(2 * np.pi * 220 * t) + 2000 * np.sin(2 * np.pi * 5000 * t)).astype('<i2').tobytes()
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        to_slin(clip)
+    elapsed = (time.perf_counter() - started) / runs
+    print(f"{seconds:.0f}s of 24 kHz PCM -> 8 kHz slin: {elapsed * 1000:.2f} ms "
+          f"({seconds / elapsed:,.0f}x real time)")
+
+
+if __name__ == '__main__':
+    benchmark()
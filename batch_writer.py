@@ -0,0 +1,82 @@
+"""
+Batch Writer
+
+Shared base for the stores that persist off the event loop (lead sinks, call
+state). Callers only hand records over; a writer task groups them into
+batches and writes each batch on one dedicated thread, so file handles and
+database connections are only ever touched from that thread. Subclasses
+decide how records are collected (write_loop) and how to persist a batch
+(write_batch).
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Writer task + single writer thread with start/close lifecycle"""
+
+    # What a batch holds, for log messages
+    record_name = 'records'
+
+    def __init__(self):
+        self.writer: Optional[asyncio.Task] = None
+        # One thread per store keeps file handles / connections single-threaded
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+        self.written = 0
+        self.closed = False
+
+    async def start(self):
+        """Open the backend and start the writer task"""
+        await self.run_blocking(self.open)
+        self.writer = asyncio.create_task(self.write_loop())
+
+    async def write(self, count: int, *batch):
+        """Write one batch of count records, logging rather than losing the writer on errors"""
+        try:
+            await self.run_blocking(self.write_batch, *batch)
+            self.written += count
+            logger.debug(f"Wrote {count} {self.record_name}")
+        except Exception as e:
+            logger.error(f"Error writing {count} {self.record_name}: {e}")
+
+    async def close(self):
+        """Write everything handed over so far and close the backend"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer is not None:
+            await self.stop_writer()
+            self.writer = None
+        await self.drain()
+        await self.run_blocking(self.close_backend)
+        self.executor.shutdown(wait=True)
+
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def write_loop(self):
+        """Collect records into batches and write() them until closed"""
+        raise NotImplementedError
+
+    async def stop_writer(self):
+        """End the writer task on close (default: cancel it)"""
+        self.writer.cancel()
+        await asyncio.gather(self.writer, return_exceptions=True)
+
+    async def drain(self):
+        """Write whatever the stopped writer left behind"""
+
+    def open(self):
+        """Open the backend (runs on the writer thread)"""
+
+    def write_batch(self, *batch):
+        """Persist a batch (runs on the writer thread)"""
+        raise NotImplementedError
+
+    def close_backend(self):
+        """Close the backend (runs on the writer thread)"""
@@ -0,0 +1,107 @@
+"""
+Call Capture
+
+Append-only record of every conversation for offline replay and analytics
+(see call_replay.py). Each answered turn becomes one JSON line with the
+caller's transcript, the response, the seconds spent in each turn state and
+a snapshot of the lead fields known after it; a final line per call holds
+the saved lead and the call's duration. Lines are queued and written in
+batches by the same background writer as the JSONL lead store, with
+size-based rotation (capture.jsonl -> capture.jsonl.1 -> ...).
+"""
+
+import os
+from typing import Optional, Dict, Any, List, Iterator
+
+from lead_extraction import QUALIFICATION_FIELDS
+from lead_store import JsonlLeadSink
+
+CAPTURE_VERSION = 1
+
+# Record kinds
+TURN = 'turn'
+CALL = 'call'
+
+
+def lead_snapshot(lead_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the qualification fields that are known, to keep turn lines short"""
+    snapshot = {field_name: lead_data[field_name] for field_name in QUALIFICATION_FIELDS
+                if lead_data.get(field_name)}
+    if lead_data.get('qualified'):
+        snapshot['qualified'] = True
+    return snapshot
+
+
+class CallCapture:
+    """Queues turn and call records for the capture file"""
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, backup_count: int = 10,
+                 fsync: str = 'interval'):
+        self.path = path
+        self.sink = JsonlLeadSink(path, fsync=fsync, max_bytes=max_bytes, backup_count=backup_count)
+
+    async def start(self):
+        await self.sink.start()
+
+    async def close(self):
+        """Write everything captured so far"""
+        await self.sink.close()
+
+    def turn(self, channel_id: str, turn: int, transcript: str, response: Optional[str],
+             timings: Dict[str, float], lead_data: Dict[str, Any], timestamp: float):
+        """Capture one turn (response is None when the agent had no answer)"""
+        self.sink.submit({
+            'v': CAPTURE_VERSION,
+            'kind': TURN,
+            'call': channel_id,
+            'turn': turn,
+            'ts': round(timestamp, 3),
+            'text': transcript,
+            'reply': response,
+            'timings': {state: round(seconds, 4) for state, seconds in timings.items()},
+            'lead': lead_snapshot(lead_data),
+        })
+
+    def call(self, channel_id: str, turns: int, duration: float, lead_data: Dict[str, Any],
+             timestamp: float):
+        """Capture the end of a call with the lead as it was saved"""
+        self.sink.submit({
+            'v': CAPTURE_VERSION,
+            'kind': CALL,
+            'call': channel_id,
+            'ts': round(timestamp, 3),
+            'turns': turns,
+            'duration': round(duration, 3),
+            'lead': lead_data,
+        })
+
+    @property
+    def pending(self) -> int:
+        return self.sink.queue.qsize()
+
+
+def capture_files(path: str) -> List[str]:
+    """A capture file and its rotated backups, oldest first"""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    files = backups[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_batches(paths: List[str], batch_size: int = 2000) -> Iterator[List[str]]:
+    """Raw capture lines in batches, one file at a time (memory stays at one batch)"""
+    batch: List[str] = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,347 @@
+"""
+Call Replay
+
+Batch tool over call capture files (CALL_CAPTURE_PATH). Re-runs lead
+extraction on every captured turn with the current keyword table, folds the
+results per call the way the agent does, and reports the qualification
+funnel for the captured and the replayed leads side by side, plus turn
+latency percentiles per state.
+
+Capture lines are read in batches and parsed and extracted in worker
+processes; only a bounded number of batches is in flight and finished calls
+are reduced into NumPy arrays, so memory stays flat however large the
+capture is. Rotated backups of a capture file are read first, in order.
+
+    python3 call_replay.py capture.jsonl capture.worker1.jsonl --workers 4
+    python3 call_replay.py capture.jsonl --keywords lead_keywords.json --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from call_capture import CALL, TURN, capture_files, read_batches
+from lead_extraction import LeadExtractor, QUALIFICATION_FIELDS, is_qualified
+
+# Funnel columns: the fields in the order they are asked for, then qualified
+FUNNEL = QUALIFICATION_FIELDS + ('qualified',)
+CAPTURED, REPLAYED = 0, 1
+# Turns-to-qualify histogram; the last bin counts everything beyond it
+MAX_TURNS = 20
+# Investment amounts by order of magnitude
+AMOUNT_EDGES = np.array([1e3, 1e4, 1e5, 1e6, 1e7])
+AMOUNT_LABELS = ('<1k', '1k-10k', '10k-100k', '100k-1M', '1M-10M', '>=10M')
+# Log-spaced latency bins (seconds); percentiles are read off the histogram
+LATENCY_EDGES = np.geomspace(0.005, 600, 161)
+
+# Per-process extractor, built once by the pool initializer
+extractor: Optional[LeadExtractor] = None
+
+
+def init_worker(keywords_file: Optional[str]):
+    global extractor
+    extractor = LeadExtractor.from_file(keywords_file)
+
+
+def replay_batch(lines: List[str]) -> Tuple[List[tuple], Dict[str, np.ndarray], int]:
+    """Parse and re-extract a batch of capture lines (runs in a worker process)
+
+    Returns the events in file order, latency histograms per turn state and
+    the number of lines that could not be parsed.
+    """
+    events: List[tuple] = []
+    timings: Dict[str, List[float]] = {}
+    malformed = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+            kind = record['kind']
+            if kind == TURN:
+                updates: Dict[str, Any] = {}
+                extractor.apply(updates, extractor.extract(record.get('text') or ''))
+                events.append((TURN, record['call'], record['turn'], updates or None,
+                               bool(record.get('lead', {}).get('qualified'))))
+                for state, seconds in (record.get('timings') or {}).items():
+                    timings.setdefault(state, []).append(seconds)
+            elif kind == CALL:
+                events.append((CALL, record['call'], record.get('turns', 0), record.get('duration', 0.0),
+                               record.get('lead') or {}))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            malformed += 1
+
+    histograms = {
+        state: np.bincount(np.digitize(np.asarray(values, dtype=np.float64), LATENCY_EDGES),
+                           minlength=len(LATENCY_EDGES) + 1)
+        for state, values in timings.items()
+    }
+    return events, histograms, malformed
+
+
+@dataclass(slots=True)
+class ReplayedCall:
+    """A call whose end record has not been read yet"""
+    lead: Dict[str, Any] = field(default_factory=dict)
+    turns: int = 0
+    # First turn at which the lead was qualified (-1: not qualified)
+    qualified_turn: int = -1
+    captured_qualified_turn: int = -1
+
+
+class FunnelStats:
+    """Per-call rows buffered in fixed NumPy arrays and reduced chunk by chunk"""
+
+    def __init__(self, chunk_size: int = 65536):
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.flags = np.zeros((chunk_size, 2, len(FUNNEL)), dtype=bool)
+        self.qualified_turns = np.full((chunk_size, 2), -1, dtype=np.int32)
+        self.turns = np.zeros(chunk_size, dtype=np.int32)
+        self.durations = np.zeros(chunk_size, dtype=np.float64)
+        self.amounts = np.zeros(chunk_size, dtype=np.float64)
+
+        # Running totals
+        self.calls = 0
+        self.unfinished = 0
+        self.total_turns = 0
+        self.total_duration = 0.0
+        self.reached = np.zeros((2, len(FUNNEL)), dtype=np.int64)
+        self.funnel = np.zeros((2, len(QUALIFICATION_FIELDS)), dtype=np.int64)
+        self.gained = 0
+        self.lost = 0
+        self.turns_to_qualify = np.zeros((2, MAX_TURNS + 1), dtype=np.int64)
+        self.amount_counts = np.zeros(len(AMOUNT_EDGES) + 1, dtype=np.int64)
+
+    def add(self, captured: Dict[str, Any], call: ReplayedCall, turns: int, duration: float):
+        row = self.rows
+        for column, field_name in enumerate(FUNNEL):
+            self.flags[row, CAPTURED, column] = bool(captured.get(field_name))
+            self.flags[row, REPLAYED, column] = bool(call.lead.get(field_name))
+        self.qualified_turns[row] = (call.captured_qualified_turn, call.qualified_turn)
+        self.turns[row] = turns
+        self.durations[row] = duration
+        amount = call.lead.get('investment_amount')
+        self.amounts[row] = amount if isinstance(amount, (int, float)) else 0.0
+        self.rows += 1
+        if self.rows == self.chunk_size:
+            self.reduce()
+
+    def reduce(self):
+        """Fold the buffered rows into the totals"""
+        rows = self.rows
+        if not rows:
+            return
+        flags = self.flags[:rows]
+        self.calls += rows
+        self.total_turns += int(self.turns[:rows].sum())
+        self.total_duration += float(self.durations[:rows].sum())
+        self.reached += flags.sum(axis=0)
+        # A call is in the funnel at a field only if it got every earlier field too
+        self.funnel += np.logical_and.accumulate(flags[:, :, :len(QUALIFICATION_FIELDS)], axis=2).sum(axis=0)
+
+        qualified = flags[:, :, -1]
+        self.gained += int((~qualified[:, CAPTURED] & qualified[:, REPLAYED]).sum())
+        self.lost += int((qualified[:, CAPTURED] & ~qualified[:, REPLAYED]).sum())
+
+        for source in (CAPTURED, REPLAYED):
+            turns = self.qualified_turns[:rows, source]
+            turns = np.minimum(turns[turns >= 0], MAX_TURNS)
+            self.turns_to_qualify[source] += np.bincount(turns, minlength=MAX_TURNS + 1)
+
+        amounts = self.amounts[:rows]
+        self.amount_counts += np.bincount(np.digitize(amounts[amounts > 0], AMOUNT_EDGES),
+                                          minlength=len(AMOUNT_EDGES) + 1)
+        self.rows = 0
+
+    def summary(self) -> Dict[str, Any]:
+        self.reduce()
+        calls = max(self.calls, 1)
+
+        def median_turn(counts: np.ndarray) -> Optional[int]:
+            total = counts.sum()
+            if not total:
+                return None
+            return int(np.searchsorted(np.cumsum(counts), total / 2))
+
+        return {
+            'calls': self.calls,
+            'unfinished_calls': self.unfinished,
+            'mean_turns': round(self.total_turns / calls, 2),
+            'mean_duration': round(self.total_duration / calls, 2),
+            'fields': {
+                field_name: {
+                    'captured': int(self.reached[CAPTURED, column]),
+                    'replayed': int(self.reached[REPLAYED, column]),
+                }
+                for column, field_name in enumerate(FUNNEL)
+            },
+            'funnel': {
+                field_name: {
+                    'captured': int(self.funnel[CAPTURED, column]),
+                    'replayed': int(self.funnel[REPLAYED, column]),
+                }
+                for column, field_name in enumerate(QUALIFICATION_FIELDS)
+            },
+            'qualified_gained': self.gained,
+            'qualified_lost': self.lost,
+            'median_turns_to_qualify': {
+                'captured': median_turn(self.turns_to_qualify[CAPTURED]),
+                'replayed': median_turn(self.turns_to_qualify[REPLAYED]),
+            },
+            'amounts': dict(zip(AMOUNT_LABELS, (int(count) for count in self.amount_counts))),
+        }
+
+
+def latency_percentiles(counts: np.ndarray, percentiles=(50, 95, 99)) -> Dict[str, float]:
+    """Percentiles from a LATENCY_EDGES histogram (upper edge of the bin)"""
+    cumulative = np.cumsum(counts)
+    upper_edges = np.append(LATENCY_EDGES, np.inf)
+    bins = np.searchsorted(cumulative, cumulative[-1] * np.asarray(percentiles) / 100)
+    return {f'p{pct}': round(float(upper_edges[index]), 3) for pct, index in zip(percentiles, bins)}
+
+
+class Replay:
+    """Folds replayed turns into calls, in capture order"""
+
+    def __init__(self):
+        self.open_calls: Dict[str, ReplayedCall] = {}
+        self.stats = FunnelStats()
+        self.latency: Dict[str, np.ndarray] = {}
+        self.turns = 0
+        self.malformed = 0
+
+    def add_batch(self, events: List[tuple], histograms: Dict[str, np.ndarray], malformed: int):
+        self.malformed += malformed
+        for state, counts in histograms.items():
+            if state in self.latency:
+                self.latency[state] += counts
+            else:
+                self.latency[state] = counts
+
+        for event in events:
+            if event[0] == TURN:
+                _, channel_id, turn, updates, captured_qualified = event
+                self.turns += 1
+                call = self.open_calls.get(channel_id)
+                if call is None:
+                    call = self.open_calls[channel_id] = ReplayedCall()
+                call.turns = max(call.turns, turn)
+                # Same update the agent makes after each response
+                if updates:
+                    call.lead.update(updates)
+                if call.qualified_turn < 0 and is_qualified(call.lead):
+                    call.lead['qualified'] = True
+                    call.qualified_turn = turn
+                if captured_qualified and call.captured_qualified_turn < 0:
+                    call.captured_qualified_turn = turn
+            else:
+                _, channel_id, turns, duration, captured = event
+                call = self.open_calls.pop(channel_id, None) or ReplayedCall()
+                self.stats.add(captured, call, turns, duration)
+
+    def finish(self):
+        """Count calls whose end was never captured (agent crash, capture cut off)"""
+        for call in self.open_calls.values():
+            self.stats.unfinished += 1
+            self.stats.add({}, call, call.turns, 0.0)
+        self.open_calls.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        summary = self.stats.summary()
+        summary['turns'] = self.turns
+        summary['malformed_lines'] = self.malformed
+        summary['latency'] = {state: latency_percentiles(counts) for state, counts in sorted(self.latency.items())}
+        return summary
+
+
+def run_replay(paths: List[str], workers: int, batch_size: int, keywords_file: Optional[str]) -> Replay:
+    """Replay capture files with a pool of worker processes (0: in this process)"""
+    replay = Replay()
+    batches = read_batches(paths, batch_size)
+    if workers <= 0:
+        init_worker(keywords_file)
+        for lines in batches:
+            replay.add_batch(*replay_batch(lines))
+        replay.finish()
+        return replay
+
+    # Submit a few batches per worker ahead and consume results in order, so
+    # the file is never read faster than it is processed
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(keywords_file,)) as pool:
+        pending = deque()
+        for lines in batches:
+            pending.append(pool.submit(replay_batch, lines))
+            if len(pending) >= workers * 2:
+                replay.add_batch(*pending.popleft().result())
+        while pending:
+            replay.add_batch(*pending.popleft().result())
+    replay.finish()
+    return replay
+
+
+def print_report(summary: Dict[str, Any], elapsed: float):
+    calls = max(summary['calls'], 1)
+
+    def share(count: int) -> str:
+        return f"{count:>8} {count / calls:>6.1%}"
+
+    print(f"Calls: {summary['calls']} ({summary['unfinished_calls']} without an end record), "
+          f"turns: {summary['turns']}, malformed lines: {summary['malformed_lines']}")
+    print(f"Mean turns per call: {summary['mean_turns']}, mean duration: {summary['mean_duration']}s")
+    print(f"Replayed in {elapsed:.2f}s ({summary['turns'] / max(elapsed, 1e-9):,.0f} turns/s)")
+    print()
+    print(f"{'Funnel (all earlier fields too)':<34}{'captured':>15}{'replayed':>17}")
+    for field_name, counts in summary['funnel'].items():
+        print(f"  {field_name:<32}{share(counts['captured'])}  {share(counts['replayed'])}")
+    print(f"{'Field known':<34}{'captured':>15}{'replayed':>17}")
+    for field_name, counts in summary['fields'].items():
+        print(f"  {field_name:<32}{share(counts['captured'])}  {share(counts['replayed'])}")
+    print()
+    turns = summary['median_turns_to_qualify']
+    print(f"Qualified by replay but not captured: {summary['qualified_gained']}, "
+          f"captured but not by replay: {summary['qualified_lost']}")
+    print(f"Median turns to qualify: captured {turns['captured']}, replayed {turns['replayed']}")
+    print("Replayed amounts: " + ', '.join(f"{label} {count}" for label, count in summary['amounts'].items()))
+    if summary['latency']:
+        print()
+        print("Seconds per turn state (histogram estimate):")
+        for state, values in summary['latency'].items():
+            print(f"  {state:<14}" + '  '.join(f"{name} {value:.3f}" for name, value in values.items()))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay lead extraction over call capture files")
+    parser.add_argument('paths', nargs='+', help="capture files (rotated backups are included)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (0 runs in this process)")
+    parser.add_argument('--batch-size', type=int, default=2000, help="capture lines per batch")
+    parser.add_argument('--keywords', default=os.getenv('LEAD_KEYWORDS_FILE', ''),
+                        help="JSON keyword table (default: LEAD_KEYWORDS_FILE or the built-in table)")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    paths = [path for capture in args.paths for path in capture_files(capture)]
+    if not paths:
+        sys.exit(f"No capture files found: {', '.join(args.paths)}")
+
+    started = time.perf_counter()
+    replay = run_replay(paths, args.workers, args.batch_size, args.keywords or None)
+    summary = replay.summary()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
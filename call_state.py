@@ -0,0 +1,209 @@
+"""
+Call State Store
+
+Per-call state (conversation history, lead data, running summary) as a
+compact slotted record, plus stores that persist it outside the process.
+Updates only mark a record dirty; a writer task (batch_writer.py) flushes
+the latest version of each dirty call in batches on a dedicated thread, so a restarted worker
+(or another agent sharing the database) can pick a channel up
+mid-conversation. The in-memory store keeps the same interface without
+persistence, for single-process use and tests.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
+
+from batch_writer import BatchWriter
+from conversation_context import ConversationContext
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CallRecord:
+    """State of one call; everything but the context object is serialized"""
+    channel_id: str
+    caller_number: str
+    start_time: float
+    lead_data: Dict[str, Any]
+    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    # Set once the call holds a call slot and has been answered
+    admitted: bool = False
+    # TurnState value of the step in progress
+    state: str = ''
+    owner: str = ''
+    updated: float = 0.0
+    context: Optional[ConversationContext] = field(default=None, repr=False)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'channel_id': self.channel_id,
+            'caller_number': self.caller_number,
+            'start_time': self.start_time,
+            'lead_data': self.lead_data,
+            'conversation_history': self.conversation_history,
+            'admitted': self.admitted,
+            'state': self.state,
+            'owner': self.owner,
+            'updated': self.updated,
+            'summary': self.context.summary if self.context else '',
+            'summarized_count': self.context.summarized_count if self.context else 0,
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, data: str, token_budget: int = 1200, keep_recent: int = 4) -> 'CallRecord':
+        fields = json.loads(data)
+        summary = fields.pop('summary', '')
+        summarized_count = fields.pop('summarized_count', 0)
+        record = cls(**fields)
+        record.context = ConversationContext(token_budget, keep_recent)
+        if summary or summarized_count:
+            record.context.apply_summary(summary, summarized_count)
+        return record
+
+
+class CallStateStore(BatchWriter):
+    """Base class: dirty records are coalesced and written in batches"""
+
+    record_name = 'call records'
+
+    def __init__(self, flush_interval: float = 0.5, token_budget: int = 1200, keep_recent: int = 4):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        # Latest version of each changed call (None = delete), in change order
+        self.dirty: Dict[str, Optional[CallRecord]] = {}
+        self.wakeup = asyncio.Event()
+
+    def put(self, record: CallRecord):
+        """Mark a call as changed (never blocks; repeated updates coalesce)"""
+        record.updated = time.time()
+        self.dirty[record.channel_id] = record
+        self.wakeup.set()
+
+    def delete(self, channel_id: str):
+        """Forget a call once it has ended"""
+        self.dirty[channel_id] = None
+        self.wakeup.set()
+
+    async def load(self, channel_id: str) -> Optional[CallRecord]:
+        """A persisted call, e.g. one a crashed worker was handling"""
+        if channel_id in self.dirty:
+            return self.dirty[channel_id]
+        data = await self.run_blocking(self.read, channel_id)
+        if data is None:
+            return None
+        return CallRecord.from_json(data, self.token_budget, self.keep_recent)
+
+    async def write_loop(self):
+        """Flush dirty records at most every flush_interval seconds"""
+        while not self.closed:
+            await self.wakeup.wait()
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write the current dirty set"""
+        self.wakeup.clear()
+        if not self.dirty:
+            return
+        dirty, self.dirty = self.dirty, {}
+        # Serialize here: records keep changing on the event loop while the thread writes
+        upserts = [(channel_id, record.owner, record.updated, record.to_json())
+                   for channel_id, record in dirty.items() if record is not None]
+        deletes = [channel_id for channel_id, record in dirty.items() if record is None]
+        await self.write(len(dirty), upserts, deletes)
+
+    async def drain(self):
+        """Changes made since the last flush"""
+        await self.flush()
+
+    def read(self, channel_id: str) -> Optional[str]:
+        """Serialized record for a channel (runs on the writer thread)"""
+        raise NotImplementedError
+
+    def write_batch(self, upserts: List[Tuple[str, str, float, str]], deletes: List[str]):
+        """Persist a batch of records and deletions (runs on the writer thread)"""
+        raise NotImplementedError
+
+
+class MemoryCallStateStore(CallStateStore):
+    """Serialized records in a dict: same behaviour as the persistent stores, no disk"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.records: Dict[str, str] = {}
+
+    def read(self, channel_id: str) -> Optional[str]:
+        return self.records.get(channel_id)
+
+    def write_batch(self, upserts: List[Tuple[str, str, float, str]], deletes: List[str]):
+        for channel_id, _, _, data in upserts:
+            self.records[channel_id] = data
+        for channel_id in deletes:
+            self.records.pop(channel_id, None)
+
+
+class SqliteCallStateStore(CallStateStore):
+    """SQLite table of live calls in WAL mode, shared by the workers on a host"""
+
+    def __init__(self, path: str, max_age: float = 4 * 3600, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_age = max_age
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        self.connection = sqlite3.connect(self.path, timeout=10)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS calls ('
+            ' channel_id TEXT PRIMARY KEY,'
+            ' owner TEXT,'
+            ' updated REAL,'
+            ' data TEXT NOT NULL)'
+        )
+        # Calls that ended while no agent was around to delete them
+        with self.connection:
+            removed = self.connection.execute(
+                'DELETE FROM calls WHERE updated < ?', (time.time() - self.max_age,)
+            ).rowcount
+        if removed:
+            logger.info(f"Removed {removed} stale call records")
+
+    def read(self, channel_id: str) -> Optional[str]:
+        row = self.connection.execute('SELECT data FROM calls WHERE channel_id = ?', (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    def write_batch(self, upserts: List[Tuple[str, str, float, str]], deletes: List[str]):
+        with self.connection:
+            if upserts:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO calls (channel_id, owner, updated, data) VALUES (?, ?, ?, ?)',
+                    upserts
+                )
+            if deletes:
+                self.connection.executemany('DELETE FROM calls WHERE channel_id = ?',
+                                            [(channel_id,) for channel_id in deletes])
+
+    def close_backend(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def create_call_state_store(backend: str, path: str, **kwargs) -> CallStateStore:
+    """Build the configured call state store ('memory' or 'sqlite')"""
+    if backend == 'memory':
+        kwargs.pop('max_age', None)
+        return MemoryCallStateStore(**kwargs)
+    if backend == 'sqlite':
+        return SqliteCallStateStore(path, **kwargs)
+    raise ValueError(f"Unknown call state store backend: {backend}")
@@ -0,0 +1,102 @@
+"""
+Conversation Context
+
+Keeps the prompt sent to the LLM bounded. Token counts are tracked per
+message; once the recent window exceeds the budget, older turns are folded
+into a running summary (produced in the background) and known lead fields
+are sent as structured facts instead of the raw exchanges.
+"""
+
+from typing import Optional, Dict, Any, List
+
+# Chat APIs add a few tokens of framing per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+LEAD_FIELD_LABELS = {
+    'investment_interest': 'Investment interest',
+    'investment_amount': 'Investment amount',
+    'risk_tolerance': 'Risk tolerance',
+    'timeline': 'Timeline',
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)"""
+    return MESSAGE_OVERHEAD_TOKENS + (len(text) + 3) // 4
+
+
+def format_lead_facts(lead_data: Dict[str, Any]) -> Optional[str]:
+    """Structured summary of the lead fields gathered so far"""
+    facts = [
+        f"- {label}: {lead_data[field]}"
+        for field, label in LEAD_FIELD_LABELS.items()
+        if lead_data.get(field)
+    ]
+    if not facts:
+        return None
+    return "Details already collected from the caller (do not ask again):\n" + '\n'.join(facts)
+
+
+class ConversationContext:
+    """Token-budgeted view of a call's conversation_history"""
+
+    def __init__(self, token_budget: int = 1200, keep_recent: int = 4):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summary = ''
+        self.summary_tokens = 0
+        # conversation_history[:summarized_count] is represented by the summary
+        self.summarized_count = 0
+        self.token_counts: List[int] = []
+        self.summarizing = False
+
+    def sync(self, history: List[Dict[str, str]]):
+        """Count tokens for messages appended since the last call"""
+        for message in history[len(self.token_counts):]:
+            self.token_counts.append(estimate_tokens(message['content']))
+
+    def window_tokens(self) -> int:
+        """Tokens in the unsummarized part of the history"""
+        return self.summary_tokens + sum(self.token_counts[self.summarized_count:])
+
+    def needs_summary(self) -> bool:
+        """True when older turns should be folded into the summary"""
+        return (not self.summarizing
+                and self.window_tokens() > self.token_budget
+                and len(self.token_counts) - self.summarized_count > self.keep_recent)
+
+    def pending_for_summary(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Oldest unsummarized messages, leaving the most recent ones verbatim"""
+        end = max(self.summarized_count, len(history) - self.keep_recent)
+        return history[self.summarized_count:end]
+
+    def apply_summary(self, summary: str, folded_count: int):
+        """Replace the first folded_count unsummarized messages with the new summary"""
+        self.summary = summary.strip()
+        self.summary_tokens = estimate_tokens(self.summary) if self.summary else 0
+        self.summarized_count += folded_count
+
+    def build_messages(self, system_prompt: str, history: List[Dict[str, str]],
+                       lead_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """System prompt, lead facts, summary and as many recent messages as fit"""
+        self.sync(history)
+        messages = [{'role': 'system', 'content': system_prompt}]
+
+        lead_facts = format_lead_facts(lead_data)
+        if lead_facts:
+            messages.append({'role': 'system', 'content': lead_facts})
+        if self.summary:
+            messages.append({'role': 'system', 'content': f"Summary of the conversation so far: {self.summary}"})
+
+        # Newest first until the budget is spent; the last message always goes in
+        remaining = self.token_budget - self.summary_tokens
+        start = len(history)
+        while start > self.summarized_count:
+            cost = self.token_counts[start - 1]
+            if start < len(history) and cost > remaining:
+                break
+            remaining -= cost
+            start -= 1
+
+        messages.extend(history[start:])
+        return messages
@@ -0,0 +1,221 @@
+"""
+Upstream HTTP Clients
+
+One connection pool per upstream API (ARI, OpenAI, Deepgram), each with its
+own connection limits, keepalive, DNS cache and timeouts, so slow or
+throttled OpenAI calls never hold up ARI requests. Requests can pass through
+a token-bucket rate limiter (requests and tokens per minute) and are retried
+with jittered exponential backoff on throttling and transient server errors,
+honoring Retry-After.
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Union, AsyncIterator, Collection
+
+import aiohttp
+
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# The connection could not be opened, so the request never reached the
+# server: retrying is safe for any method
+CONNECT_ERRORS = (aiohttp.ClientConnectorError,)
+# The server may have received the request before dropping the connection:
+# retried only for idempotent methods (an ARI POST /play or /record must not
+# run twice)
+DISCONNECT_ERRORS = (aiohttp.ServerDisconnectedError,)
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+# Statuses meaning the request was turned away before any work was done. For
+# other methods only these are retried: after a 500/502/504 an OpenAI chat or
+# TTS POST may already have run (and been billed)
+UNPROCESSED_STATUSES = frozenset({429, 503})
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 units per second up to a burst of per_minute"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Take amount units, waiting for them if needed; returns the time waited"""
+        # A request larger than the whole bucket waits for a full bucket, not forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # Waiters are served in arrival order
+        async with self.lock:
+            while True:
+                self.refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one API (0 disables a limit)"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float):
+        """Hold every request to this API, e.g. after a 429 with Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait for a request slot (and token budget); returns the time waited"""
+        started = time.monotonic()
+        while True:
+            paused = self.paused_until - time.monotonic()
+            if paused <= 0:
+                break
+            await asyncio.sleep(paused)
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            await self.tokens.acquire(tokens)
+        return time.monotonic() - started
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamClient:
+    """Connection pool, timeouts and retry policy for one upstream API"""
+
+    def __init__(self, name: str, limit: int = 100, limit_per_host: int = 0,
+                 keepalive_timeout: float = 30, dns_ttl: int = 300,
+                 timeout: float = 30, connect_timeout: float = 5,
+                 retries: int = 2, retry_statuses: Collection[int] = (429, 500, 502, 503, 504),
+                 backoff_base: float = 0.5, backoff_max: float = 20,
+                 limiter: Optional[RateLimiter] = None,
+                 auth: Optional[aiohttp.BasicAuth] = None, headers: Optional[Dict[str, str]] = None,
+                 retry_counter: Optional[Counter] = None, wait_histogram: Optional[Histogram] = None):
+        self.name = name
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.retries = retries
+        self.retry_statuses = set(retry_statuses)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self.auth = auth
+        self.headers = headers
+        self.retry_counter = retry_counter
+        self.wait_histogram = wait_histogram
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout, auth=self.auth, headers=self.headers
+        )
+
+    async def warm(self, url: str) -> bool:
+        """Open a pooled connection ahead of the first real request (any response will do)"""
+        try:
+            async with self.session.get(url) as response:
+                await response.read()
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not pre-connect to {self.name}: {e}")
+            return False
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @contextlib.asynccontextmanager
+    async def request(self, method: str, url: str, tokens: int = 0,
+                      limiter: Optional[RateLimiter] = None,
+                      timeout: Union[float, aiohttp.ClientTimeout, None] = None,
+                      **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Send a request, retrying throttled and transient failures; yields the final response"""
+        limiter = limiter or self.limiter
+        if isinstance(timeout, (int, float)):
+            timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=self.timeout.sock_connect)
+
+        if method.upper() in IDEMPOTENT_METHODS:
+            retryable = CONNECT_ERRORS + DISCONNECT_ERRORS
+            retry_statuses = self.retry_statuses
+        else:
+            retryable = CONNECT_ERRORS
+            retry_statuses = self.retry_statuses & UNPROCESSED_STATUSES
+        attempt = 0
+        while True:
+            if limiter is not None:
+                waited = await limiter.acquire(tokens)
+                if waited and self.wait_histogram is not None:
+                    self.wait_histogram.observe(waited, api=self.name)
+
+            try:
+                response = await self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except retryable as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"{self.name} request failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status not in retry_statuses or attempt >= self.retries:
+                    try:
+                        yield response
+                    finally:
+                        response.release()
+                    return
+
+                retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                response.release()
+                delay = self.backoff(attempt, retry_after)
+                if response.status == 429 and limiter is not None:
+                    # Throttled: hold back every request to this API, not just this one
+                    limiter.pause(delay)
+                logger.warning(f"{self.name} returned {response.status}, retrying in {delay:.2f}s")
+
+            if self.retry_counter is not None:
+                self.retry_counter.inc(api=self.name)
+            attempt += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,204 @@
+"""
+Lead Storage
+
+Pluggable lead sinks on the shared batch writer (batch_writer.py). Saving a
+lead only enqueues it, so hangup handling stays constant-time; a writer task
+flushes batches on a dedicated thread to an append-only JSONL file or a
+SQLite database (WAL mode).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Optional, Dict, Any, List
+
+from batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+class LeadSink(BatchWriter):
+    """Base class for lead sinks: queue records, write them in batches"""
+
+    record_name = 'leads'
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 1.0):
+        super().__init__()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def submit(self, lead: Dict[str, Any]):
+        """Queue a lead for writing (never blocks)"""
+        self.queue.put_nowait(dict(lead))
+
+    async def write_loop(self):
+        """Collect queued leads into batches and write them off the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if batch[0] is None:
+                return
+
+            # Gather more records until the batch is full or the interval passes
+            deadline = loop.time() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    lead = await asyncio.wait_for(self.queue.get(), timeout=max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if lead is None:
+                    stop = True
+                    break
+                batch.append(lead)
+
+            await self.write(len(batch), batch)
+            if stop:
+                return
+
+    async def stop_writer(self):
+        """The writer finishes everything queued before the stop marker"""
+        self.queue.put_nowait(None)
+        await self.writer
+
+    def write_batch(self, leads: List[Dict[str, Any]]):
+        """Persist a batch of leads (runs on the writer thread)"""
+        raise NotImplementedError
+
+
+class JsonlLeadSink(LeadSink):
+    """Append-only JSON Lines file with fsync policy and size-based rotation"""
+
+    FSYNC_POLICIES = ('batch', 'interval', 'never')
+
+    def __init__(self, path: str, fsync: str = 'batch', fsync_interval: float = 5.0,
+                 max_bytes: int = 100 * 1024 * 1024, backup_count: int = 10, **kwargs):
+        super().__init__(**kwargs)
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file = None
+        self.last_fsync = 0.0
+
+    def open(self):
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def write_batch(self, leads: List[Dict[str, Any]]):
+        self.file.write(''.join(json.dumps(lead, default=str) + '\n' for lead in leads))
+        self.file.flush()
+
+        now = time.monotonic()
+        if self.fsync == 'batch' or (self.fsync == 'interval' and now - self.last_fsync >= self.fsync_interval):
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Shift leads.jsonl -> leads.jsonl.1 -> ... and start a new file"""
+        os.fsync(self.file.fileno())
+        # Rename while the file is still open: if renaming fails (e.g. EBUSY on a
+        # bind-mounted file) the sink keeps appending to the same path
+        try:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            if self.backup_count > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+            logger.info(f"Rotated {self.path}")
+        except OSError as e:
+            logger.error(f"Could not rotate {self.path}: {e}")
+        finally:
+            self.file.close()
+            self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close_backend(self):
+        if self.file is not None:
+            self.file.flush()
+            if self.fsync != 'never':
+                os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+
+class SqliteLeadSink(LeadSink):
+    """SQLite table of leads in WAL mode, written with executemany"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS leads ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' caller_number TEXT,'
+            ' call_time TEXT,'
+            ' qualified INTEGER,'
+            ' data TEXT NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS leads_call_time ON leads (call_time)')
+        self.connection.commit()
+
+    def write_batch(self, leads: List[Dict[str, Any]]):
+        rows = [
+            (lead.get('caller_number'), lead.get('call_time'), int(bool(lead.get('qualified'))),
+             json.dumps(lead, default=str))
+            for lead in leads
+        ]
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO leads (caller_number, call_time, qualified, data) VALUES (?, ?, ?, ?)',
+                rows
+            )
+
+    def close_backend(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def create_lead_sink(backend: str, path: str, **kwargs) -> LeadSink:
+    """Build the configured lead sink ('jsonl' or 'sqlite')"""
+    if backend == 'jsonl':
+        return JsonlLeadSink(path, **kwargs)
+    if backend == 'sqlite':
+        for option in ('fsync', 'fsync_interval', 'max_bytes', 'backup_count'):
+            kwargs.pop(option, None)
+        return SqliteLeadSink(path, **kwargs)
+    raise ValueError(f"Unknown lead store backend: {backend}")
+
+
+async def migrate_json_leads(json_path: str, sink: LeadSink) -> int:
+    """One-time import of a legacy leads_data.json list into a started sink"""
+    if not os.path.exists(json_path):
+        return 0
+
+    def load():
+        with open(json_path, 'r') as f:
+            return json.load(f)
+
+    leads = await sink.run_blocking(load)
+    if leads:
+        await sink.run_blocking(sink.write_batch, leads)
+
+    # Keep the original but make sure it is never imported twice
+    await sink.run_blocking(os.replace, json_path, f"{json_path}.migrated")
+    logger.info(f"Migrated {len(leads)} leads from {json_path}")
+    return len(leads)
@@ -0,0 +1,633 @@
+"""
+Local stand-ins for the agent's upstreams
+
+- FakeAri: ARI HTTP + events WebSocket. Simulates callers: answers, plays
+  back with a fixed duration, "records" by writing a small WAV file and
+  emitting RecordingFinished, and hangs up after a number of turns. When the
+  agent bridges a caller to an externalMedia channel, the caller instead
+  talks over RTP (RtpSender) once the agent has been quiet for a moment, or
+  at a configurable rate right over a playback (barge-in).
+- FakeDeepgram: prerecorded transcription endpoint (POST /v1/listen).
+- FakeDeepgramLive: live transcription WebSocket (GET /v1/listen) that
+  endpoints on the energy of the audio it receives and honors Finalize.
+- FakeOpenAI: chat completions (plain and SSE streaming) and speech.
+
+Each server has configurable latency and a failure rate for fault injection.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Set
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+RTP_FRAME_MS = 20
+# Caller audio levels (16-bit peak amplitude): a voiced tone and a faint hiss
+SPEECH_AMPLITUDE = 8000
+NOISE_AMPLITUDE = 30
+
+
+def silent_wav(seconds: float, sample_rate: int = 8000) -> bytes:
+    """A mono 16-bit PCM WAV file of silence"""
+    data_size = int(seconds * sample_rate) * 2
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE', b'fmt ', 16, 1, 1,
+        sample_rate, sample_rate * 2, 2, 16, b'data', data_size
+    )
+    return header + b'\0' * data_size
+
+
+@dataclass
+class Fault:
+    """Latency and failure injection for a fake upstream"""
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    failure_status: int = 500
+
+    async def delay(self):
+        wait = self.latency + random.uniform(0, self.jitter)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+
+class FakeServer:
+    """Base class: an aiohttp app on a local port"""
+
+    def __init__(self, fault: Optional[Fault] = None):
+        self.fault = fault or Fault()
+        self.app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.runner: Optional[web.AppRunner] = None
+        self.port = 0
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+@dataclass
+class CallState:
+    """One synthetic caller as seen by the fake ARI"""
+    channel_id: str
+    turns_left: int
+    started: float
+    speech_seconds: float
+    last_recording_done: Optional[float] = None
+    turn_latencies: List[float] = field(default_factory=list)
+    ended: bool = False
+    # Turned away by the agent (continued to the overflow dialplan or given busy)
+    overflowed: bool = False
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    # Streaming STT: the caller's RTP audio and when they next start talking
+    media: Optional['RtpSender'] = None
+    speak_timer: Optional[asyncio.TimerHandle] = None
+
+
+class RtpSender(asyncio.DatagramProtocol):
+    """A caller's audio to the agent's externalMedia socket: 20 ms RTP frames
+    of faint noise, or of a voice-like tone while the caller talks"""
+
+    def __init__(self, remote: str, sample_rate: int, payload_type: int = 118):
+        host, port = remote.rsplit(':', 1)
+        self.remote = (host, int(port))
+        self.sample_rate = sample_rate
+        self.payload_type = payload_type
+        self.frame_samples = sample_rate * RTP_FRAME_MS // 1000
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.task: Optional[asyncio.Task] = None
+        self.speech_frames = 0
+        self.on_silence = None
+        self.sequence = random.randrange(1 << 16)
+        self.timestamp = random.randrange(1 << 32)
+        self.ssrc = random.randrange(1 << 32)
+        self.packets = 0
+
+        # One second of each signal, big-endian like Asterisk's slin
+        rng = np.random.default_rng()
+        t = np.arange(sample_rate) / sample_rate
+        tone = 0.7 * np.sin(2 * np.pi * 180 * t) + 0.3 * np.sin(2 * np.pi * 360 * t)
+        self.speech = (tone * SPEECH_AMPLITUDE).astype('>i2').tobytes()
+        self.noise = (rng.normal(0, NOISE_AMPLITUDE, sample_rate)).astype('>i2').tobytes()
+        self.offset = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, remote_addr=self.remote)
+        self.task = asyncio.create_task(self.run())
+
+    def speak(self, seconds: float, on_silence):
+        """Talk for a while, then call on_silence()"""
+        self.speech_frames = max(1, int(seconds * 1000 / RTP_FRAME_MS))
+        self.on_silence = on_silence
+
+    @property
+    def speaking(self) -> bool:
+        return self.speech_frames > 0
+
+    def frame(self) -> bytes:
+        size = self.frame_samples * 2
+        source = self.speech if self.speech_frames > 0 else self.noise
+        if self.offset + size > len(source):
+            self.offset = 0
+        payload = source[self.offset:self.offset + size]
+        self.offset += size
+        header = struct.pack('!BBHII', 0x80, self.payload_type, self.sequence, self.timestamp, self.ssrc)
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.timestamp = (self.timestamp + self.frame_samples) & 0xFFFFFFFF
+        return header + payload
+
+    async def run(self):
+        """Send frames in real time (on an absolute schedule, so sleeps do not drift)"""
+        loop = asyncio.get_running_loop()
+        next_send = loop.time()
+        while True:
+            self.transport.sendto(self.frame())
+            self.packets += 1
+            if self.speech_frames > 0:
+                self.speech_frames -= 1
+                if self.speech_frames == 0 and self.on_silence is not None:
+                    callback, self.on_silence = self.on_silence, None
+                    callback()
+            next_send += RTP_FRAME_MS / 1000
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        if self.transport is not None:
+            self.transport.close()
+
+
+class FakeAri(FakeServer):
+    """ARI REST + events WebSocket driving synthetic callers"""
+
+    # Streaming callers start talking once the agent has been quiet this long
+    # (longer at the start, while the greeting is synthesized)
+    QUIET_SECONDS = 0.6
+    FIRST_QUIET_SECONDS = 3.0
+    # How far into a playback a barging-in caller starts talking
+    BARGE_IN_AFTER = 0.1
+
+    def __init__(self, recording_dir: str, app_name: str = 'ai-call-center',
+                 playback_seconds: float = 0.2, barge_in_rate: float = 0.0, fault: Optional[Fault] = None):
+        super().__init__(fault)
+        self.recording_dir = recording_dir
+        self.app_name = app_name
+        self.playback_seconds = playback_seconds
+        self.barge_in_rate = barge_in_rate
+        self.sockets: Set[web.WebSocketResponse] = set()
+        self.calls: Dict[str, CallState] = {}
+        self.finished: List[CallState] = []
+        self.ids = itertools.count(1)
+        self.connected = asyncio.Event()
+        # GET /channels requests; the agent (each worker) resyncs once when it starts
+        self.channel_listings = 0
+        # externalMedia channel id -> (caller channel id, remote host:port, format)
+        self.media_channels: Dict[str, tuple] = {}
+        self.bridges: Set[str] = set()
+        self.barge_ins = 0
+        self.stopped_playbacks = 0
+
+        routes = self.app.router
+        routes.add_get('/ari/events', self.handle_events)
+        routes.add_get('/ari/channels', self.handle_list_channels)
+        routes.add_post('/ari/channels/{channel_id}/answer', self.handle_ok)
+        routes.add_post('/ari/channels/{channel_id}/play', self.handle_play)
+        routes.add_post('/ari/channels/{channel_id}/record', self.handle_record)
+        routes.add_post('/ari/channels/{channel_id}/continue', self.handle_continue)
+        routes.add_post('/ari/channels/externalMedia', self.handle_external_media)
+        routes.add_delete('/ari/channels/{channel_id}', self.handle_hangup)
+        routes.add_get('/ari/bridges', self.handle_list_bridges)
+        routes.add_post('/ari/bridges', self.handle_create_bridge)
+        routes.add_post('/ari/bridges/{bridge_id}/addChannel', self.handle_add_channel)
+        routes.add_delete('/ari/bridges/{bridge_id}', self.handle_delete_bridge)
+        routes.add_delete('/ari/playbacks/{playback_id}', self.handle_stop_playback)
+        routes.add_route('*', '/ari/{tail:.*}', self.handle_ok)
+
+    async def handle_events(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        self.connected.set()
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self.sockets.discard(ws)
+            if not self.sockets:
+                self.connected.clear()
+        return ws
+
+    async def emit(self, event: Dict[str, Any]):
+        event.setdefault('application', self.app_name)
+        message = json.dumps(event)
+        for ws in list(self.sockets):
+            try:
+                await ws.send_str(message)
+            except ConnectionError:
+                self.sockets.discard(ws)
+
+    async def place_call(self, turns: int, speech_seconds: float) -> CallState:
+        """Start a synthetic call with StasisStart"""
+        channel_id = f"loadtest-{next(self.ids)}"
+        call = CallState(channel_id, turns, time.perf_counter(), speech_seconds)
+        self.calls[channel_id] = call
+        await self.emit({
+            'type': 'StasisStart',
+            'channel': {'id': channel_id, 'caller': {'number': channel_id}, 'state': 'Ring'},
+            'args': []
+        })
+        return call
+
+    async def end_call(self, channel_id: str):
+        call = self.calls.pop(channel_id, None)
+        if call is None or call.ended:
+            return
+        call.ended = True
+        if call.speak_timer is not None:
+            call.speak_timer.cancel()
+        if call.media is not None:
+            call.media.close()
+            call.media = None
+        self.finished.append(call)
+        await self.emit({'type': 'StasisEnd', 'channel': {'id': channel_id}})
+        call.done.set()
+
+    async def injected(self) -> Optional[web.Response]:
+        self.requests += 1
+        await self.fault.delay()
+        if self.fault.should_fail():
+            return web.Response(status=self.fault.failure_status)
+        return None
+
+    async def handle_ok(self, request: web.Request) -> web.Response:
+        failure = await self.injected()
+        return failure or web.Response(status=204)
+
+    async def handle_list_channels(self, request: web.Request) -> web.Response:
+        self.channel_listings += 1
+        channels = [
+            {'id': channel_id, 'caller': {'number': channel_id},
+             'dialplan': {'app_name': 'Stasis', 'app_data': self.app_name}}
+            for channel_id in self.calls
+        ]
+        return web.json_response(channels)
+
+    async def handle_play(self, request: web.Request) -> web.Response:
+        failure = await self.injected()
+        if failure:
+            return failure
+        channel_id = request.match_info['channel_id']
+        playback_id = request.query.get('playbackId') or f"pb-{next(self.ids)}"
+
+        call = self.calls.get(channel_id)
+        if call is not None and call.last_recording_done is not None:
+            # First audio after the caller finished speaking: that is the turn latency
+            call.turn_latencies.append(time.perf_counter() - call.last_recording_done)
+            call.last_recording_done = None
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(
+            self.playback_seconds,
+            lambda: asyncio.ensure_future(self.emit({
+                'type': 'PlaybackFinished',
+                'playback': {'id': playback_id, 'target_uri': f'channel:{channel_id}', 'state': 'done'}
+            }))
+        )
+        if call is not None and call.media is not None and not call.media.speaking:
+            # Streaming caller: talk once the agent goes quiet, or right over it
+            if random.random() < self.barge_in_rate:
+                self.barge_ins += 1
+                self.schedule_speech(call, self.BARGE_IN_AFTER)
+            else:
+                self.schedule_speech(call, self.playback_seconds + self.QUIET_SECONDS)
+        return web.json_response({'id': playback_id, 'state': 'queued'}, status=201)
+
+    def schedule_speech(self, call: CallState, delay: float):
+        """(Re)arm the caller's next turn; every new playback pushes it back"""
+        if call.speak_timer is not None:
+            call.speak_timer.cancel()
+        call.speak_timer = asyncio.get_running_loop().call_later(
+            delay, lambda: asyncio.ensure_future(self.start_speaking(call))
+        )
+
+    async def start_speaking(self, call: CallState):
+        """A streaming caller's turn: talk over RTP, or hang up after the last turn"""
+        call.speak_timer = None
+        if call.ended or call.media is None or call.media.speaking:
+            return
+        call.turns_left -= 1
+        if call.turns_left < 0:
+            await self.end_call(call.channel_id)
+            return
+
+        def finished():
+            call.last_recording_done = time.perf_counter()
+        call.media.speak(call.speech_seconds, finished)
+
+    async def handle_external_media(self, request: web.Request) -> web.Response:
+        failure = await self.injected()
+        if failure:
+            return failure
+        media_id = request.query['channelId']
+        self.media_channels[media_id] = (None, request.query['external_host'], request.query.get('format', 'slin16'))
+        # Asterisk puts externalMedia channels into the app too; the agent must ignore them
+        await self.emit({'type': 'StasisStart', 'channel': {'id': media_id, 'caller': {'number': ''}}})
+        return web.json_response({'id': media_id, 'state': 'Up'})
+
+    async def handle_list_bridges(self, request: web.Request) -> web.Response:
+        return web.json_response([{'id': bridge_id, 'bridge_type': 'mixing'} for bridge_id in self.bridges])
+
+    async def handle_create_bridge(self, request: web.Request) -> web.Response:
+        failure = await self.injected()
+        if failure:
+            return failure
+        bridge_id = request.query.get('bridgeId') or f"bridge-{next(self.ids)}"
+        self.bridges.add(bridge_id)
+        return web.json_response({'id': bridge_id, 'bridge_type': 'mixing'})
+
+    async def handle_add_channel(self, request: web.Request) -> web.Response:
+        """Caller and externalMedia channel bridged: the caller's audio starts flowing"""
+        failure = await self.injected()
+        if failure:
+            return failure
+        channel_ids = request.query['channel'].split(',')
+        call = next((self.calls[channel_id] for channel_id in channel_ids if channel_id in self.calls), None)
+        media = next((self.media_channels[channel_id] for channel_id in channel_ids
+                      if channel_id in self.media_channels), None)
+        if call is None or media is None:
+            return web.Response(status=404)
+
+        _, remote, media_format = media
+        sample_rate = 16000 if media_format == 'slin16' else 8000
+        if media_format not in ('slin', 'slin16'):
+            return web.Response(status=400, text=f"Fake ARI only sends slin audio, not {media_format}")
+        call.media = RtpSender(remote, sample_rate)
+        await call.media.start()
+        self.schedule_speech(call, self.FIRST_QUIET_SECONDS)
+        return web.Response(status=204)
+
+    async def handle_delete_bridge(self, request: web.Request) -> web.Response:
+        self.bridges.discard(request.match_info['bridge_id'])
+        return web.Response(status=204)
+
+    async def handle_stop_playback(self, request: web.Request) -> web.Response:
+        self.stopped_playbacks += 1
+        return web.Response(status=204)
+
+    async def handle_record(self, request: web.Request) -> web.Response:
+        failure = await self.injected()
+        if failure:
+            return failure
+        channel_id = request.match_info['channel_id']
+        name = request.query['name']
+        call = self.calls.get(channel_id)
+        if call is None:
+            return web.Response(status=404)
+        asyncio.ensure_future(self.finish_recording(call, name))
+        return web.json_response({'name': name, 'state': 'recording'}, status=201)
+
+    async def finish_recording(self, call: CallState, name: str):
+        """Caller 'speaks', then the recording lands on disk and the turn ends"""
+        await asyncio.sleep(call.speech_seconds)
+        if call.ended:
+            return
+
+        call.turns_left -= 1
+        if call.turns_left < 0:
+            await self.end_call(call.channel_id)
+            return
+
+        path = os.path.join(self.recording_dir, f"{name}.wav")
+        await asyncio.to_thread(self.write_recording, path, call.speech_seconds)
+        call.last_recording_done = time.perf_counter()
+        await self.emit({
+            'type': 'RecordingFinished',
+            'recording': {'name': name, 'target_uri': f'channel:{call.channel_id}', 'state': 'done'}
+        })
+
+    @staticmethod
+    def write_recording(path: str, seconds: float):
+        with open(path, 'wb') as f:
+            f.write(silent_wav(min(seconds, 1.0)))
+
+    async def handle_continue(self, request: web.Request) -> web.Response:
+        """Channel sent back to the dialplan: the call leaves the app"""
+        failure = await self.injected()
+        if failure:
+            return failure
+        self.overflow(request.match_info['channel_id'])
+        await self.end_call(request.match_info['channel_id'])
+        return web.Response(status=204)
+
+    async def handle_hangup(self, request: web.Request) -> web.Response:
+        if self.media_channels.pop(request.match_info['channel_id'], None) is not None:
+            # The audio stops with the call (end_call); nothing else to do here
+            return web.Response(status=204)
+        if request.query.get('reason') == 'busy':
+            self.overflow(request.match_info['channel_id'])
+        await self.end_call(request.match_info['channel_id'])
+        return web.Response(status=204)
+
+    def overflow(self, channel_id: str):
+        call = self.calls.get(channel_id)
+        if call is not None:
+            call.overflowed = True
+
+
+class FakeDeepgram(FakeServer):
+    """Prerecorded transcription endpoint returning scripted transcripts"""
+
+    TRANSCRIPTS = [
+        "I'm not really sure yet, tell me more",
+        "Maybe, I have been thinking about it for a while",
+        "What do you usually recommend for someone like me",
+        "I would need to talk to my family first",
+    ]
+
+    def __init__(self, fault: Optional[Fault] = None):
+        super().__init__(fault)
+        self.app.router.add_post('/v1/listen', self.handle_listen)
+
+    async def handle_listen(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await request.read()
+        await self.fault.delay()
+        if self.fault.should_fail():
+            return web.Response(status=self.fault.failure_status)
+        transcript = random.choice(self.TRANSCRIPTS)
+        return web.json_response({
+            'results': {'channels': [{'alternatives': [{'transcript': transcript, 'confidence': 0.99}]}]}
+        })
+
+
+class FakeDeepgramLive(FakeServer):
+    """Live transcription WebSocket: a scripted transcript for each stretch of
+    speech, final once the audio has been quiet for the endpointing interval
+    or the client sends Finalize"""
+
+    # Audio louder than this (dBFS RMS) counts as speech
+    SPEECH_DB = -40.0
+    INTERIM_AFTER_MS = 200
+
+    def __init__(self, fault: Optional[Fault] = None):
+        super().__init__(fault)
+        self.streams = 0
+        self.finals = 0
+        self.app.router.add_get('/v1/listen', self.handle_live)
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/v1/listen"
+
+    async def handle_live(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if request.query.get('encoding') != 'linear16':
+            return web.Response(status=400, text="Fake live STT only decodes linear16")
+        if self.fault.should_fail():
+            return web.Response(status=self.fault.failure_status)
+
+        ws = web.WebSocketResponse(protocols=('token',))
+        await ws.prepare(request)
+        self.streams += 1
+        sample_rate = int(request.query.get('sample_rate', 16000))
+        endpointing_ms = float(request.query.get('endpointing', 300))
+        interim = request.query.get('interim_results') == 'true'
+
+        speech_ms = 0.0
+        silence_ms = 0.0
+        sent_interim = False
+        pending: List[asyncio.Task] = []
+
+        async def send_result(is_final: bool, speech_final: bool):
+            transcript = random.choice(FakeDeepgram.TRANSCRIPTS)
+            if is_final:
+                await self.fault.delay()
+                self.finals += 1
+            if not ws.closed:
+                await ws.send_json({
+                    'type': 'Results',
+                    'is_final': is_final,
+                    'speech_final': speech_final,
+                    'channel': {'alternatives': [{'transcript': transcript if is_final else transcript[:12],
+                                                  'confidence': 0.99}]},
+                })
+
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    samples = np.frombuffer(message.data[:len(message.data) & ~1], dtype='<i2').astype(np.float32)
+                    if not len(samples):
+                        continue
+                    frame_ms = len(samples) * 1000 / sample_rate
+                    rms = np.sqrt(np.mean(samples * samples)) / 32768
+                    if 20 * np.log10(max(rms, 1e-9)) > self.SPEECH_DB:
+                        speech_ms += frame_ms
+                        silence_ms = 0.0
+                        if interim and not sent_interim and speech_ms >= self.INTERIM_AFTER_MS:
+                            sent_interim = True
+                            pending.append(asyncio.create_task(send_result(False, False)))
+                    elif speech_ms:
+                        silence_ms += frame_ms
+                        if silence_ms >= endpointing_ms:
+                            pending.append(asyncio.create_task(send_result(True, True)))
+                            speech_ms = silence_ms = 0.0
+                            sent_interim = False
+                elif message.type == WSMsgType.TEXT:
+                    control = json.loads(message.data).get('type')
+                    if control == 'Finalize' and speech_ms:
+                        pending.append(asyncio.create_task(send_result(True, False)))
+                        speech_ms = silence_ms = 0.0
+                        sent_interim = False
+                    elif control == 'CloseStream':
+                        break
+                else:
+                    break
+        finally:
+            await asyncio.gather(*pending, return_exceptions=True)
+            await ws.close()
+        return ws
+
+
+class FakeOpenAI(FakeServer):
+    """Chat completions (plain or SSE) and speech endpoints"""
+
+    def __init__(self, fault: Optional[Fault] = None, tts_fault: Optional[Fault] = None,
+                 token_delay: float = 0.01, audio_seconds: float = 1.0):
+        super().__init__(fault)
+        self.tts_fault = tts_fault or Fault()
+        self.token_delay = token_delay
+        self.audio = silent_wav(audio_seconds, sample_rate=24000)
+        self.replies = itertools.count(1)
+        self.app.router.add_post('/v1/chat/completions', self.handle_chat)
+        self.app.router.add_post('/v1/audio/speech', self.handle_speech)
+
+    def reply_text(self) -> str:
+        # Unique per reply so the TTS cache does not hide synthesis cost
+        n = next(self.replies)
+        return (f"Thanks for sharing that, reference {n}. "
+                "Could you tell me roughly how much you are thinking of investing? "
+                "And how comfortable are you with market ups and downs?")
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        payload = await request.json()
+        await self.fault.delay()
+        if self.fault.should_fail():
+            return web.Response(status=self.fault.failure_status, headers={'Retry-After': '1'})
+
+        text = self.reply_text()
+        if not payload.get('stream'):
+            return web.json_response({'choices': [{'message': {'role': 'assistant', 'content': text}}]})
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        try:
+            for token in text.split(' '):
+                chunk = {'choices': [{'delta': {'content': token + ' '}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                if self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # The agent hung up or was killed mid-stream
+            pass
+        return response
+
+    async def handle_speech(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        await self.tts_fault.delay()
+        if self.tts_fault.should_fail():
+            return web.Response(status=self.tts_fault.failure_status)
+        if payload.get('response_format') == 'pcm':
+            # Raw 24 kHz samples: the WAV body without its 44-byte header
+            return web.Response(body=self.audio[44:], content_type='audio/pcm')
+        return web.Response(body=self.audio, content_type='audio/wav')
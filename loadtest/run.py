@@ -0,0 +1,241 @@
+"""
+Load-test driver
+
+Starts the fake ARI, Deepgram and OpenAI servers, runs ai_agent.py against
+them as a subprocess and drives synthetic calls through it. Reports turn
+latency percentiles (caller stops speaking -> first agent audio), throughput
+and agent memory per concurrent call.
+
+    python3 -m loadtest.run --calls 200 --concurrency 50 --turns 3 \\
+        --llm-latency 0.3 --tts-latency 0.2 --failure-rate 0.01
+
+With --stt-mode stream the callers talk over externalMedia RTP to a fake
+live Deepgram WebSocket instead of leaving recordings, and --barge-in-rate
+makes them talk over some of the agent's playbacks.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import sys
+import tempfile
+import time
+from typing import Optional, Dict, List
+
+from loadtest.fakes import Fault, FakeAri, FakeDeepgram, FakeDeepgramLive, FakeOpenAI
+
+AGENT_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ai_agent.py')
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """Resident set size of a process and its children in kB (Linux /proc)"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            rss = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+    except OSError:
+        return None
+
+    # Worker processes in multi-process mode
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r') as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        children = []
+    for child in children:
+        rss += read_rss_kb(child) or 0
+    return rss
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive synthetic calls through ai_agent.py against fake upstreams")
+    parser.add_argument('--calls', type=int, default=50, help="total calls to place")
+    parser.add_argument('--concurrency', type=int, default=10, help="calls in flight at once")
+    parser.add_argument('--turns', type=int, default=3, help="caller turns per call")
+    parser.add_argument('--speech-seconds', type=float, default=0.5, help="how long each caller turn lasts")
+    parser.add_argument('--playback-seconds', type=float, default=0.2, help="duration of every agent playback")
+    parser.add_argument('--ari-latency', type=float, default=0.0)
+    parser.add_argument('--stt-latency', type=float, default=0.2)
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="time to first token")
+    parser.add_argument('--token-delay', type=float, default=0.01, help="delay between streamed tokens")
+    parser.add_argument('--tts-latency', type=float, default=0.2)
+    parser.add_argument('--jitter', type=float, default=0.05, help="uniform extra latency on every fake")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of upstream requests that fail")
+    parser.add_argument('--stream', choices=('true', 'false'), default='true', help="STREAM_RESPONSES for the agent")
+    parser.add_argument('--stt-mode', choices=('file', 'stream'), default='file',
+                        help="file: recordings + prerecorded STT; stream: externalMedia RTP + live STT")
+    parser.add_argument('--barge-in-rate', type=float, default=0.0,
+                        help="stream mode: fraction of agent playbacks the caller talks over")
+    parser.add_argument('--workers', type=int, default=1, help="WORKERS for the agent (multi-process mode)")
+    parser.add_argument('--drain-after', type=float, default=None,
+                        help="send the agent SIGTERM this many seconds into the test (graceful drain)")
+    parser.add_argument('--call-timeout', type=float, default=120.0, help="give up on a call after this long")
+    parser.add_argument('--agent-log', default=None, help="write agent output here instead of discarding it")
+    return parser.parse_args(argv)
+
+
+async def start_agent(args: argparse.Namespace, workdir: str, ari: FakeAri, deepgram: FakeDeepgram,
+                      deepgram_live: FakeDeepgramLive, openai: FakeOpenAI, log_file) -> asyncio.subprocess.Process:
+    """Launch ai_agent.py pointed at the fakes"""
+    env = dict(os.environ)
+    env.update({
+        'ARI_URL': ari.url,
+        'ARI_WS_BACKOFF_BASE': '0.1',
+        'OPENAI_API_KEY': 'loadtest',
+        'OPENAI_BASE_URL': f'{openai.url}/v1',
+        'DEEPGRAM_API_KEY': 'loadtest',
+        'DEEPGRAM_URL': deepgram.url,
+        'RECORDING_DIR': ari.recording_dir,
+        'STT_MODE': 'streaming' if args.stt_mode == 'stream' else 'file',
+        'DEEPGRAM_LIVE_URL': deepgram_live.ws_url,
+        'EXTERNAL_MEDIA_HOST': '127.0.0.1',
+        'EXTERNAL_MEDIA_FORMAT': 'slin16',
+        'BARGE_IN': 'true',
+        'STREAM_RESPONSES': args.stream,
+        'MAX_CONCURRENT_CALLS': str(max(args.concurrency, 1)),
+        'WORKERS': str(args.workers),
+        'TTS_CACHE_DIR': os.path.join(workdir, 'tts_cache'),
+        'LEAD_STORE_PATH': os.path.join(workdir, 'leads.jsonl'),
+        'METRICS_PORT': '0',
+    })
+    return await asyncio.create_subprocess_exec(
+        sys.executable, AGENT_SCRIPT, cwd=workdir, env=env,
+        stdout=log_file, stderr=asyncio.subprocess.STDOUT
+    )
+
+
+async def stop_agent(agent: asyncio.subprocess.Process):
+    if agent.returncode is not None:
+        return
+    agent.send_signal(signal.SIGTERM)
+    try:
+        await asyncio.wait_for(agent.wait(), timeout=15)
+    except asyncio.TimeoutError:
+        agent.kill()
+        await agent.wait()
+
+
+async def sample_memory(pid: int, samples: Dict[str, int], interval: float = 0.2):
+    """Track peak RSS of the agent while the test runs"""
+    while True:
+        rss = read_rss_kb(pid)
+        if rss is not None:
+            samples['peak'] = max(samples.get('peak', 0), rss)
+        await asyncio.sleep(interval)
+
+
+async def drive_calls(args: argparse.Namespace, ari: FakeAri) -> int:
+    """Place calls keeping at most args.concurrency in flight; returns timeouts"""
+    slots = asyncio.Semaphore(args.concurrency)
+    timeouts = 0
+
+    async def one_call():
+        nonlocal timeouts
+        async with slots:
+            call = await ari.place_call(args.turns, args.speech_seconds)
+            try:
+                await asyncio.wait_for(call.done.wait(), timeout=args.call_timeout)
+            except asyncio.TimeoutError:
+                timeouts += 1
+                await ari.end_call(call.channel_id)
+
+    await asyncio.gather(*(one_call() for _ in range(args.calls)))
+    return timeouts
+
+
+def report(args: argparse.Namespace, ari: FakeAri, deepgram: FakeDeepgram, deepgram_live: FakeDeepgramLive,
+           openai: FakeOpenAI, elapsed: float, timeouts: int, baseline_kb: Optional[int], memory: Dict[str, int]):
+    latencies = [latency for call in ari.finished for latency in call.turn_latencies]
+    completed_turns = len(latencies)
+    overflowed = sum(call.overflowed for call in ari.finished)
+
+    print()
+    print("=" * 60)
+    print(f"Calls: {len(ari.finished)} finished ({overflowed} sent to overflow), {timeouts} timed out "
+          f"({args.calls} placed, concurrency {args.concurrency}, {args.turns} turns each)")
+    print(f"Elapsed: {elapsed:.2f}s  |  {len(ari.finished) / elapsed:.2f} calls/s  |  "
+          f"{completed_turns / elapsed:.2f} turns/s")
+    if latencies:
+        print(f"Turn latency (caller done -> first agent audio): "
+              f"p50 {percentile(latencies, 50) * 1000:.0f} ms  "
+              f"p95 {percentile(latencies, 95) * 1000:.0f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:.0f} ms  "
+              f"mean {statistics.mean(latencies) * 1000:.0f} ms")
+    else:
+        print("Turn latency: no completed turns")
+    if baseline_kb is not None and memory.get('peak'):
+        growth = memory['peak'] - baseline_kb
+        print(f"Agent RSS: baseline {baseline_kb / 1024:.1f} MB, peak {memory['peak'] / 1024:.1f} MB, "
+              f"~{growth / max(args.concurrency, 1):.0f} kB per concurrent call")
+    if args.stt_mode == 'stream':
+        print(f"Live STT: {deepgram_live.streams} streams, {deepgram_live.finals} final transcripts  |  "
+              f"barge-ins: {ari.barge_ins} attempted, {ari.stopped_playbacks} playbacks stopped")
+    print(f"Upstream requests: ARI {ari.requests}, Deepgram {deepgram.requests + deepgram_live.requests}, "
+          f"OpenAI {openai.requests}")
+    print("=" * 60)
+
+
+async def run(args: argparse.Namespace):
+    workdir = tempfile.mkdtemp(prefix='ai_agent_loadtest_')
+    recording_dir = os.path.join(workdir, 'recordings')
+    os.makedirs(recording_dir)
+
+    def fault(latency: float) -> Fault:
+        return Fault(latency=latency, jitter=args.jitter, failure_rate=args.failure_rate)
+
+    ari = FakeAri(recording_dir, playback_seconds=args.playback_seconds, barge_in_rate=args.barge_in_rate,
+                  fault=fault(args.ari_latency))
+    deepgram = FakeDeepgram(fault=fault(args.stt_latency))
+    deepgram_live = FakeDeepgramLive(fault=fault(args.stt_latency))
+    openai = FakeOpenAI(fault=fault(args.llm_latency), tts_fault=fault(args.tts_latency),
+                        token_delay=args.token_delay)
+    for server in (ari, deepgram, deepgram_live, openai):
+        await server.start()
+
+    log_file = open(args.agent_log, 'wb') if args.agent_log else asyncio.subprocess.DEVNULL
+    agent = await start_agent(args, workdir, ari, deepgram, deepgram_live, openai, log_file)
+    memory: Dict[str, int] = {}
+    sampler = None
+    try:
+        await asyncio.wait_for(ari.connected.wait(), timeout=30)
+        # Wait until the agent (in multi-process mode, every worker) has resynced
+        while ari.channel_listings < max(args.workers, 1):
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)
+        baseline_kb = read_rss_kb(agent.pid)
+        sampler = asyncio.create_task(sample_memory(agent.pid, memory))
+
+        print(f"Agent connected (pid {agent.pid}); placing {args.calls} calls, workdir {workdir}")
+        started = time.perf_counter()
+        if args.drain_after is not None:
+            asyncio.get_running_loop().call_later(args.drain_after, agent.send_signal, signal.SIGTERM)
+        timeouts = await drive_calls(args, ari)
+        elapsed = time.perf_counter() - started
+
+        report(args, ari, deepgram, deepgram_live, openai, elapsed, timeouts, baseline_kb, memory)
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+        await stop_agent(agent)
+        for server in (ari, deepgram, deepgram_live, openai):
+            await server.stop()
+        if args.agent_log:
+            log_file.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
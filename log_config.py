@@ -0,0 +1,170 @@
+"""
+Logging Setup
+
+Non-blocking logging for the agent. Loggers only put records on a bounded
+in-memory queue (records are dropped, not waited on, if it is full); a
+QueueListener thread formats them and does the file and stdout I/O. Records
+carry the channel_id of the call being handled, taken from a context
+variable, and can be written as JSON lines. High-volume loggers can be
+sampled, and the log file is rotated by size or time.
+"""
+
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+# Channel of the call the current task is working on (inherited by child tasks)
+channel_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('channel_id', default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed with extra=
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class ChannelContextFilter(logging.Filter):
+    """Stamp records with the channel_id from the calling task's context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'channel_id'):
+            record.channel_id = channel_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records below WARNING from selected loggers"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now (they may change later) but leave formatting to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.processName,
+        }
+        if getattr(record, 'channel_id', None):
+            entry['channel_id'] = record.channel_id
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES and key not in entry and key != 'channel_id':
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """'ai_agent.events=0.1,streaming_stt=0.5' -> {logger name: rate}; ValueError if malformed"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, separator, rate = item.partition('=')
+        name = name.strip()
+        if not separator or not name:
+            raise ValueError(f"expected logger=rate, got {item!r}")
+        try:
+            value = float(rate)
+        except ValueError:
+            raise ValueError(f"rate for {name} is not a number: {rate.strip()!r}") from None
+        if not 0 <= value <= 1:
+            raise ValueError(f"rate for {name} must be between 0 and 1")
+        rates[name] = value
+    return rates
+
+
+# TimedRotatingFileHandler intervals
+ROTATE_WHEN = ('S', 'M', 'H', 'D', 'midnight', 'W0', 'W1', 'W2', 'W3', 'W4', 'W5', 'W6')
+
+
+def setup_logging(level: str = 'INFO', log_format: str = 'json', path: Optional[str] = 'ai_agent.log',
+                  rotate: str = 'size', max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5,
+                  when: str = 'midnight', sampling: str = '',
+                  queue_size: int = 10000) -> logging.handlers.QueueListener:
+    """Route all logging through a queue to stdout and a rotating file; returns the started listener"""
+    if log_format not in ('json', 'text'):
+        raise ValueError(f"Unknown log format: {log_format}")
+    if rotate not in ('size', 'time', 'none'):
+        raise ValueError(f"Unknown log rotation: {rotate}")
+
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if path:
+        if rotate == 'size':
+            handlers.append(logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            ))
+        elif rotate == 'time':
+            handlers.append(logging.handlers.TimedRotatingFileHandler(
+                path, when=when, backupCount=backup_count, encoding='utf-8'
+            ))
+        else:
+            handlers.append(logging.FileHandler(path, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    # Filters run in the logging task, where the channel context is visible
+    queue_handler.addFilter(ChannelContextFilter())
+    rates = parse_sampling(sampling)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return listener
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full"""
+    return sum(handler.dropped for handler in logging.getLogger().handlers
+               if isinstance(handler, DroppingQueueHandler))
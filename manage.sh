@@ -34,8 +34,8 @@ show_logs() {
     echo ""
     
     echo -e "${YELLOW}AI Agent Logs (last 20 lines):${NC}"
-    if [ -f "ai_agent.log" ]; then
-        tail -20 ai_agent.log
+    if ls ai_agent*.log >/dev/null 2>&1; then
+        tail -n 20 ai_agent*.log
     else
         echo "No logs found"
     fi
@@ -49,7 +49,11 @@ show_leads() {
     echo -e "${GREEN}=== Lead Data ===${NC}"
     echo ""
     
-    if [ -f "leads_data.json" ]; then
+    if ls leads*.jsonl >/dev/null 2>&1; then
+        cat leads*.jsonl | python3 -m json.tool --json-lines
+    elif [ -f "leads.db" ]; then
+        sqlite3 leads.db "SELECT data FROM leads ORDER BY id"
+    elif [ -f "leads_data.json" ]; then
         python3 -m json.tool leads_data.json
     else
         echo "No leads data found"
@@ -0,0 +1,172 @@
+"""
+Response Cache
+
+Opt-in cache of AI responses to the questions callers keep asking ("what are
+the fees?", "is this safe?", "who are you?"). Transcripts are normalized and
+matched within the same conversation stage, first exactly and then by cosine
+similarity of character n-gram TF-IDF vectors (hashed into a fixed number of
+dimensions, searched with NumPy), so a rephrased question can reuse an answer
+without another chat completion. Entries expire after a TTL and the least
+recently used are evicted beyond a size limit.
+"""
+
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Tuple
+
+import numpy as np
+
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase words only: 'What are the FEES?' -> 'what are the fees'"""
+    return NON_WORD.sub(' ', text.lower()).strip()
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    """One cached answer"""
+    question: str
+    stage: str
+    response: str
+    # Seconds the original response took to generate (saved by every hit)
+    cost: float
+    created: float
+    hits: int = 0
+
+
+class ResponseCache:
+    """Similarity-matched responses per conversation stage, with TTL and LRU eviction"""
+
+    def __init__(self, threshold: float = 0.85, ttl: float = 3600, max_entries: int = 500,
+                 min_chars: int = 12, ngram: int = 3, dimensions: int = 2048):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_chars = min_chars
+        self.ngram = ngram
+        self.dimensions = dimensions
+
+        # Entries by slot in LRU order, and the exact-match index
+        self.entries: 'OrderedDict[int, CachedResponse]' = OrderedDict()
+        self.exact: Dict[Tuple[str, str], int] = {}
+        self.free_slots = list(range(max_entries - 1, -1, -1))
+        # One row per slot: term frequencies, their squares (for the norms) and
+        # the stage, so a search is a couple of matrix-vector products
+        self.matrix = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self.squares = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self.slot_stages = np.full(max_entries, -1, dtype=np.int32)
+        self.stage_codes: Dict[str, int] = {}
+        self.doc_freq = np.zeros(dimensions, dtype=np.float32)
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def vectorize(self, question: str) -> np.ndarray:
+        """Sublinear term frequencies of the question's hashed character n-grams"""
+        padded = f" {question} "
+        count = max(len(padded) - self.ngram + 1, 0)
+        buckets = np.fromiter(
+            (zlib.crc32(padded[i:i + self.ngram].encode('utf-8')) % self.dimensions for i in range(count)),
+            dtype=np.int64, count=count
+        )
+        return np.log1p(np.bincount(buckets, minlength=self.dimensions).astype(np.float32))
+
+    def idf(self) -> np.ndarray:
+        return np.log((1 + len(self.entries)) / (1 + self.doc_freq)) + 1
+
+    def get(self, text: str, stage: str) -> Optional[CachedResponse]:
+        """Cached response for a question like this one at this stage, if any"""
+        question = normalize(text)
+        if len(question) < self.min_chars:
+            return None
+        self.expire()
+
+        slot = self.exact.get((stage, question))
+        if slot is None:
+            slot = self.search(question, stage)
+        if slot is None:
+            self.misses += 1
+            return None
+
+        entry = self.entries[slot]
+        self.entries.move_to_end(slot)
+        entry.hits += 1
+        self.hits += 1
+        self.saved_seconds += entry.cost
+        return entry
+
+    def search(self, question: str, stage: str) -> Optional[int]:
+        """Most similar entry at this stage above the threshold"""
+        code = self.stage_codes.get(stage)
+        if code is None or not self.entries:
+            return None
+        # IDF weights change with every entry, so they are applied at query time:
+        # cos(tf * idf, q * idf) = tf . (q * idf^2) / (|tf * idf| |q * idf|)
+        weights = self.idf() ** 2
+        query = self.vectorize(question)
+        query_norm = np.sqrt(query * query @ weights)
+        if not query_norm:
+            return None
+        norms = np.sqrt(self.squares @ weights)
+        scores = (self.matrix @ (query * weights)) / np.maximum(norms * query_norm, 1e-9)
+        scores[self.slot_stages != code] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return best
+
+    def put(self, text: str, stage: str, response: str, cost: float):
+        """Cache the response to a question (replacing any answer to the same question)"""
+        question = normalize(text)
+        if len(question) < self.min_chars or self.max_entries <= 0:
+            return
+        previous = self.exact.get((stage, question))
+        if previous is not None:
+            self.remove(previous)
+        elif not self.free_slots:
+            self.remove(next(iter(self.entries)))
+
+        slot = self.free_slots.pop()
+        vector = self.vectorize(question)
+        self.entries[slot] = CachedResponse(question, stage, response, cost, time.monotonic())
+        self.exact[(stage, question)] = slot
+        self.matrix[slot] = vector
+        self.squares[slot] = vector * vector
+        self.slot_stages[slot] = self.stage_codes.setdefault(stage, len(self.stage_codes))
+        self.doc_freq += vector > 0
+
+    def remove(self, slot: int):
+        entry = self.entries.pop(slot)
+        del self.exact[(entry.stage, entry.question)]
+        self.doc_freq -= self.matrix[slot] > 0
+        self.matrix[slot] = 0
+        self.squares[slot] = 0
+        self.slot_stages[slot] = -1
+        self.free_slots.append(slot)
+
+    def expire(self):
+        """Drop entries older than the TTL"""
+        cutoff = time.monotonic() - self.ttl
+        for slot in [slot for slot, entry in self.entries.items() if entry.created < cutoff]:
+            self.remove(slot)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters, latency saved and size"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hit_ratio, 3),
+            'saved_seconds': round(self.saved_seconds, 3),
+            'entries': len(self.entries),
+        }
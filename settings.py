@@ -0,0 +1,237 @@
+"""
+Agent Settings
+
+Every setting the agent takes from the environment (documented in
+.env.example), parsed into one typed, immutable object. Values are checked
+when the process starts, and all problems are reported together, rather than
+each bad value surfacing on the first call that happens to use it.
+"""
+
+import os
+from dataclasses import dataclass, field, fields
+from typing import Optional, Mapping, Any, Sequence, List
+
+from lead_store import JsonlLeadSink
+from log_config import ROTATE_WHEN, parse_sampling
+from streaming_stt import MEDIA_FORMATS
+
+TRUE_VALUES = ('true', '1', 'yes', 'on')
+FALSE_VALUES = ('false', '0', 'no', 'off')
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+TTS_VOICES = ('alloy', 'ash', 'ballad', 'coral', 'echo', 'fable', 'onyx', 'nova', 'sage', 'shimmer', 'verse')
+
+
+class SettingsError(ValueError):
+    """One or more settings are missing or invalid"""
+
+
+def env(name: str, default: Any = None, choices: Optional[Sequence[str]] = None,
+        minimum: Optional[float] = None, maximum: Optional[float] = None,
+        required: bool = False, secret: bool = False):
+    """A setting read from environment variable name"""
+    return field(default=default, repr=not secret, metadata={
+        'env': name, 'choices': choices, 'minimum': minimum, 'maximum': maximum, 'required': required,
+    })
+
+
+def parse_value(raw: str, kind: Any) -> Any:
+    """Convert an environment string to a field's type"""
+    if kind is bool:
+        value = raw.lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        raise ValueError(f"expected one of {', '.join(TRUE_VALUES + FALSE_VALUES)}")
+    if kind is int:
+        return int(raw)
+    if kind is float:
+        return float(raw)
+    return raw
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Validated agent configuration"""
+
+    # Asterisk ARI
+    ari_url: str = env('ARI_URL', 'http://localhost:8088')
+    ari_username: str = env('ARI_USERNAME', 'ai_agent')
+    ari_password: str = env('ARI_PASSWORD', 'ai_agent_secure_password_123', secret=True)
+    ari_app: str = env('ARI_APP', 'ai-call-center')
+    ws_ping_interval: float = env('ARI_WS_PING_INTERVAL', 20.0, minimum=0)
+    ws_ping_timeout: float = env('ARI_WS_PING_TIMEOUT', 20.0, minimum=0)
+    ws_backoff_base: float = env('ARI_WS_BACKOFF_BASE', 0.5, minimum=0)
+    ws_backoff_max: float = env('ARI_WS_BACKOFF_MAX', 30.0, minimum=0)
+
+    # API keys
+    openai_api_key: Optional[str] = env('OPENAI_API_KEY', required=True, secret=True)
+    deepgram_api_key: Optional[str] = env('DEEPGRAM_API_KEY', required=True, secret=True)
+
+    # Upstream endpoints
+    openai_base_url: str = env('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+    deepgram_url: str = env('DEEPGRAM_URL', '')
+    recording_dir: str = env('RECORDING_DIR', '/var/spool/asterisk/recording')
+
+    # Upstream HTTP pools and rate limits
+    http_retries: int = env('HTTP_RETRIES', 2, minimum=0)
+    ari_pool_size: int = env('ARI_HTTP_POOL_SIZE', 50, minimum=1)
+    ari_timeout: float = env('ARI_HTTP_TIMEOUT', 10.0, minimum=0.1)
+    openai_pool_size: int = env('OPENAI_HTTP_POOL_SIZE', 100, minimum=1)
+    openai_timeout: float = env('OPENAI_HTTP_TIMEOUT', 30.0, minimum=0.1)
+    deepgram_pool_size: int = env('DEEPGRAM_HTTP_POOL_SIZE', 50, minimum=1)
+    deepgram_timeout: float = env('DEEPGRAM_HTTP_TIMEOUT', 30.0, minimum=0.1)
+    openai_chat_rpm: float = env('OPENAI_CHAT_RPM', 500.0, minimum=0)
+    openai_chat_tpm: float = env('OPENAI_CHAT_TPM', 150000.0, minimum=0)
+    openai_tts_rpm: float = env('OPENAI_TTS_RPM', 500.0, minimum=0)
+
+    # Call handling
+    max_concurrent_calls: int = env('MAX_CONCURRENT_CALLS', 200, minimum=1)
+    max_queued_calls: int = env('MAX_QUEUED_CALLS', 50, minimum=0)
+    call_queue_timeout: float = env('CALL_QUEUE_TIMEOUT', 30.0, minimum=0)
+    overflow_action: str = env('OVERFLOW_ACTION', 'continue', choices=('continue', 'busy'))
+    overflow_context: str = env('OVERFLOW_CONTEXT', 'ai_overflow')
+    overflow_extension: str = env('OVERFLOW_EXTENSION', 's')
+    drain_timeout: float = env('DRAIN_TIMEOUT', 300.0, minimum=0)
+    recording_timeout: float = env('RECORDING_TIMEOUT', 35.0, minimum=1)
+    playback_timeout: float = env('PLAYBACK_TIMEOUT', 60.0, minimum=1)
+    max_recording_seconds: int = env('MAX_RECORDING_SECONDS', 30, minimum=1)
+    max_silence_seconds: int = env('MAX_SILENCE_SECONDS', 3, minimum=0)
+    listening_timeout: float = env('LISTENING_TIMEOUT', 40.0, minimum=1)
+    transcribing_timeout: float = env('TRANSCRIBING_TIMEOUT', 30.0, minimum=1)
+    thinking_timeout: float = env('THINKING_TIMEOUT', 60.0, minimum=1)
+    speaking_timeout: float = env('SPEAKING_TIMEOUT', 120.0, minimum=1)
+    max_no_input_turns: int = env('MAX_NO_INPUT_TURNS', 2, minimum=0)
+
+    # Speech-to-text
+    stt_mode: str = env('STT_MODE', 'file', choices=('file', 'streaming'))
+    stt_model: str = env('STT_MODEL', 'nova-2')
+    stt_language: str = env('STT_LANGUAGE', 'en')
+    deepgram_live_url: str = env('DEEPGRAM_LIVE_URL', 'wss://api.deepgram.com/v1/listen')
+    external_media_host: str = env('EXTERNAL_MEDIA_HOST', '127.0.0.1')
+    external_media_format: str = env('EXTERNAL_MEDIA_FORMAT', 'slin16', choices=tuple(MEDIA_FORMATS))
+    stt_concurrency: int = env('STT_CONCURRENCY', 8, minimum=1)
+    stt_timeout: float = env('STT_TIMEOUT', 15.0, minimum=0.1)
+    barge_in: bool = env('BARGE_IN', True)
+    vad_threshold_db: float = env('VAD_THRESHOLD_DB', 12.0, minimum=0)
+    vad_start_ms: int = env('VAD_START_MS', 60, minimum=0)
+    vad_end_ms: int = env('VAD_END_MS', 400, minimum=0)
+    vad_final_grace: float = env('VAD_FINAL_GRACE', 0.5, minimum=0)
+
+    # AI responses
+    stream_responses: bool = env('STREAM_RESPONSES', True)
+    chat_model: str = env('CHAT_MODEL', 'gpt-4-turbo-preview')
+    chat_max_tokens: int = env('CHAT_MAX_TOKENS', 150, minimum=1)
+    chat_temperature: float = env('CHAT_TEMPERATURE', 0.7, minimum=0, maximum=2)
+    context_token_budget: int = env('CONTEXT_TOKEN_BUDGET', 1200, minimum=100)
+    context_keep_recent: int = env('CONTEXT_KEEP_RECENT', 4, minimum=0)
+    summary_model: str = env('SUMMARY_MODEL', 'gpt-3.5-turbo')
+
+    # Text-to-speech
+    tts_model: str = env('TTS_MODEL', 'tts-1')
+    tts_voice: str = env('TTS_VOICE', 'alloy', choices=TTS_VOICES)
+    tts_cache_dir: str = env('TTS_CACHE_DIR', '/dev/shm/ai_agent_tts')
+    tts_cache_disk_mb: int = env('TTS_CACHE_DISK_MB', 128, minimum=1)
+    tts_cache_memory_mb: int = env('TTS_CACHE_MEMORY_MB', 8, minimum=0)
+
+    # Response cache
+    response_cache: bool = env('RESPONSE_CACHE', False)
+    response_cache_threshold: float = env('RESPONSE_CACHE_THRESHOLD', 0.85, minimum=0, maximum=1)
+    response_cache_ttl: float = env('RESPONSE_CACHE_TTL', 3600.0, minimum=0)
+    response_cache_size: int = env('RESPONSE_CACHE_SIZE', 500, minimum=1)
+    response_cache_min_chars: int = env('RESPONSE_CACHE_MIN_CHARS', 12, minimum=0)
+
+    # Leads and call state
+    lead_keywords_file: Optional[str] = env('LEAD_KEYWORDS_FILE')
+    lead_store: str = env('LEAD_STORE', 'jsonl', choices=('jsonl', 'sqlite'))
+    lead_store_path: str = env('LEAD_STORE_PATH', 'leads.jsonl')
+    lead_store_fsync: str = env('LEAD_STORE_FSYNC', 'batch', choices=JsonlLeadSink.FSYNC_POLICIES)
+    lead_store_max_mb: int = env('LEAD_STORE_MAX_MB', 100, minimum=1)
+    call_state_store: str = env('CALL_STATE_STORE', 'sqlite', choices=('memory', 'sqlite'))
+    call_state_path: str = env('CALL_STATE_PATH', 'call_state.db')
+    call_state_flush_interval: float = env('CALL_STATE_FLUSH_INTERVAL', 0.5, minimum=0)
+    call_capture_path: str = env('CALL_CAPTURE_PATH', '')
+    call_capture_max_mb: int = env('CALL_CAPTURE_MAX_MB', 100, minimum=1)
+
+    # Logging
+    log_level: str = env('LOG_LEVEL', 'INFO', choices=LOG_LEVELS)
+    log_format: str = env('LOG_FORMAT', 'json', choices=('json', 'text'))
+    log_file: str = env('LOG_FILE', 'ai_agent.log')
+    log_rotate: str = env('LOG_ROTATE', 'size', choices=('size', 'time', 'none'))
+    log_max_mb: int = env('LOG_MAX_MB', 50, minimum=1)
+    log_backups: int = env('LOG_BACKUPS', 5, minimum=0)
+    log_rotate_when: str = env('LOG_ROTATE_WHEN', 'midnight', choices=ROTATE_WHEN)
+    log_sampling: str = env('LOG_SAMPLING', 'ai_agent.events=0.1')
+    log_queue_size: int = env('LOG_QUEUE_SIZE', 10000, minimum=1)
+
+    # Metrics and worker processes
+    metrics_host: str = env('METRICS_HOST', '127.0.0.1')
+    metrics_port: int = env('METRICS_PORT', 9100, minimum=0, maximum=65535)
+    workers: int = env('WORKERS', 1, minimum=1)
+    worker_health_interval: float = env('WORKER_HEALTH_INTERVAL', 5.0, minimum=0.1)
+    worker_health_timeout: float = env('WORKER_HEALTH_TIMEOUT', 15.0, minimum=0.1)
+    worker_max_pending_mb: int = env('WORKER_MAX_PENDING_MB', 16, minimum=1)
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> 'Settings':
+        """Parse and validate the settings; raises SettingsError listing every problem"""
+        environ = os.environ if environ is None else environ
+        values = {}
+        errors: List[str] = []
+        for setting in fields(cls):
+            name = setting.metadata['env']
+            raw = environ.get(name, '').strip()
+            if not raw:
+                if setting.metadata['required']:
+                    errors.append(f"{name} is required")
+                continue
+
+            kind = str if setting.type == Optional[str] else setting.type
+            try:
+                value = parse_value(raw, kind)
+            except ValueError as e:
+                errors.append(f"{name}={raw!r} is not a valid {kind.__name__}: {e}")
+                continue
+
+            choices = setting.metadata['choices']
+            if choices is not None:
+                # Case-insensitive, normalized to the spelling in the choices
+                match = next((choice for choice in choices if choice.lower() == value.lower()), None)
+                if match is None:
+                    errors.append(f"{name}={raw!r} must be one of: {', '.join(choices)}")
+                    continue
+                value = match
+            minimum, maximum = setting.metadata['minimum'], setting.metadata['maximum']
+            if minimum is not None and value < minimum:
+                errors.append(f"{name}={raw!r} must be at least {minimum}")
+                continue
+            if maximum is not None and value > maximum:
+                errors.append(f"{name}={raw!r} must be at most {maximum}")
+                continue
+            values[setting.name] = value
+
+        settings = None
+        if not errors:
+            settings = cls(**values)
+            errors = settings.check()
+        if errors:
+            raise SettingsError("Invalid configuration: " + '; '.join(errors))
+        return settings
+
+    def check(self) -> List[str]:
+        """Problems involving more than one setting, or inside a structured value"""
+        errors = []
+        try:
+            parse_sampling(self.log_sampling)
+        except ValueError as e:
+            errors.append(f"LOG_SAMPLING={self.log_sampling!r} is invalid: {e}")
+        if self.ws_backoff_base > self.ws_backoff_max:
+            errors.append("ARI_WS_BACKOFF_BASE must not exceed ARI_WS_BACKOFF_MAX")
+        if self.listening_timeout <= self.max_recording_seconds and self.stt_mode == 'file':
+            errors.append("LISTENING_TIMEOUT must be longer than MAX_RECORDING_SECONDS")
+        if self.recording_timeout <= self.max_recording_seconds:
+            errors.append("RECORDING_TIMEOUT must be longer than MAX_RECORDING_SECONDS")
+        if self.worker_health_timeout <= self.worker_health_interval:
+            errors.append("WORKER_HEALTH_TIMEOUT must be longer than WORKER_HEALTH_INTERVAL")
+        return errors
@@ -0,0 +1,330 @@
+"""
+Streaming Speech-to-Text over Asterisk externalMedia
+
+Asterisk sends the caller's audio as RTP to a local UDP socket; the payload is
+pushed to Deepgram's live WebSocket API and interim/final transcripts are
+surfaced per call as an async iterator. The same audio can feed a local
+voice activity detector for barge-in and fast end of turn.
+"""
+
+import array
+import asyncio
+import json
+import logging
+import sys
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Awaitable, TYPE_CHECKING
+from urllib.parse import urlencode
+
+import websockets
+
+# Only for annotations: the VAD (and NumPy) is loaded by whoever creates one
+if TYPE_CHECKING:
+    from vad import VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+# externalMedia format -> (Deepgram encoding, sample rate, payload is big-endian PCM)
+MEDIA_FORMATS = {
+    'slin': ('linear16', 8000, True),
+    'slin16': ('linear16', 16000, True),
+    'ulaw': ('mulaw', 8000, False),
+    'alaw': ('alaw', 8000, False),
+}
+
+RTP_HEADER_SIZE = 12
+
+# externalMedia channel and bridge ids embed the caller's channel id so events
+# for them can be routed to whoever owns the call (see worker_pool), and ones
+# left behind by a previous process can be found and removed
+MEDIA_CHANNEL_PREFIX = 'media_'
+BRIDGE_PREFIX = 'bridge_'
+
+
+def media_owner(channel_id: str) -> str:
+    """Caller channel id for an externalMedia channel or bridge id, else the id itself"""
+    if channel_id.startswith((MEDIA_CHANNEL_PREFIX, BRIDGE_PREFIX)):
+        parts = channel_id.split('_', 2)
+        if len(parts) == 3:
+            return parts[2]
+    return channel_id
+
+
+@dataclass
+class Transcript:
+    """A transcript result from the live STT stream"""
+    text: str
+    is_final: bool
+    speech_final: bool
+
+
+def parse_rtp_payload(packet: bytes) -> Optional[bytes]:
+    """Return the payload of an RTP packet, or None if it is malformed"""
+    if len(packet) < RTP_HEADER_SIZE or packet[0] >> 6 != 2:
+        return None
+
+    offset = RTP_HEADER_SIZE + (packet[0] & 0x0F) * 4
+
+    # Header extension: 16-bit profile, 16-bit length in 32-bit words
+    if packet[0] & 0x10:
+        if len(packet) < offset + 4:
+            return None
+        offset += 4 + int.from_bytes(packet[offset + 2:offset + 4], 'big') * 4
+
+    end = len(packet)
+
+    # Padding: last byte holds the number of padding bytes
+    if packet[0] & 0x20:
+        end -= packet[-1]
+
+    if offset > end:
+        return None
+    return packet[offset:end]
+
+
+def pcm_to_little_endian(payload: bytes) -> bytes:
+    """Convert network-order 16-bit PCM (as sent by Asterisk) to little-endian"""
+    if sys.byteorder != 'little':
+        return payload
+    samples = array.array('h', payload[:len(payload) & ~1])
+    samples.byteswap()
+    return samples.tobytes()
+
+
+class RtpReceiver(asyncio.DatagramProtocol):
+    """Collects RTP payloads from Asterisk into an audio queue (and the VAD, if any)"""
+
+    def __init__(self, audio_queue: asyncio.Queue, swap_bytes: bool,
+                 vad: Optional['VoiceActivityDetector'] = None):
+        self.audio_queue = audio_queue
+        self.swap_bytes = swap_bytes
+        self.vad = vad
+        self.remote_addr = None
+        self.packets = 0
+        self.dropped = 0
+
+    def datagram_received(self, data: bytes, addr):
+        payload = parse_rtp_payload(data)
+        if not payload:
+            return
+
+        self.remote_addr = addr
+        self.packets += 1
+
+        if self.swap_bytes:
+            payload = pcm_to_little_endian(payload)
+
+        if self.vad is not None:
+            self.vad.feed(payload)
+
+        # Never block the loop on a slow STT connection; drop the oldest audio instead
+        if self.audio_queue.full():
+            self.audio_queue.get_nowait()
+            self.dropped += 1
+        self.audio_queue.put_nowait(payload)
+
+
+class LiveTranscriber:
+    """Streams audio to Deepgram's live API and yields Transcript results"""
+
+    def __init__(self, api_key: str, url: str, encoding: str, sample_rate: int,
+                 model: str = 'nova-2', language: str = 'en',
+                 keepalive_interval: float = 5.0, max_buffered_frames: int = 500):
+        self.api_key = api_key
+        self.url = url
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.model = model
+        self.language = language
+        self.keepalive_interval = keepalive_interval
+
+        self.audio_queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_frames)
+        self.results: asyncio.Queue = asyncio.Queue()
+        self.websocket = None
+        self.tasks = []
+        self.closed = False
+
+    def stream_url(self) -> str:
+        """Build the live endpoint URL with the audio and result options"""
+        params = {
+            'encoding': self.encoding,
+            'sample_rate': self.sample_rate,
+            'channels': 1,
+            'model': self.model,
+            'language': self.language,
+            'interim_results': 'true',
+            'punctuate': 'true',
+            'smart_format': 'true',
+            'endpointing': 300,
+        }
+        return f"{self.url}?{urlencode(params)}"
+
+    async def start(self):
+        """Open the WebSocket and start the send/receive loops"""
+        # Token auth via subprotocol works across websockets client versions
+        self.websocket = await websockets.connect(
+            self.stream_url(),
+            subprotocols=['token', self.api_key]
+        )
+        self.tasks = [
+            asyncio.create_task(self.send_loop()),
+            asyncio.create_task(self.receive_loop()),
+        ]
+        logger.info(f"Live STT stream opened ({self.encoding} @ {self.sample_rate} Hz)")
+
+    async def send_loop(self):
+        """Forward queued audio frames, sending KeepAlive during silence gaps"""
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(self.audio_queue.get(), timeout=self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    await self.websocket.send(json.dumps({'type': 'KeepAlive'}))
+                    continue
+
+                if frame is None:
+                    await self.websocket.send(json.dumps({'type': 'CloseStream'}))
+                    return
+                # Audio is bytes; control messages (Finalize) are already JSON text
+                await self.websocket.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning("Live STT connection closed while sending")
+        except Exception as e:
+            logger.error(f"Error sending audio to live STT: {e}")
+
+    async def receive_loop(self):
+        """Parse results from the WebSocket into the results queue"""
+        try:
+            async for message in self.websocket:
+                if isinstance(message, bytes):
+                    continue
+                transcript = self.parse_result(json.loads(message))
+                if transcript:
+                    self.results.put_nowait(transcript)
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning("Live STT connection closed while receiving")
+        except Exception as e:
+            logger.error(f"Error receiving live STT results: {e}")
+        finally:
+            self.results.put_nowait(None)
+
+    @staticmethod
+    def parse_result(data: Dict[str, Any]) -> Optional[Transcript]:
+        """Convert a Deepgram message into a Transcript, ignoring metadata"""
+        if data.get('type') == 'UtteranceEnd':
+            return Transcript(text='', is_final=True, speech_final=True)
+        if data.get('type') != 'Results':
+            return None
+
+        alternatives = data.get('channel', {}).get('alternatives', [])
+        text = alternatives[0].get('transcript', '') if alternatives else ''
+        return Transcript(
+            text=text,
+            is_final=bool(data.get('is_final')),
+            speech_final=bool(data.get('speech_final'))
+        )
+
+    def finalize(self):
+        """Ask Deepgram to emit final results for the audio sent so far"""
+        if not self.closed and not self.audio_queue.full():
+            self.audio_queue.put_nowait(json.dumps({'type': 'Finalize'}))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Transcript:
+        transcript = await self.results.get()
+        if transcript is None:
+            # Keep the sentinel so later iterations also stop
+            self.results.put_nowait(None)
+            raise StopAsyncIteration
+        return transcript
+
+    async def close(self):
+        """Flush remaining audio, then close the WebSocket"""
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.audio_queue.full():
+            self.audio_queue.get_nowait()
+        self.audio_queue.put_nowait(None)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(self.tasks[0]), timeout=2.0)
+        except (asyncio.TimeoutError, IndexError):
+            pass
+
+        if self.websocket is not None:
+            await self.websocket.close()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class ExternalMediaStream:
+    """Per-call externalMedia channel, bridge, RTP socket and live transcriber"""
+
+    def __init__(self, ari_request: Callable[..., Awaitable[Any]], app: str, channel_id: str,
+                 transcriber: LiveTranscriber, media_host: str, media_format: str,
+                 vad: Optional['VoiceActivityDetector'] = None):
+        self.ari_request = ari_request
+        self.app = app
+        self.channel_id = channel_id
+        self.transcriber = transcriber
+        self.media_host = media_host
+        self.media_format = media_format
+        self.vad = vad
+
+        self.media_channel_id = f"{MEDIA_CHANNEL_PREFIX}{uuid.uuid4().hex}_{channel_id}"
+        self.bridge_id = f"{BRIDGE_PREFIX}{uuid.uuid4().hex}_{channel_id}"
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.receiver: Optional[RtpReceiver] = None
+
+    async def open(self) -> bool:
+        """Bind the RTP socket, then bridge the caller with an externalMedia channel"""
+        loop = asyncio.get_running_loop()
+        swap_bytes = MEDIA_FORMATS[self.media_format][2]
+
+        await self.transcriber.start()
+        self.transport, self.receiver = await loop.create_datagram_endpoint(
+            lambda: RtpReceiver(self.transcriber.audio_queue, swap_bytes, self.vad),
+            local_addr=(self.media_host, 0)
+        )
+        port = self.transport.get_extra_info('sockname')[1]
+
+        bridge = await self.ari_request('POST', '/bridges', params={
+            'type': 'mixing',
+            'bridgeId': self.bridge_id,
+        })
+        media = await self.ari_request('POST', '/channels/externalMedia', params={
+            'app': self.app,
+            'channelId': self.media_channel_id,
+            'external_host': f"{self.media_host}:{port}",
+            'format': self.media_format,
+        })
+        if bridge is None or media is None:
+            logger.error(f"Could not set up externalMedia for channel {self.channel_id}")
+            return False
+
+        await self.ari_request('POST', f'/bridges/{self.bridge_id}/addChannel', params={
+            'channel': f"{self.channel_id},{self.media_channel_id}"
+        })
+        logger.info(f"Streaming audio for {self.channel_id} to {self.media_host}:{port}")
+        return True
+
+    def __aiter__(self):
+        return self.transcriber.__aiter__()
+
+    async def close(self):
+        """Tear down the ARI resources, socket and STT stream"""
+        await self.ari_request('DELETE', f'/channels/{self.media_channel_id}')
+        await self.ari_request('DELETE', f'/bridges/{self.bridge_id}')
+
+        if self.transport is not None:
+            self.transport.close()
+        await self.transcriber.close()
+
+        if self.receiver is not None and self.receiver.dropped:
+            logger.warning(f"Dropped {self.receiver.dropped} audio frames for {self.channel_id}")
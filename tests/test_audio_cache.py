@@ -0,0 +1,70 @@
+"""Tests for audio_cache.py"""
+
+import asyncio
+import os
+
+from audio_cache import AudioCache
+
+
+def synthesizer(audio: bytes):
+    calls = []
+
+    async def synthesize():
+        calls.append(audio)
+        return audio
+    return synthesize, calls
+
+
+def test_miss_then_hit(tmp_path):
+    async def run():
+        cache = AudioCache(str(tmp_path), extension='sln')
+        synthesize, calls = synthesizer(b'\x01' * 100)
+        first = await cache.get_file('greeting', synthesize)
+        second = await cache.get_file('greeting', synthesize)
+        return cache, first, second, calls
+
+    cache, first, second, calls = asyncio.run(run())
+    assert first == second == os.path.join(str(tmp_path), 'greeting.sln')
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_missing_file_is_rewritten_from_memory(tmp_path):
+    async def run():
+        cache = AudioCache(str(tmp_path), extension='sln')
+        synthesize, calls = synthesizer(b'\x02' * 100)
+        path = await cache.get_file('greeting', synthesize)
+        os.remove(path)
+        again = await cache.get_file('greeting', synthesize)
+        return cache, path, again, calls
+
+    cache, path, again, calls = asyncio.run(run())
+    assert again == path and os.path.exists(path)
+    assert len(calls) == 1
+    assert (cache.missing, cache.memory_hits) == (1, 1)
+
+
+def test_missing_file_without_memory_copy_is_synthesized_again(tmp_path):
+    async def run():
+        cache = AudioCache(str(tmp_path), max_memory_bytes=0, extension='sln')
+        synthesize, calls = synthesizer(b'\x03' * 100)
+        os.remove(await cache.get_file('greeting', synthesize))
+        await cache.get_file('greeting', synthesize)
+        return cache, calls
+
+    cache, calls = asyncio.run(run())
+    assert len(calls) == 2
+    assert not cache.memory
+
+
+def test_memory_tier_evicts_unpinned_prompts_first(tmp_path):
+    cache = AudioCache(str(tmp_path), max_memory_bytes=250)
+    cache.pin('greeting')
+    cache.remember('greeting', b'g' * 100)
+    cache.remember('reply-1', b'a' * 100)
+    cache.remember('reply-2', b'b' * 100)
+
+    assert list(cache.memory) == ['greeting', 'reply-2']
+    assert cache.memory_bytes == 200
+    cache.remember('too-big', b'x' * 300)
+    assert 'too-big' not in cache.memory
@@ -0,0 +1,91 @@
+"""Tests for StasisStart dispatch in ai_agent.py"""
+
+import asyncio
+
+import pytest
+
+from ai_agent import AICallCenterAgent
+from settings import Settings
+
+CHANNEL = {
+    'id': 'chan-1',
+    'caller': {'number': '1000'},
+    'dialplan': {'app_name': 'Stasis', 'app_data': 'ai-call-center'},
+}
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    def make():
+        settings = Settings.from_env({
+            'OPENAI_API_KEY': 'sk-test', 'DEEPGRAM_API_KEY': 'dg-test', 'CALL_STATE_STORE': 'memory',
+            'METRICS_PORT': '0', 'TTS_CACHE_DIR': str(tmp_path / 'tts'),
+            'LEAD_STORE_PATH': str(tmp_path / 'leads.jsonl'),
+        })
+        agent = AICallCenterAgent(settings)
+        agent.requests = []
+
+        async def ari_request(method, endpoint, params=None, data=None):
+            agent.requests.append((method, endpoint))
+            return [CHANNEL] if (method, endpoint) == ('GET', '/channels') else {}
+        agent.ari_request = ari_request
+
+        agent.calls_started = 0
+        agent.hung_up = asyncio.Event()
+
+        async def run_call(channel_id):
+            agent.calls_started += 1
+            await agent.hung_up.wait()
+        agent.run_call = run_call
+        return agent
+    return make
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_real_and_synthetic_stasis_start_back_to_back_start_one_call(make_agent):
+    async def run():
+        agent = make_agent()
+        agent.dispatch_event({'type': 'StasisStart', 'channel': CHANNEL})
+        agent.dispatch_event({'type': 'StasisStart', 'channel': CHANNEL})
+        await settle()
+
+        assert agent.calls_started == 1
+        task = agent.call_tasks['chan-1']
+        agent.hung_up.set()
+        await task
+        assert 'chan-1' not in agent.call_tasks
+        await agent.cleanup()
+
+    asyncio.run(run())
+
+
+def test_resync_skips_channels_with_a_queued_stasis_start(make_agent):
+    async def run():
+        agent = make_agent()
+        # Real event buffered, not handled yet, when the resync lists channels
+        agent.dispatch_event({'type': 'StasisStart', 'channel': CHANNEL})
+        await agent.resync_channels()
+        assert agent.channel_queues['chan-1'].qsize() == 1
+        await settle()
+
+        assert agent.calls_started == 1
+        await agent.cleanup()
+
+    asyncio.run(run())
+
+
+def test_resync_adopts_channels_it_has_not_seen(make_agent):
+    async def run():
+        agent = make_agent()
+        await agent.resync_channels()
+        await settle()
+
+        assert agent.calls_started == 1
+        assert 'chan-1' in agent.active_calls
+        await agent.cleanup()
+
+    asyncio.run(run())
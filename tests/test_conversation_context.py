@@ -0,0 +1,75 @@
+"""Tests for conversation_context.py"""
+
+from conversation_context import ConversationContext, estimate_tokens, format_lead_facts
+
+SYSTEM = "You are a helpful financial advisor."
+
+
+def history_of(count, words=20):
+    roles = ('user', 'assistant')
+    return [{'role': roles[i % 2], 'content': ' '.join([f"message{i}"] * words)} for i in range(count)]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 4
+    assert estimate_tokens('abcd') == 5
+    assert estimate_tokens('abcde') == 6
+
+
+def test_lead_facts_list_only_known_fields():
+    assert format_lead_facts({}) is None
+    facts = format_lead_facts({'investment_interest': 'stocks', 'investment_amount': 50000, 'timeline': ''})
+    assert "- Investment interest: stocks" in facts
+    assert "- Investment amount: 50000" in facts
+    assert "Timeline" not in facts
+
+
+def test_short_history_is_sent_whole():
+    context = ConversationContext(token_budget=1200)
+    history = history_of(4)
+    messages = context.build_messages(SYSTEM, history, {})
+    assert messages == [{'role': 'system', 'content': SYSTEM}] + history
+    assert not context.needs_summary()
+
+
+def test_budget_keeps_the_newest_messages():
+    context = ConversationContext(token_budget=200, keep_recent=2)
+    history = history_of(10)
+    messages = context.build_messages(SYSTEM, history, {'risk_tolerance': 'moderate'})
+
+    assert messages[0]['content'] == SYSTEM
+    assert "Risk tolerance: moderate" in messages[1]['content']
+    recent = messages[2:]
+    assert recent == history[-len(recent):]
+    assert sum(estimate_tokens(message['content']) for message in recent) <= 200
+    assert context.needs_summary()
+
+
+def test_the_last_message_is_sent_even_over_budget():
+    context = ConversationContext(token_budget=10)
+    history = history_of(3, words=100)
+    assert context.build_messages(SYSTEM, history, {})[1:] == history[-1:]
+
+
+def test_summary_replaces_folded_messages():
+    context = ConversationContext(token_budget=200, keep_recent=2)
+    history = history_of(10)
+    context.sync(history)
+
+    pending = context.pending_for_summary(history)
+    assert pending == history[:8]
+    context.apply_summary("Caller likes stocks and has $50k.", len(pending))
+
+    messages = context.build_messages(SYSTEM, history, {})
+    assert messages[1]['content'] == "Summary of the conversation so far: Caller likes stocks and has $50k."
+    assert messages[2:] == history[8:]
+    assert not context.needs_summary()
+    assert context.pending_for_summary(history) == []
+
+
+def test_no_new_summary_while_one_is_running():
+    context = ConversationContext(token_budget=100, keep_recent=2)
+    context.sync(history_of(10))
+    assert context.needs_summary()
+    context.summarizing = True
+    assert not context.needs_summary()
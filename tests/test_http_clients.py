@@ -0,0 +1,54 @@
+"""Tests for the retry policy in http_clients.py"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from http_clients import UpstreamClient
+
+
+async def request_count(method: str, status: int, retries: int = 2) -> int:
+    """Requests the server saw for one client request it always answers with status"""
+    seen = []
+
+    async def handle(request):
+        seen.append(request.method)
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_route('*', '/', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = UpstreamClient('test', retries=retries, backoff_base=0, backoff_max=0)
+    await client.start()
+    try:
+        async with client.request(method, f'http://127.0.0.1:{port}/') as response:
+            assert response.status == status
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return len(seen)
+
+
+@pytest.mark.parametrize('status', [500, 502, 503, 504, 429])
+def test_idempotent_methods_retry_transient_statuses(status):
+    assert asyncio.run(request_count('GET', status)) == 3
+
+
+@pytest.mark.parametrize('status', [500, 502, 504])
+def test_posts_are_not_resent_after_the_server_may_have_run_them(status):
+    assert asyncio.run(request_count('POST', status)) == 1
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_posts_are_retried_when_turned_away(status):
+    assert asyncio.run(request_count('POST', status)) == 3
+
+
+def test_other_statuses_are_not_retried():
+    assert asyncio.run(request_count('GET', 404)) == 1
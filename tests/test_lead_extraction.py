@@ -0,0 +1,59 @@
+"""Tests for lead_extraction.py"""
+
+import pytest
+
+from lead_extraction import LeadExtractor, is_qualified
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return LeadExtractor()
+
+
+def extract_lead(extractor, text):
+    lead_data = {}
+    extractor.apply(lead_data, extractor.extract(text))
+    return lead_data
+
+
+@pytest.mark.parametrize('text', [
+    "I'm 45 years old",
+    "I'd like to retire in 5 years",
+    "I'm 45",
+    "I have 2 kids",
+    "it went up 7 percent last year",
+])
+def test_numbers_that_are_not_money_set_no_amount(extractor, text):
+    assert 'investment_amount' not in extract_lead(extractor, text)
+
+
+@pytest.mark.parametrize('text, amount', [
+    ("I could put in about $50k", 50_000),
+    ("around 200 thousand", 200_000),
+    ("maybe 1.5 million over time", 1_500_000),
+    ("50,000 dollars", 50_000),
+    ("I want to invest 25000", 25_000),
+    ("I'm 45 and could invest $20,000", 20_000),
+])
+def test_amounts_with_currency_unit_or_context(extractor, text, amount):
+    assert extract_lead(extractor, text)['investment_amount'] == amount
+
+
+def test_terms_match_whole_words_and_plurals(extractor):
+    assert 'investment_interest' not in extract_lead(extractor, "my stockbroker called me")
+    assert extract_lead(extractor, "I like stocks")['investment_interest'] == 'stocks'
+    assert extract_lead(extractor, "a few bonds")['investment_interest'] == 'bonds'
+    assert extract_lead(extractor, "cryptocurrency, mostly")['investment_interest'] == 'cryptocurrency'
+
+
+def test_multi_word_terms_outscore_single_words(extractor):
+    lead_data = extract_lead(extractor, "nothing aggressive, low risk please")
+    assert lead_data['risk_tolerance'] == 'conservative'
+
+
+def test_qualified_once_required_fields_are_known(extractor):
+    lead_data = extract_lead(extractor, "stocks, about $100k, balanced risk")
+    assert lead_data == {'investment_interest': 'stocks', 'investment_amount': 100_000,
+                         'risk_tolerance': 'moderate'}
+    assert is_qualified(lead_data)
+    assert not is_qualified({'investment_interest': 'stocks'})
@@ -0,0 +1,90 @@
+"""Tests for response_cache.py"""
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, normalize
+
+STAGE = 'investment_interest'
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(threshold=0.85, ttl=60, max_entries=3)
+    cache.put("What are the fees for this?", STAGE, "Our fee is 1% a year.", 1.2)
+    cache.put("Is my money safe with you?", STAGE, "Your account is insured.", 0.8)
+    return cache
+
+
+def test_normalize():
+    assert normalize("  What are the FEES?! ") == 'what are the fees'
+
+
+def test_exact_hit_after_normalization(cache):
+    entry = cache.get("what are the fees for this", STAGE)
+    assert entry.response == "Our fee is 1% a year."
+    assert entry.hits == 1
+    assert cache.hits == 1
+    assert cache.saved_seconds == pytest.approx(1.2)
+
+
+@pytest.mark.parametrize('question, response', [
+    ("What are the fees for that?", "Our fee is 1% a year."),
+    ("Is my money safe with you guys?", "Your account is insured."),
+])
+def test_rephrased_questions_hit(cache, question, response):
+    assert cache.get(question, STAGE).response == response
+
+
+@pytest.mark.parametrize('question', [
+    "What are the risks of this?",
+    "What are the fees for this one, please?",
+    "How do I open an account?",
+])
+def test_near_misses_stay_misses(cache, question):
+    assert cache.get(question, STAGE) is None
+    assert cache.misses == 1
+
+
+def test_stages_do_not_share_answers(cache):
+    assert cache.get("What are the fees for this?", 'risk_tolerance') is None
+
+
+def test_short_questions_are_not_cached():
+    cache = ResponseCache(min_chars=12)
+    cache.put("Yes.", STAGE, "Great, and how much would you like to invest?", 1.0)
+    assert not cache.entries
+    assert cache.get("Yes.", STAGE) is None
+    # Not even counted: too short to be a question worth looking up
+    assert cache.misses == 0
+
+
+def test_a_new_answer_replaces_the_old_one(cache):
+    cache.put("What are the fees for this?", STAGE, "It is 0.5% now.", 1.0)
+    assert len(cache.entries) == 2
+    assert cache.get("What are the fees for this?", STAGE).response == "It is 0.5% now."
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    now = response_cache.time.monotonic()
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now + 61)
+    assert cache.get("What are the fees for this?", STAGE) is None
+    assert not cache.entries
+    assert not cache.doc_freq.any()
+
+
+def test_least_recently_used_is_evicted(cache):
+    cache.get("What are the fees for this?", STAGE)
+    cache.put("How do I open an account?", STAGE, "Online in ten minutes.", 1.0)
+    cache.put("Can I withdraw at any time?", STAGE, "Yes, with no penalty.", 1.0)
+
+    assert len(cache.entries) == 3
+    assert cache.get("Is my money safe with you?", STAGE) is None
+    assert cache.get("What are the fees for this?", STAGE) is not None
+    assert cache.get("Can I withdraw at any time?", STAGE) is not None
+
+
+def test_stats(cache):
+    cache.get("What are the fees for this?", STAGE)
+    cache.get("How do I open an account?", STAGE)
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'saved_seconds': 1.2, 'entries': 2}
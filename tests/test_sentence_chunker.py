@@ -0,0 +1,39 @@
+"""Tests for SentenceChunker in ai_agent.py"""
+
+from ai_agent import SentenceChunker
+
+
+def feed_all(chunker, tokens):
+    sentences = []
+    for token in tokens:
+        sentences.extend(chunker.feed(token))
+    return sentences
+
+
+def test_sentences_are_emitted_as_tokens_complete_them():
+    chunker = SentenceChunker(min_chars=0)
+    assert chunker.feed("Hello there") == []
+    assert chunker.feed(".") == []
+    assert chunker.feed(" How are") == ["Hello there."]
+    assert chunker.feed(" you? ") == ["How are you?"]
+    assert chunker.flush() is None
+
+
+def test_short_sentences_merge_into_the_next():
+    chunker = SentenceChunker(min_chars=20)
+    sentences = feed_all(chunker, ["Great! ", "Stocks are a good choice ", "for growth. ", "Okay"])
+    assert sentences == ["Great! Stocks are a good choice for growth."]
+    assert chunker.flush() == "Okay"
+
+
+def test_decimals_and_abbreviations_without_space_do_not_split():
+    chunker = SentenceChunker(min_chars=0)
+    sentences = feed_all(chunker, ["The fee is $2.5 per trade, e.g.", "x for stocks. ", "Anything else?"])
+    assert sentences == ["The fee is $2.5 per trade, e.g.x for stocks."]
+    assert chunker.flush() == "Anything else?"
+
+
+def test_closing_quotes_stay_with_their_sentence():
+    chunker = SentenceChunker(min_chars=0)
+    assert chunker.feed('He said "invest early." Then ') == ['He said "invest early."']
+    assert chunker.flush() == "Then"
@@ -0,0 +1,70 @@
+"""Tests for settings.py"""
+
+import pytest
+
+from settings import Settings, SettingsError
+
+REQUIRED = {'OPENAI_API_KEY': 'sk-test', 'DEEPGRAM_API_KEY': 'dg-test'}
+
+
+def from_env(**overrides):
+    return Settings.from_env({**REQUIRED, **overrides})
+
+
+def test_defaults():
+    settings = from_env()
+    assert settings.stt_mode == 'file'
+    assert settings.max_concurrent_calls == 200
+    assert settings.log_rotate_when == 'midnight'
+    assert settings.log_sampling == 'ai_agent.events=0.1'
+
+
+def test_parses_types_and_normalizes_choices():
+    settings = from_env(MAX_CONCURRENT_CALLS='20', CHAT_TEMPERATURE='0.2', BARGE_IN='no',
+                        LOG_LEVEL='debug', LOG_ROTATE_WHEN='MIDNIGHT')
+    assert settings.max_concurrent_calls == 20
+    assert settings.chat_temperature == 0.2
+    assert settings.barge_in is False
+    assert settings.log_level == 'DEBUG'
+    assert settings.log_rotate_when == 'midnight'
+
+
+def test_api_keys_are_required():
+    with pytest.raises(SettingsError, match='OPENAI_API_KEY is required'):
+        Settings.from_env({'DEEPGRAM_API_KEY': 'dg-test'})
+
+
+def test_reports_every_problem_at_once():
+    with pytest.raises(SettingsError) as raised:
+        from_env(MAX_CONCURRENT_CALLS='lots', CHAT_TEMPERATURE='3', TTS_VOICE='robot')
+    message = str(raised.value)
+    assert 'MAX_CONCURRENT_CALLS' in message
+    assert 'CHAT_TEMPERATURE' in message
+    assert 'TTS_VOICE' in message
+
+
+def test_cross_setting_checks():
+    with pytest.raises(SettingsError, match='RECORDING_TIMEOUT must be longer'):
+        from_env(RECORDING_TIMEOUT='10', MAX_RECORDING_SECONDS='30')
+
+
+@pytest.mark.parametrize('when', ['S', 'M', 'H', 'D', 'midnight', 'W0', 'W6'])
+def test_log_rotate_when_accepts_handler_intervals(when):
+    assert from_env(LOG_ROTATE_WHEN=when).log_rotate_when == when
+
+
+@pytest.mark.parametrize('when', ['hourly', 'W7', '1H'])
+def test_log_rotate_when_rejects_unknown_intervals(when):
+    with pytest.raises(SettingsError, match='LOG_ROTATE_WHEN'):
+        from_env(LOG_ROTATE_WHEN=when)
+
+
+def test_log_sampling_accepts_rates():
+    settings = from_env(LOG_SAMPLING='ai_agent.events=0.1, streaming_stt=1')
+    assert settings.log_sampling == 'ai_agent.events=0.1, streaming_stt=1'
+
+
+@pytest.mark.parametrize('sampling', ['ai_agent.events', 'ai_agent.events=often', '=0.5', 'ai_agent.events=1.5'])
+def test_log_sampling_rejects_malformed_specs(sampling):
+    with pytest.raises(SettingsError, match='LOG_SAMPLING'):
+        from_env(LOG_SAMPLING=sampling)
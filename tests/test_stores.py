@@ -0,0 +1,86 @@
+"""Tests for the stores built on batch_writer.py"""
+
+import asyncio
+import json
+import logging
+
+from call_state import CallRecord, SqliteCallStateStore
+from lead_store import JsonlLeadSink
+
+
+def test_lead_sink_writes_everything_queued_before_close(tmp_path):
+    path = tmp_path / 'leads.jsonl'
+
+    async def run():
+        sink = JsonlLeadSink(str(path), batch_size=2, flush_interval=0.05)
+        await sink.start()
+        for index in range(5):
+            sink.submit({'caller_number': str(index)})
+        await sink.close()
+        await sink.close()
+        return sink
+
+    sink = asyncio.run(run())
+    assert sink.written == 5
+    assert [json.loads(line)['caller_number'] for line in path.read_text().splitlines()] == list('01234')
+
+
+def test_lead_sink_rotates_by_size(tmp_path):
+    path = tmp_path / 'leads.jsonl'
+
+    async def run():
+        sink = JsonlLeadSink(str(path), fsync='never', max_bytes=100, backup_count=2, flush_interval=0)
+        await sink.start()
+        for index in range(4):
+            sink.submit({'caller_number': str(index), 'padding': 'x' * 80})
+            await asyncio.sleep(0.05)
+        await sink.close()
+
+    asyncio.run(run())
+    assert (tmp_path / 'leads.jsonl.1').exists()
+    assert (tmp_path / 'leads.jsonl.2').exists()
+    assert not (tmp_path / 'leads.jsonl.3').exists()
+
+
+def test_call_state_coalesces_updates_and_flushes_on_close(tmp_path):
+    path = str(tmp_path / 'call_state.db')
+
+    async def run():
+        store = SqliteCallStateStore(path, flush_interval=60)
+        await store.start()
+        record = CallRecord('chan-1', '1000', 0.0, {})
+        for turn in range(3):
+            record.conversation_history.append({'role': 'user', 'content': f"turn {turn}"})
+            store.put(record)
+        store.put(CallRecord('chan-2', '1001', 0.0, {}))
+        store.delete('chan-2')
+        await store.close()
+
+        reopened = SqliteCallStateStore(path)
+        await reopened.start()
+        loaded = await reopened.load('chan-1'), await reopened.load('chan-2')
+        await reopened.close()
+        return store, loaded
+
+    store, (first, second) = asyncio.run(run())
+    assert store.written == 2
+    assert len(first.conversation_history) == 3
+    assert second is None
+
+
+def test_write_errors_are_logged_not_raised(tmp_path, caplog):
+    class FailingSink(JsonlLeadSink):
+        def write_batch(self, leads):
+            raise OSError("disk full")
+
+    async def run():
+        sink = FailingSink(str(tmp_path / 'leads.jsonl'), flush_interval=0)
+        await sink.start()
+        sink.submit({'caller_number': '1'})
+        await sink.close()
+        return sink
+
+    with caplog.at_level(logging.ERROR):
+        sink = asyncio.run(run())
+    assert sink.written == 0
+    assert "Error writing 1 leads: disk full" in caplog.text
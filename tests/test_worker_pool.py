@@ -0,0 +1,54 @@
+"""Tests for event framing and backpressure in worker_pool.py"""
+
+import asyncio
+import socket
+
+from worker_pool import WorkerSupervisor, read_message, send_message, shard_for
+
+
+def test_shards_keep_media_channels_with_their_caller():
+    assert shard_for('media_abc_chan-1', 4) == shard_for('chan-1', 4)
+
+
+def test_messages_round_trip():
+    async def run():
+        left, right = socket.socketpair()
+        reader, reader_side = await asyncio.open_unix_connection(sock=left)
+        _, writer = await asyncio.open_unix_connection(sock=right)
+        await send_message(writer, {'type': 'AgentPong', 'active_calls': ['chan-1']})
+        message = await read_message(reader)
+        writer.close()
+        reader_side.close()
+        return message
+
+    assert asyncio.run(run()) == {'type': 'AgentPong', 'active_calls': ['chan-1']}
+
+
+def test_a_stalled_worker_is_cut_off_and_restarted():
+    async def run():
+        supervisor = WorkerSupervisor(None, 1, 'ws://unused', max_pending_bytes=64 * 1024)
+        restarted = []
+
+        async def restart_worker(worker):
+            restarted.append(worker.index)
+        supervisor.restart_worker = restart_worker
+
+        # The worker end is never read, like a worker stuck in a long call
+        stalled, worker_end = socket.socketpair()
+        _, writer = await asyncio.open_unix_connection(sock=stalled)
+        worker = supervisor.workers[0]
+        worker.writer = writer
+
+        payload = b'x' * 16 * 1024
+        sent = 0
+        while supervisor.send(worker, payload):
+            sent += 1
+            assert sent < 10_000
+        await asyncio.sleep(0)
+
+        assert worker.writer is None
+        assert restarted == [0]
+        assert not supervisor.send(worker, payload)
+        worker_end.close()
+
+    asyncio.run(run())
@@ -0,0 +1,134 @@
+"""
+Voice Activity Detection
+
+Frame-level VAD on the caller's inbound audio. Audio is cut into 20 ms
+frames and each batch of frames is scored at once with NumPy: log energy
+against an adaptive noise floor, plus the zero-crossing rate to reject hiss
+and clicks. Hangover on both edges turns per-frame decisions into speech
+start / end events that the agent uses for barge-in and end of turn.
+"""
+
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_BYTES = {'linear16': 2, 'mulaw': 1, 'alaw': 1}
+
+
+def g711_table(encoding: str) -> np.ndarray:
+    """int16 sample for each of the 256 mu-law or A-law codes"""
+    codes = np.arange(256, dtype=np.int32)
+    if encoding == 'mulaw':
+        codes = ~codes & 0xFF
+        exponent = (codes >> 4) & 0x07
+        magnitude = ((((codes & 0x0F) << 3) + 0x84) << exponent) - 0x84
+        return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+    codes = codes ^ 0x55
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0)
+    )
+    return np.where(codes & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+def frame_features(samples: np.ndarray, frame_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-frame energy (dBFS) and zero-crossing rate for whole frames of samples"""
+    count = len(samples) // frame_size
+    frames = samples[:count * frame_size].reshape(count, frame_size).astype(np.float32)
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20 * np.log10(rms / 32768.0 + 1e-10)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_size - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """Speech start / end events from a stream of PCM or G.711 audio"""
+
+    def __init__(self, sample_rate: int, encoding: str = 'linear16', frame_ms: int = 20,
+                 threshold_db: float = 12.0, min_energy_db: float = -45.0, max_zcr: float = 0.4,
+                 start_ms: int = 60, end_ms: int = 400, noise_floor_db: float = -60.0):
+        if encoding not in SAMPLE_BYTES:
+            raise ValueError(f"Unsupported VAD encoding: {encoding}")
+        self.encoding = encoding
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_size * SAMPLE_BYTES[encoding]
+        self.table = g711_table(encoding) if encoding != 'linear16' else None
+
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_ms // frame_ms)
+        self.noise_floor_db = noise_floor_db
+
+        self.buffer = bytearray()
+        self.in_speech = False
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.utterances = 0
+
+        # Set while the caller is talking / once they have stopped
+        self.speech_started = asyncio.Event()
+        self.speech_ended = asyncio.Event()
+        self.speech_ended.set()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if self.table is not None:
+            return self.table[np.frombuffer(data, dtype=np.uint8)]
+        return np.frombuffer(data, dtype='<i2')
+
+    def feed(self, payload: bytes):
+        """Add inbound audio (little-endian PCM or G.711) and update the speech state"""
+        self.buffer += payload
+        usable = len(self.buffer) // self.frame_bytes * self.frame_bytes
+        if not usable:
+            return
+        data = bytes(self.buffer[:usable])
+        del self.buffer[:usable]
+
+        energy_db, zcr = frame_features(self.decode(data), self.frame_size)
+        threshold = max(self.noise_floor_db + self.threshold_db, self.min_energy_db)
+        voiced = (energy_db > threshold) & (zcr < self.max_zcr)
+
+        for frame_voiced, frame_energy in zip(voiced.tolist(), energy_db.tolist()):
+            self.update(frame_voiced, frame_energy)
+
+    def update(self, voiced: bool, energy_db: float):
+        """Advance the hangover counters by one frame"""
+        if voiced:
+            self.voiced_run += 1
+            self.silent_run = 0
+        else:
+            self.silent_run += 1
+            self.voiced_run = 0
+            # Track the background level: follow drops quickly, rises slowly
+            rate = 0.2 if energy_db < self.noise_floor_db else 0.02
+            self.noise_floor_db += rate * (energy_db - self.noise_floor_db)
+
+        if not self.in_speech and self.voiced_run >= self.start_frames:
+            self.in_speech = True
+            self.utterances += 1
+            self.speech_ended.clear()
+            self.speech_started.set()
+        elif self.in_speech and self.silent_run >= self.end_frames:
+            self.in_speech = False
+            self.speech_started.clear()
+            self.speech_ended.set()
+
+    async def wait_for_end_of_speech(self, timeout: Optional[float] = None):
+        """Wait until the caller has spoken and then gone quiet"""
+        async def speech_then_silence():
+            await self.speech_started.wait()
+            await self.speech_ended.wait()
+        await asyncio.wait_for(speech_then_silence(), timeout=timeout)
@@ -0,0 +1,410 @@
+"""
+Worker Pool
+
+Multi-process mode (WORKERS > 1). A supervisor process owns the ARI event
+WebSocket and shards calls across worker processes by channel id; each
+worker runs its own agent, HTTP session and event loop. Events reach the
+workers as length-prefixed frames over a socket pair; a worker that falls
+too far behind on them is restarted rather than buffered for without
+limit. Workers answer
+periodic health checks with their active calls, which the supervisor
+aggregates at /calls and /metrics, and crashed or unresponsive workers are
+restarted (the replacement adopts its shard's calls by resyncing). A drain
+(SIGTERM or POST /drain) is passed on to every worker and the supervisor
+keeps routing events until they have finished their calls and exited.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import random
+import socket
+import time
+import zlib
+from typing import Optional, Dict, Any, List, Callable
+
+import websockets
+from aiohttp import web
+
+from metrics import MetricsRegistry, start_metrics_server
+from streaming_stt import media_owner
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER_SIZE = 4
+
+# Control messages between supervisor and workers (not ARI event types)
+PING = 'AgentPing'
+PONG = 'AgentPong'
+RESYNC = 'AgentResync'
+DRAIN = 'AgentDrain'
+STOP = 'AgentStop'
+
+
+def shard_for(channel_id: str, count: int) -> int:
+    """Worker index owning a channel (externalMedia channels follow their caller)"""
+    return zlib.crc32(media_owner(channel_id).encode()) % count
+
+
+def event_channel_id(event: Dict[str, Any]) -> Optional[str]:
+    """Channel an ARI event belongs to, including recording and playback targets"""
+    channel_id = event.get('channel', {}).get('id')
+    if channel_id:
+        return channel_id
+    for key in ('recording', 'playback'):
+        target = event.get(key, {}).get('target_uri', '')
+        if target.startswith('channel:'):
+            return target[len('channel:'):]
+    return None
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(len(payload).to_bytes(FRAME_HEADER_SIZE, 'big') + payload)
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message).encode()
+
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    """Write a framed JSON message, waiting while the peer is behind"""
+    write_frame(writer, encode_message(message))
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Next framed JSON message, or None once the peer has gone away"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER_SIZE)
+        payload = await reader.readexactly(int.from_bytes(header, 'big'))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return json.loads(payload)
+
+
+class WorkerHandle:
+    """Supervisor-side state for one worker process"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.reader_task: Optional[asyncio.Task] = None
+        self.started = 0.0
+        self.last_pong = 0.0
+        self.active_calls: List[str] = []
+        self.restarts = 0
+        self.failures = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'worker': self.index,
+            'pid': self.process.pid if self.process else None,
+            'alive': self.alive,
+            'restarts': self.restarts,
+            'last_health_check_age': round(time.monotonic() - self.last_pong, 3) if self.last_pong else None,
+            'active_calls': self.active_calls,
+        }
+
+
+class WorkerSupervisor:
+    """Owns the ARI WebSocket and routes events to sharded worker processes"""
+
+    def __init__(self, worker_target: Callable[[int, int, socket.socket], None], count: int,
+                 events_url: str, ping_interval: float = 20, ping_timeout: float = 20,
+                 backoff_base: float = 0.5, backoff_max: float = 30,
+                 health_interval: float = 5, health_timeout: float = 15, drain_timeout: float = 300,
+                 max_pending_bytes: int = 16 * 1024 * 1024,
+                 metrics_host: str = '127.0.0.1', metrics_port: int = 0):
+        self.worker_target = worker_target
+        self.count = count
+        self.events_url = events_url
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.drain_timeout = drain_timeout
+        # Events buffered for one worker beyond this mean it has stalled
+        self.max_pending_bytes = max_pending_bytes
+        self.metrics_host = metrics_host
+        self.metrics_port = metrics_port
+
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = [WorkerHandle(index) for index in range(count)]
+        self.running = True
+        self.draining = False
+        self.drain_task: Optional[asyncio.Task] = None
+        self.ws_connected = False
+        self.restart_tasks: Dict[int, asyncio.Task] = {}
+
+        self.metrics = MetricsRegistry()
+        self.worker_restarts = self.metrics.counter(
+            'ai_agent_worker_restarts_total', 'Worker processes restarted', ['worker']
+        )
+        self.events_routed = self.metrics.counter(
+            'ai_agent_worker_events_total', 'ARI events forwarded to workers', ['worker']
+        )
+        self.worker_overflows = self.metrics.counter(
+            'ai_agent_worker_overflows_total', 'Workers cut off for falling too far behind on events', ['worker']
+        )
+        self.metrics.gauge('ai_agent_workers_alive', 'Worker processes running',
+                           callback=lambda: sum(worker.alive for worker in self.workers))
+        self.metrics.gauge('ai_agent_active_calls', 'Calls in progress across all workers',
+                           callback=lambda: sum(len(worker.active_calls) for worker in self.workers))
+        self.metrics.gauge('ai_agent_draining', '1 while the workers are draining for a restart',
+                           callback=lambda: int(self.draining))
+        self.metrics.gauge('ai_agent_ari_connected', '1 while the ARI event WebSocket is connected',
+                           callback=lambda: int(self.ws_connected))
+
+    async def run(self):
+        """Start the workers and route events until stopped"""
+        logger.info(f"Starting supervisor with {self.count} workers")
+        for worker in self.workers:
+            await self.start_worker(worker)
+
+        runner = None
+        if self.metrics_port:
+            app = web.Application()
+            app.router.add_get('/calls', self.handle_calls)
+            app.router.add_post('/drain', self.handle_drain)
+            runner = await start_metrics_server(self.metrics, self.metrics_host, self.metrics_port, app)
+
+        health = asyncio.create_task(self.monitor_workers())
+        try:
+            await self.run_event_connection()
+        finally:
+            health.cancel()
+            if self.drain_task is not None:
+                self.drain_task.cancel()
+            for task in self.restart_tasks.values():
+                task.cancel()
+            await self.stop_workers()
+            if runner is not None:
+                await runner.cleanup()
+
+    def stop(self):
+        logger.info("Stopping supervisor...")
+        self.running = False
+
+    def drain(self):
+        """Have every worker drain its calls, then stop; a second request stops at once"""
+        if self.draining:
+            self.stop()
+            return
+        self.draining = True
+        self.drain_task = asyncio.create_task(self.wait_for_drain())
+
+    async def wait_for_drain(self):
+        """Keep routing events while the workers finish their calls and exit"""
+        logger.info(f"Draining {self.count} workers")
+        self.broadcast(encode_message({'type': DRAIN}))
+        # Workers hang up what is left at their own deadline; allow time for that
+        deadline = time.monotonic() + self.drain_timeout + 30
+        while any(worker.alive for worker in self.workers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        logger.info("Workers drained")
+        self.stop()
+
+    async def start_worker(self, worker: WorkerHandle):
+        """Spawn a worker process connected to us by a socket pair"""
+        parent_sock, child_sock = socket.socketpair()
+        process = self.context.Process(
+            target=self.worker_target,
+            args=(worker.index, self.count, child_sock),
+            name=f'ai-agent-worker-{worker.index}'
+        )
+        process.start()
+        child_sock.close()
+
+        reader, writer = await asyncio.open_unix_connection(sock=parent_sock)
+        worker.process = process
+        worker.writer = writer
+        worker.started = worker.last_pong = time.monotonic()
+        worker.active_calls = []
+        worker.reader_task = asyncio.create_task(self.read_worker(worker, reader))
+        logger.info(f"Worker {worker.index} started (pid {process.pid})")
+
+    async def read_worker(self, worker: WorkerHandle, reader: asyncio.StreamReader):
+        """Health check replies from a worker"""
+        while True:
+            message = await read_message(reader)
+            if message is None:
+                # Worker went away; stop routing to it until it is restarted
+                if worker.writer is not None:
+                    worker.writer.close()
+                    worker.writer = None
+                return
+            if message.get('type') == PONG:
+                worker.last_pong = time.monotonic()
+                worker.active_calls = message.get('active_calls', [])
+
+    async def monitor_workers(self):
+        """Ping workers and restart the ones that died or stopped answering"""
+        while self.running:
+            await asyncio.sleep(self.health_interval)
+            if self.draining:
+                # Workers exit on their own once drained; do not replace them
+                continue
+            now = time.monotonic()
+            for worker in self.workers:
+                if worker.index in self.restart_tasks:
+                    continue
+                if not worker.alive:
+                    logger.error(f"Worker {worker.index} exited with code {worker.process.exitcode}")
+                elif now - worker.last_pong > self.health_timeout:
+                    logger.error(f"Worker {worker.index} missed health checks for {now - worker.last_pong:.1f}s")
+                else:
+                    self.send(worker, encode_message({'type': PING}))
+                    continue
+                self.restart_tasks[worker.index] = asyncio.create_task(self.restart_worker(worker))
+
+    def send(self, worker: WorkerHandle, payload: bytes) -> bool:
+        """Queue a frame for a worker; False if it is unavailable or was just cut off"""
+        # Frames are written without waiting so one slow worker never holds up
+        # the others; instead a worker this far behind has stalled, so its
+        # buffer is dropped and a replacement adopts its calls by resyncing
+        if worker.writer is None:
+            return False
+        pending = worker.writer.transport.get_write_buffer_size()
+        if pending > self.max_pending_bytes:
+            logger.error(f"Worker {worker.index} is {pending} bytes behind on events, restarting it")
+            self.worker_overflows.inc(worker=worker.index)
+            worker.writer.transport.abort()
+            worker.writer = None
+            if not self.draining and self.running and worker.index not in self.restart_tasks:
+                self.restart_tasks[worker.index] = asyncio.create_task(self.restart_worker(worker))
+            return False
+        write_frame(worker.writer, payload)
+        return True
+
+    async def restart_worker(self, worker: WorkerHandle):
+        """Replace a failed worker, backing off if it keeps failing quickly"""
+        try:
+            await self.terminate(worker)
+            # A worker that dies soon after starting is probably crash-looping
+            if time.monotonic() - worker.started < 30:
+                worker.failures += 1
+            else:
+                worker.failures = 0
+            delay = min(self.backoff_max, self.backoff_base * 2 ** worker.failures)
+            logger.info(f"Restarting worker {worker.index} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            if self.running:
+                worker.restarts += 1
+                self.worker_restarts.inc(worker=worker.index)
+                await self.start_worker(worker)
+        finally:
+            self.restart_tasks.pop(worker.index, None)
+
+    async def terminate(self, worker: WorkerHandle):
+        """Kill a worker process; its calls stay up in Asterisk for the replacement"""
+        if worker.writer is not None:
+            worker.writer.close()
+            worker.writer = None
+        if worker.reader_task is not None:
+            worker.reader_task.cancel()
+        process = worker.process
+        if process is not None and process.is_alive():
+            process.kill()
+            await asyncio.get_running_loop().run_in_executor(None, process.join)
+        worker.active_calls = []
+
+    async def stop_workers(self, timeout: float = 30):
+        """Ask every worker to hang up and exit, then make sure they have"""
+        loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            if worker.alive:
+                self.send(worker, encode_message({'type': STOP}))
+        for worker in self.workers:
+            if worker.process is not None:
+                await loop.run_in_executor(None, worker.process.join, timeout)
+            await self.terminate(worker)
+
+    async def run_event_connection(self):
+        """Keep the ARI event WebSocket connected, reconnecting with jittered backoff"""
+        attempt = 0
+        reconnecting = False
+
+        while self.running:
+            try:
+                async with websockets.connect(
+                    self.events_url,
+                    ping_interval=self.ping_interval,
+                    ping_timeout=self.ping_timeout
+                ) as websocket:
+                    self.ws_connected = True
+                    logger.info("Supervisor connected to ARI WebSocket")
+                    if reconnecting:
+                        self.broadcast(encode_message({'type': RESYNC}))
+                    attempt = 0
+                    reconnecting = False
+                    await self.read_events(websocket)
+            except websockets.exceptions.ConnectionClosed:
+                logger.warning("WebSocket connection closed")
+            except (websockets.exceptions.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"ARI WebSocket unavailable: {e}")
+            finally:
+                self.ws_connected = False
+
+            if not self.running:
+                break
+
+            reconnecting = True
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            attempt += 1
+            logger.info(f"Reconnecting to ARI in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+    async def read_events(self, websocket):
+        """Forward each ARI event to the worker owning its channel"""
+        while self.running:
+            try:
+                message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            payload = message.encode() if isinstance(message, str) else message
+            channel_id = event_channel_id(json.loads(payload))
+
+            if channel_id is None:
+                # Not tied to a call (bridge or application events): every worker sees it
+                self.broadcast(payload)
+                continue
+
+            worker = self.workers[shard_for(channel_id, self.count)]
+            if worker.writer is None and self.draining:
+                # Its worker has drained and exited: any remaining worker can turn the caller away
+                worker = next((other for other in self.workers if other.writer is not None), worker)
+            if not self.send(worker, payload):
+                # Restarting: the replacement picks the call up when it resyncs
+                logger.debug(f"Worker {worker.index} unavailable, dropping event for {channel_id}")
+                continue
+            self.events_routed.inc(worker=worker.index)
+
+    def broadcast(self, payload: bytes):
+        for worker in self.workers:
+            self.send(worker, payload)
+
+    async def handle_drain(self, request: web.Request) -> web.Response:
+        """POST /drain: begin a graceful drain of all workers"""
+        if not self.draining:
+            self.drain()
+        return web.json_response({
+            'draining': True,
+            'active_calls': sum(len(worker.active_calls) for worker in self.workers),
+            'drain_timeout': self.drain_timeout,
+        }, status=202)
+
+    async def handle_calls(self, request: web.Request) -> web.Response:
+        """Aggregated view of active calls per worker"""
+        workers = [worker.status() for worker in self.workers]
+        return web.json_response({
+            'active_calls': sum(len(worker['active_calls']) for worker in workers),
+            'workers': workers,
+        })